@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Per-machine, append-only log of repository accesses.
+
+Saving an episode used to rewrite the repository's metadata file just to
+bump ``location.last_accessed``, so every machine kept editing (and
+conflicting on) the same files. Instead each access is appended to
+``memory/access/<machine>.log``, one ``<timestamp>\\t<slug>`` line each
+(ISO 8601, UTC, trailing Z). A machine only ever appends to its own log,
+so concurrent pushes from different machines never touch the same file.
+
+Readers take the newest of a repository file's ``last_accessed`` and the
+newest log line for its slug (see RepoIndex.update_access). Compaction,
+an explicit command since it rewrites the shared repository files, folds
+the logs back into them and empties the log of the machine that ran it; other machines' logs are folded as well (a newer
+timestamp is idempotent) but left for their owners to truncate.
+"""
+
+from pathlib import Path
+
+# Past this size a save suggests running compact-access
+COMPACT_BYTES = 64 * 1024
+
+
+def log_path(access_dir, machine):
+    """Path of one machine's access log."""
+    name = str(machine or "unknown").lower().replace("/", "_").replace("\\", "_")
+    return Path(access_dir) / f"{name}.log"
+
+
+def append_accesses(access_dir, machine, records):
+    """
+    Append accesses to a machine's log.
+
+    Args:
+        access_dir: The ``memory/access`` directory
+        machine: Machine whose log to append to
+        records: Iterable of (slug, ISO timestamp)
+
+    Returns:
+        Path: The log file, or None if there was nothing to append
+    """
+    lines = "".join(f"{_clean(accessed)}\t{_clean(slug)}\n" for slug, accessed in records)
+    if not lines:
+        return None
+    path = log_path(access_dir, machine)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(lines)
+    return path
+
+
+def parse_lines(text, latest=None):
+    """
+    Fold log lines into the newest access per slug.
+
+    Args:
+        text: Log contents (complete lines)
+        latest: {slug: timestamp} dict to update in place (default: a new one)
+
+    Returns:
+        dict: {slug: newest timestamp}
+    """
+    if latest is None:
+        latest = {}
+    for line in text.splitlines():
+        accessed, sep, slug = line.partition("\t")
+        if not sep or not slug:
+            continue
+        if accessed > latest.get(slug, ""):
+            latest[slug] = accessed
+    return latest
+
+
+def read_latest(access_dir):
+    """
+    Newest logged access per slug across every machine's log.
+
+    Returns:
+        dict: {slug: ISO timestamp}
+    """
+    latest = {}
+    access_dir = Path(access_dir)
+    if access_dir.exists():
+        for path in sorted(access_dir.glob("*.log")):
+            parse_lines(path.read_text(encoding="utf-8"), latest)
+    return latest
+
+
+def _clean(value):
+    """Keep a field on one tab-separated line."""
+    return str(value).replace("\t", " ").replace("\n", " ")
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Per-shard Bloom filters for ruling out searches without reading episodes.
+
+Episodes are grouped into shards: the loose files of one month in a tier
+(``hot/loose/2025-01``) and each monthly pack (``hot/pack/2025-01``). Each
+shard gets a Bloom filter over the character trigrams of the text that
+search_memory matches against. Search keywords are substring matches, so a
+keyword can only occur in a shard if all of its trigrams do; a shard whose
+filter lacks any trigram of any keyword is skipped. Keywords shorter than
+a trigram cannot be checked and never rule a shard out.
+
+Filters live under ``memory/index/bloom/``:
+
+- ``<shard>.bits``: the filter's bit array
+- ``meta.json``: per shard its size, hash count, number of trigrams added
+  and what it was built from (the (size, mtime) of every loose file, or of
+  the pack), so changed shards are rebuilt and grown loose shards extended
+"""
+
+import json
+import os
+from pathlib import Path
+
+INDEX_VERSION = 1
+GRAM_SIZE = 3
+FALSE_POSITIVE_RATE = 0.01
+# Loose shards keep growing; size them for this many times their content
+LOOSE_HEADROOM = 2
+MIN_BITS = 1024
+
+
+def text_grams(text):
+    """Distinct character trigrams of a text."""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def query_grams(keyword):
+    """Trigrams a substring match of ``keyword`` requires, or None if too short."""
+    if len(keyword) < GRAM_SIZE:
+        return None
+    return text_grams(keyword)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, bits, hashes):
+        """
+        Args:
+            bits: bytearray holding the bit array
+            hashes: Number of bit positions per item
+        """
+        self.bits = bits
+        self.size = len(bits) * 8
+        self.hashes = hashes
+
+    @classmethod
+    def for_capacity(cls, capacity, fp_rate=FALSE_POSITIVE_RATE):
+        """Empty filter sized for ``capacity`` items at the given false positive rate."""
+        import math
+
+        size = max(int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)), MIN_BITS)
+        hashes = max(round(size / max(capacity, 1) * math.log(2)), 1)
+        return cls(bytearray((size + 7) // 8), min(hashes, 16))
+
+    def add(self, item):
+        bits = self.bits
+        for position in self._positions(item):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def _positions(self, item):
+        """Bit positions by double hashing one 64-bit blake2b digest."""
+        import hashlib
+
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest()
+        h1 = int.from_bytes(digest[:4], "little")
+        h2 = int.from_bytes(digest[4:], "little") | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+
+class ShardBloomIndex:
+    """Persisted Bloom filters, one per episode shard."""
+
+    def __init__(self, index_dir):
+        """
+        Open (or prepare) the filter directory.
+
+        Args:
+            index_dir: Directory holding meta.json and the .bits files
+        """
+        self.index_dir = Path(index_dir)
+        self.meta_path = self.index_dir / "meta.json"
+        self.shards = {}
+        self._filters = {}
+        self._dirty = set()
+        self._meta_changed = False
+        if self.meta_path.exists():
+            try:
+                meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            except ValueError:
+                meta = {}
+            if meta.get("version") == INDEX_VERSION:
+                self.shards = meta.get("shards", {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+    def may_contain(self, shard, grams):
+        """False only if the shard certainly lacks one of ``grams``."""
+        bloom = self._filter(shard)
+        if bloom is None:
+            return True
+        return all(gram in bloom for gram in grams)
+
+    def sync_loose(self, shard, entries, read_texts):
+        """
+        Bring a loose-file shard's filter up to date.
+
+        Files added since the last sync are added to the filter; if a known
+        file changed, or the filter is over capacity, it is rebuilt. Removed
+        files only leave harmless extra bits behind.
+
+        Args:
+            shard: Shard id
+            entries: {filename: [size, mtime_ns]} of every file in the shard
+            read_texts: Callable taking filenames and yielding their texts
+        """
+        info = self.shards.get(shard)
+        known = info.get("files") if info else None
+        if known is not None and all(known.get(name, value) == value for name, value in entries.items()):
+            added = [name for name in entries if name not in known]
+            if not added and len(known) == len(entries):
+                return
+            bloom = self._filter(shard) if added else None
+            grams = set()
+            for text in read_texts(added):
+                grams |= text_grams(text)
+            if not added or (bloom is not None and info["grams"] + len(grams) <= info["capacity"]):
+                for gram in grams:
+                    bloom.add(gram)
+                info["grams"] = info["grams"] + len(grams)
+                info["files"] = {name: list(value) for name, value in entries.items()}
+                if added:
+                    self._dirty.add(shard)
+                self._meta_changed = True
+                return
+
+        grams = set()
+        for text in read_texts(sorted(entries)):
+            grams |= text_grams(text)
+        self._build(shard, grams, len(grams) * LOOSE_HEADROOM,
+                    {"files": {name: list(value) for name, value in entries.items()}})
+
+    def sync_sealed(self, shard, fingerprint, read_texts):
+        """
+        Build a filter for an immutable shard (a pack) unless it is current.
+
+        Args:
+            shard: Shard id
+            fingerprint: [size, mtime_ns] of the pack file
+            read_texts: Callable taking no arguments and yielding every text
+        """
+        info = self.shards.get(shard)
+        if info is not None and info.get("fingerprint") == list(fingerprint):
+            return
+        grams = set()
+        for text in read_texts():
+            grams |= text_grams(text)
+        self._build(shard, grams, len(grams), {"fingerprint": list(fingerprint)})
+
+    def prune(self, live_shards, tiers):
+        """Drop filters of shards in the given tiers that no longer exist."""
+        live_shards = set(live_shards)
+        for shard in list(self.shards):
+            if shard in live_shards or shard.split("/", 1)[0] not in tiers:
+                continue
+            del self.shards[shard]
+            self._filters.pop(shard, None)
+            self._dirty.discard(shard)
+            try:
+                os.unlink(self._bits_path(shard))
+            except OSError:
+                pass
+            self._meta_changed = True
+
+    def save(self):
+        """Write changed filters and meta.json (each atomically)."""
+        from utils import atomic_write_bytes, atomic_write_text
+
+        if not self._dirty and not self._meta_changed:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        for shard in self._dirty:
+            atomic_write_bytes(self._bits_path(shard), self._filters[shard].bits)
+        atomic_write_text(self.meta_path, json.dumps({"version": INDEX_VERSION, "shards": self.shards}))
+        self._dirty = set()
+        self._meta_changed = False
+
+    def _build(self, shard, grams, capacity, source):
+        bloom = BloomFilter.for_capacity(max(capacity, 1))
+        for gram in grams:
+            bloom.add(gram)
+        self._filters[shard] = bloom
+        self.shards[shard] = dict(source, hashes=bloom.hashes, grams=len(grams), capacity=max(capacity, 1))
+        self._dirty.add(shard)
+        self._meta_changed = True
+
+    def _filter(self, shard):
+        if shard not in self._filters:
+            info = self.shards.get(shard)
+            if info is None:
+                return None
+            try:
+                bits = bytearray(self._bits_path(shard).read_bytes())
+            except FileNotFoundError:
+                return None
+            self._filters[shard] = BloomFilter(bits, info["hashes"])
+        return self._filters[shard]
+
+    def _bits_path(self, shard):
+        return self.index_dir / (shard.replace("/", "_") + ".bits")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Shared command-line entry point for the memory scripts.
+
+Each script parses its own arguments and hands a zero-argument callable to
+``run``. Only ``sys`` is imported up front; ``json`` and ``traceback`` are
+loaded when the result is printed or an error is reported.
+"""
+
+import sys
+
+
+def run(handler):
+    """
+    Execute a command handler and print its result as JSON.
+
+    Args:
+        handler: Callable returning a JSON-serializable result
+
+    Exits with status 0 on success, 1 (with the error as JSON on stderr)
+    on failure.
+    """
+    import json
+
+    try:
+        result = handler()
+        print(json.dumps(result, indent=2))
+        sys.exit(0)
+
+    except Exception as e:
+        print(json.dumps({"success": False, "error": str(e)}), file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
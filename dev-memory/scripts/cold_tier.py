@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Cold storage tier for archived repositories and old episodes.
+
+Cold data lives under ``memory/cold/`` with the same layout as the hot
+directories (``repositories/``, ``episodes/`` and ``episodes/packs/``), so
+directory scans on the hot path only see active data. Cold repositories
+keep a tombstone in ``cold/repositories/index.json``: slug -> the fields
+find-repo, list-recent-repos and scan-repos report. Those readers can then
+reach cold repositories without opening their files.
+"""
+
+import json
+from pathlib import Path
+
+
+def cold_dirs(memory_dir):
+    """Return (cold repositories dir, cold episodes dir, cold packs dir)."""
+    cold = Path(memory_dir) / "cold"
+    episodes = cold / "episodes"
+    return cold / "repositories", episodes, episodes / "packs"
+
+
+def repo_tombstone(frontmatter):
+    """Compact summary of a repository kept while it is in the cold tier."""
+    repository = frontmatter.get("repository") or {}
+    return {
+        "remote": repository.get("remote", ""),
+        "description": frontmatter.get("description", ""),
+        "tags": frontmatter.get("tags", []),
+        "location": frontmatter.get("location", {}),
+        "archived": frontmatter.get("archived", False),
+        "archived_date": frontmatter.get("archived_date"),
+        "archived_reason": frontmatter.get("archived_reason"),
+    }
+
+
+def read_repo_tombstones(memory_dir):
+    """Tombstones of all cold repositories (empty if there are none)."""
+    index_path = cold_dirs(memory_dir)[0] / "index.json"
+    if not index_path.exists():
+        return {}
+    return json.loads(index_path.read_text(encoding="utf-8"))
+
+
+def write_repo_tombstones(memory_dir, tombstones):
+    """
+    Replace the cold repository index.
+
+    Returns:
+        Path: The index file
+    """
+    from utils import atomic_write_text
+
+    index_path = cold_dirs(memory_dir)[0] / "index.json"
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    atomic_write_text(index_path, json.dumps(tombstones, indent=2, sort_keys=True) + "\n")
+    return index_path
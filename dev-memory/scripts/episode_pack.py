@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Monthly episode pack files.
+
+A pack holds every episode of one closed month concatenated into a single
+file ``episodes/packs/YYYY-MM.pack``. A JSON index maps each original
+episode filename to its byte offset and length, so a reader can mmap the
+pack and slice out one episode without copying the rest.
+
+The index is a trailer inside the pack, followed by a fixed footer (the
+index offset and a magic number), so a pack and its index are replaced
+together by one rename. Packs written before that kept the index in a
+sidecar ``YYYY-MM.idx.json``, which is still read when the footer is
+missing and removed when the pack is rewritten.
+"""
+
+import json
+import os
+import struct
+from pathlib import Path
+
+PACK_INDEX_VERSION = 2
+
+# Trailer footer: index offset, magic
+PACK_MAGIC = b"DMPACK02"
+_FOOTER = struct.Struct("<Q8s")
+
+
+def month_of(filename):
+    """
+    Return the ``YYYY-MM`` month of an episode filename, or None.
+
+    Episode filenames start with their ``YYYY-MM-DD`` date.
+    """
+    month = filename[:7]
+    if len(month) == 7 and month[4] == "-" and month[:4].isdigit() and month[5:].isdigit():
+        return month
+    return None
+
+
+def month_cutoff(keep_months):
+    """
+    First ``YYYY-MM`` month that is kept when older months are rolled up.
+
+    With keep_months=0 this is the current month, so only closed months
+    fall before it.
+    """
+    from datetime import datetime, UTC
+
+    now = datetime.now(UTC)
+    months = now.year * 12 + now.month - 1 - max(keep_months, 0)
+    return f"{months // 12:04d}-{months % 12 + 1:02d}"
+
+
+def index_path_for(pack_path):
+    """Legacy sidecar index path for a pack file."""
+    return Path(pack_path).with_suffix(".idx.json")
+
+
+class EpisodePack:
+    """Read-only, memory-mapped view of one monthly episode pack."""
+
+    def __init__(self, pack_path):
+        """
+        Open a pack.
+
+        Args:
+            pack_path: Path to the ``.pack`` file
+        """
+        self.pack_path = Path(pack_path)
+        index = _read_index(self.pack_path)
+        self.entries = {
+            entry["name"]: (entry["offset"], entry["length"])
+            for entry in index.get("episodes", [])
+        }
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Unmap the pack file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def names(self):
+        """Episode filenames in pack order."""
+        return list(self.entries)
+
+    def view(self, name):
+        """
+        Zero-copy view of one episode's bytes.
+
+        The returned memoryview must be released before the pack is closed.
+        """
+        offset, length = self.entries[name]
+        return memoryview(self._buffer())[offset:offset + length]
+
+    def read_text(self, name):
+        """Decode one episode."""
+        with self.view(name) as view:
+            return str(view, "utf-8")
+
+    def _buffer(self):
+        """Map the pack on first access."""
+        if self._mmap is None:
+            import mmap
+
+            with open(self.pack_path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+
+def _read_index(pack_path):
+    """A pack's index: its trailer, or the legacy sidecar if it has none."""
+    with open(pack_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= _FOOTER.size:
+            f.seek(size - _FOOTER.size)
+            offset, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+            if magic == PACK_MAGIC and offset <= size - _FOOTER.size:
+                f.seek(offset)
+                return json.loads(f.read(size - _FOOTER.size - offset).decode("utf-8"))
+    return json.loads(index_path_for(pack_path).read_text(encoding="utf-8"))
+
+
+def write_pack(pack_path, episodes):
+    """
+    Write a pack with its index trailer, replacing any existing one.
+
+    The pack goes to a unique temp file that is fsynced before it is
+    renamed over the target, so readers see either the old pack or the
+    new one, never new bytes through old offsets. A legacy sidecar index
+    is removed afterwards.
+
+    Args:
+        pack_path: Destination ``.pack`` path
+        episodes: Iterable of (filename, bytes) in the order to store them
+
+    Returns:
+        int: Number of episodes written
+    """
+    import tempfile
+
+    pack_path = Path(pack_path)
+    pack_path.parent.mkdir(parents=True, exist_ok=True)
+
+    entries = []
+    offset = 0
+    fd, tmp_pack = tempfile.mkstemp(dir=pack_path.parent, prefix=f".{pack_path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for name, data in episodes:
+                f.write(data)
+                entries.append({"name": name, "offset": offset, "length": len(data)})
+                offset += len(data)
+            index = json.dumps({"version": PACK_INDEX_VERSION, "episodes": entries}, indent=1) + "\n"
+            f.write(index.encode("utf-8"))
+            f.write(_FOOTER.pack(offset, PACK_MAGIC))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_pack, pack_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_pack)
+        except OSError:
+            pass
+        raise
+
+    index_path_for(pack_path).unlink(missing_ok=True)
+    return len(entries)
+
+
+def list_packs(packs_dir):
+    """Pack files in a directory, oldest month first."""
+    packs_dir = Path(packs_dir)
+    if not packs_dir.exists():
+        return []
+    return sorted(packs_dir.glob("*.pack"))
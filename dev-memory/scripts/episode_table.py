@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+Columnar, memory-mapped table of episode metadata.
+
+One row per episode, stored under ``memory/index/episode-table/``:
+
+- ``<column>.col``: fixed-width little-endian arrays (``timestamp`` as int64
+  POSIX seconds; ``machine``, ``os``, ``repo``, ``branch`` and ``detail`` as
+  uint32 ids into string tables)
+- ``names.txt``: the episode filename of each row, one per line
+- ``meta.json``: row count and the string tables
+
+Columns are mmapped on open and exposed as typed memoryviews, so filters
+and aggregations run through C-level ``map``/``itertools``/``Counter``
+loops over the raw arrays instead of parsing YAML per episode.
+
+Opening and updating take ``table.lock``, as several processes (searches,
+stats, the prefetch worker) refresh the same table. Appends only grow the
+files past the committed row count; anything else replaces whole files
+atomically, so a reader's open mappings keep the rows it opened.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+TABLE_VERSION = 1
+
+# Column name -> array typecode
+COLUMNS = {
+    "timestamp": "q",
+    "machine": "I",
+    "os": "I",
+    "repo": "I",
+    "branch": "I",
+    "detail": "I",
+}
+
+# Columns whose values are ids into a string table
+STRING_COLUMNS = ("machine", "os", "repo", "branch", "detail")
+
+
+def episode_row(frontmatter):
+    """Extract the tabulated fields from an episode's frontmatter."""
+    from utils import parse_timestamp
+
+    repository = frontmatter.get("repository") or {}
+    context = frontmatter.get("context") or {}
+    return {
+        "timestamp": parse_timestamp(frontmatter.get("timestamp")),
+        "machine": str(frontmatter.get("machine") or ""),
+        "os": str(frontmatter.get("os") or ""),
+        "repo": str(repository.get("name") or ""),
+        "branch": str(repository.get("branch") or ""),
+        "detail": str(context.get("detail_level") or ""),
+    }
+
+
+class EpisodeTable:
+    """Columnar episode metadata with incremental rebuild."""
+
+    def __init__(self, table_dir):
+        """
+        Open (or prepare) a table directory.
+
+        Args:
+            table_dir: Directory holding the column files
+        """
+        self.table_dir = Path(table_dir)
+        self.meta_path = self.table_dir / "meta.json"
+        self.names_path = self.table_dir / "names.txt"
+        self.lock_path = self.table_dir / "table.lock"
+        self.rows = 0
+        self.strings = {column: [] for column in STRING_COLUMNS}
+        self._ids = {}
+        self._names = None
+        self._names_file = None
+        self._maps = []
+        self._columns = {}
+        with self._lock():
+            self._load()
+            self._open()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the column mappings."""
+        for view in self._columns.values():
+            if isinstance(view, memoryview):
+                view.release()
+        self._columns = {}
+        for mapping in self._maps:
+            mapping.close()
+        self._maps = []
+        if self._names_file is not None:
+            self._names_file.close()
+            self._names_file = None
+
+    def column(self, name):
+        """Typed, zero-copy view of one column (length == rows)."""
+        if name not in self._columns:
+            self._columns[name] = self._map_column(name)
+        return self._columns[name]
+
+    def names(self):
+        """Episode filename of every row."""
+        if self._names is None:
+            if self.rows and self._names_file is not None:
+                # The file opened with the table, even if since replaced
+                self._names_file.seek(0)
+                text = self._names_file.read().decode("utf-8")
+                self._names = text.split("\n")[:self.rows]
+            else:
+                self._names = []
+        return self._names
+
+    def string_id(self, column, value):
+        """Id of a string value in a column's table, or None if unseen."""
+        return self._string_ids(column).get(value)
+
+    def select(self, since=None, until=None, rows=None, **equals):
+        """
+        Row numbers matching all filters.
+
+        Args:
+            since: Minimum POSIX timestamp (inclusive)
+            until: Maximum POSIX timestamp (exclusive)
+            rows: Restrict to these row numbers (default: all rows)
+            **equals: column=value string filters, e.g. machine="work-main"
+
+        Returns:
+            list: Matching row numbers in table order
+        """
+        import operator
+        from itertools import compress, repeat
+
+        if rows is None:
+            rows = range(self.rows)
+
+        for column, value in equals.items():
+            if value is None:
+                continue
+            value_id = self.string_id(column, value)
+            if value_id is None:
+                return []
+            values = self._take(column, rows)
+            rows = list(compress(rows, map(operator.eq, values, repeat(value_id))))
+
+        if since is not None:
+            values = self._take("timestamp", rows)
+            rows = list(compress(rows, map(operator.ge, values, repeat(since))))
+        if until is not None:
+            values = self._take("timestamp", rows)
+            rows = list(compress(rows, map(operator.lt, values, repeat(until))))
+
+        return list(rows)
+
+    def newest_first(self, page_size=256, max_page_size=4096):
+        """
+        Row numbers by descending timestamp, a page at a time.
+
+        Each page is the next ``page_size`` newest rows, found by a scan
+        of the timestamp column, so only one page of row numbers is held
+        at once however large the table is. Rows with equal timestamps
+        keep table order. Pages double in size up to ``max_page_size``,
+        so callers that filter pages further rescan the column less often.
+
+        Yields:
+            list: Row numbers, newest first
+        """
+        import heapq
+        import operator
+        from itertools import compress, repeat
+
+        timestamps = self.column("timestamp")
+        rows = range(self.rows)
+        bound = None
+        while True:
+            below = rows if bound is None else compress(rows, map(operator.lt, timestamps, repeat(bound)))
+            page = heapq.nlargest(page_size, below, key=timestamps.__getitem__)
+            if len(page) < page_size:
+                if page:
+                    yield page
+                return
+            # The page may cut through rows tied with its oldest one; take them all
+            bound = timestamps[page[-1]]
+            page = [row for row in page if timestamps[row] > bound]
+            page.extend(compress(rows, map(operator.eq, timestamps, repeat(bound))))
+            yield page
+            page_size = min(page_size * 2, max_page_size)
+
+    def count(self, column, rows=None):
+        """
+        Count rows per value of a column.
+
+        Returns:
+            Counter: Keyed by string value for string columns, raw value otherwise
+        """
+        from collections import Counter
+
+        counts = Counter(self._take(column, rows))
+        if column not in STRING_COLUMNS:
+            return counts
+        table = self.strings[column]
+        return Counter({table[value_id]: n for value_id, n in counts.items()})
+
+    def values(self, column, rows=None):
+        """Column values for the given rows (all rows by default)."""
+        return self._take(column, rows)
+
+    def update(self, names, read_headers):
+        """
+        Bring the table in line with the current set of episodes.
+
+        New episodes are parsed and appended. Rows of episodes that have
+        disappeared are dropped by rewriting the columns, without reparsing.
+
+        Args:
+            names: Iterable of every current episode filename
+            read_headers: Callable taking a list of filenames and yielding
+                (filename, frontmatter) pairs
+
+        Returns:
+            dict: Counts of rows added and whether a full rebuild happened
+        """
+        current = set(names)
+        with self._lock():
+            # Another process may have updated the table since it was opened
+            self._load()
+            self._open()
+            known = self.names()
+            rebuilt = False
+            removed = 0
+            if TABLE_VERSION != self._version:
+                self._reset()
+                known = []
+                rebuilt = True
+            elif not current.issuperset(known):
+                keep = [i for i, name in enumerate(known) if name in current]
+                removed = len(known) - len(keep)
+                self._retain(keep)
+                known = self.names()
+
+            new_names = sorted(current.difference(known))
+            if new_names:
+                self._append(read_headers(new_names))
+            self._open()
+
+        return {"added": len(new_names), "removed": removed, "rebuilt": rebuilt, "rows": self.rows}
+
+    def _take(self, column, rows):
+        """Column values for a row selection."""
+        view = self.column(column)
+        if rows is None or (isinstance(rows, range) and len(rows) == self.rows):
+            return view
+        return list(map(view.__getitem__, rows))
+
+    def _string_ids(self, column):
+        if column not in self._ids:
+            self._ids[column] = {value: i for i, value in enumerate(self.strings[column])}
+        return self._ids[column]
+
+    def _lock(self):
+        """Inter-process lock held while opening or changing the files."""
+        from utils import FileLock
+
+        return FileLock(self.lock_path)
+
+    def _open(self):
+        """Map every column and open names.txt; call with the lock held."""
+        self.close()
+        self._names = None
+        for name in COLUMNS:
+            self._columns[name] = self._map_column(name)
+        if self.names_path.exists():
+            self._names_file = open(self.names_path, "rb")
+
+    def _load(self):
+        """Read meta.json; a missing or unreadable table is empty."""
+        self._version = TABLE_VERSION
+        self.rows = 0
+        self.strings = {column: [] for column in STRING_COLUMNS}
+        self._ids = {}
+        self._names = None
+        if not self.meta_path.exists():
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            self._version = None
+            return
+        self._version = meta.get("version")
+        self.rows = meta.get("rows", 0)
+        for column in STRING_COLUMNS:
+            self.strings[column] = meta.get("strings", {}).get(column, [])
+
+    def _map_column(self, name):
+        """Map a column file and cast it to its typecode."""
+        import array
+
+        typecode = COLUMNS[name]
+        itemsize = array.array(typecode).itemsize
+        path = self.table_dir / f"{name}.col"
+        size = self.rows * itemsize
+        if size == 0 or not path.exists():
+            return array.array(typecode)
+
+        import mmap
+
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapping)
+        view = memoryview(mapping)[:size].cast(typecode)
+        if sys.byteorder != "little":
+            # Columns are stored little-endian; swap on big-endian hosts
+            values = array.array(typecode, view)
+            values.byteswap()
+            view.release()
+            return values
+        return view
+
+    def _reset(self):
+        """Drop all rows."""
+        import array
+
+        self.strings = {column: [] for column in STRING_COLUMNS}
+        self._ids = {}
+        self._version = TABLE_VERSION
+        self._replace_columns({name: array.array(typecode) for name, typecode in COLUMNS.items()}, [])
+
+    def _retain(self, rows):
+        """Rewrite the table keeping only the given row numbers."""
+        import array
+
+        kept = {}
+        for name, typecode in COLUMNS.items():
+            kept[name] = array.array(typecode, self._take(name, rows))
+        names = self.names()
+        # String tables are kept as-is so the surviving ids stay valid
+        self._replace_columns(kept, [names[i] for i in rows])
+
+    def _replace_columns(self, columns, names):
+        """Atomically replace every file with the given rows, then meta.json."""
+        from utils import atomic_write_bytes, atomic_write_text
+
+        self.close()
+        self.table_dir.mkdir(parents=True, exist_ok=True)
+        for name, values in columns.items():
+            if sys.byteorder != "little":
+                values.byteswap()
+            atomic_write_bytes(self.table_dir / f"{name}.col", values.tobytes())
+        atomic_write_text(self.names_path, "".join(f"{n}\n" for n in names))
+        self._names = names
+        self.rows = len(names)
+        self._write_meta()
+
+    def _append(self, headers):
+        """Append rows for (filename, frontmatter) pairs."""
+        import array
+
+        self.close()
+        self.table_dir.mkdir(parents=True, exist_ok=True)
+        new_columns = {name: array.array(typecode) for name, typecode in COLUMNS.items()}
+        new_names = []
+        for name, frontmatter in headers:
+            row = episode_row(frontmatter or {})
+            new_names.append(name)
+            new_columns["timestamp"].append(row["timestamp"])
+            for column in STRING_COLUMNS:
+                ids = self._string_ids(column)
+                value = row[column]
+                if value not in ids:
+                    ids[value] = len(self.strings[column])
+                    self.strings[column].append(value)
+                new_columns[column].append(ids[value])
+
+        self._append_columns(new_columns, new_names)
+
+    def _append_columns(self, new_columns, new_names):
+        """Append column arrays and their filenames, then commit meta.json."""
+        # Trim anything written past the committed row count (e.g. after a
+        # crash between appending columns and rewriting meta.json)
+        for name, values in new_columns.items():
+            path = self.table_dir / f"{name}.col"
+            with open(path, "ab") as f:
+                f.truncate(self.rows * values.itemsize)
+                if sys.byteorder != "little":
+                    values.byteswap()
+                values.tofile(f)
+
+        names = self.names()
+        with open(self.names_path, "ab") as f:
+            f.truncate(sum(len(n.encode("utf-8")) + 1 for n in names))
+            f.write("".join(f"{n}\n" for n in new_names).encode("utf-8"))
+
+        self._names = names + new_names
+        self.rows += len(new_names)
+        self._write_meta()
+
+    def _write_meta(self):
+        """Atomically replace meta.json."""
+        from utils import atomic_write_text
+
+        meta = {"version": TABLE_VERSION, "rows": self.rows, "strings": self.strings}
+        atomic_write_text(self.meta_path, json.dumps(meta))
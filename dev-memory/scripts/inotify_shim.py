@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Minimal Linux inotify binding through ctypes.
+
+Only what the repository watcher needs: add/remove directory watches and
+read decoded events from a file descriptor that can be waited on with
+``select``. ``Inotify.available()`` is False on other platforms or when
+libc lacks inotify, so callers can fall back to polling.
+"""
+
+import os
+import struct
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+_EVENT = struct.Struct("iIII")
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        import ctypes
+        import ctypes.util
+
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        _libc = libc
+    return _libc
+
+
+class Inotify:
+    """An inotify instance; use as a context manager or close() it."""
+
+    def __init__(self):
+        libc = _load_libc()
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            import ctypes
+
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.paths = {}
+
+    @staticmethod
+    def available():
+        """True if inotify can be used on this system."""
+        import sys
+
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            libc = _load_libc()
+            return hasattr(libc, "inotify_init1")
+        except OSError:
+            return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def add_watch(self, path, mask):
+        """
+        Watch a directory.
+
+        Returns:
+            int: Watch descriptor, or -1 if the path could not be watched
+        """
+        wd = _load_libc().inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd >= 0:
+            self.paths[wd] = str(path)
+        return wd
+
+    def rm_watch(self, wd):
+        if self.paths.pop(wd, None) is not None:
+            _load_libc().inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout=None):
+        """
+        Wait up to ``timeout`` seconds (None: forever) for events.
+
+        Returns:
+            list: (watched directory, mask, name) tuples, empty on timeout
+        """
+        import select
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_IGNORED:
+                self.paths.pop(wd, None)
+                continue
+            events.append((self.paths.get(wd), mask, name))
+        return events
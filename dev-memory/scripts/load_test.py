@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Multi-machine load test for the memory write path.
+
+Creates a local bare remote and N working clones of a throwaway config
+repository. Each clone plays one machine (its own ``--machine``/``--os``)
+and runs concurrent ``save`` and ``describe-repo`` operations through
+ManageMemory, so contention on the shared remote shows up exactly as it
+would across a fleet. Reports throughput, latency percentiles, push
+rejections, retries and rebase conflicts.
+"""
+
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+OPERATIONS = ("save", "describe-repo")
+OS_TYPES = ("linux", "windows", "wsl")
+
+
+def _git(*args, cwd=None):
+    result = subprocess.run(["git"] + list(args), cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"git {args[0]} failed: {result.stderr}")
+    return result.stdout
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (None if empty)."""
+    if not sorted_values:
+        return None
+    rank = max(int(-(-pct * len(sorted_values) // 100)), 1)
+    return sorted_values[rank - 1]
+
+
+class LoadTest:
+    """Drive concurrent writers from simulated machines at a shared remote."""
+
+    def __init__(self, work_dir, clones=3, workers=2, repos=5):
+        """
+        Initialize the harness.
+
+        Args:
+            work_dir: Empty directory to build the remote and clones in
+            clones: Number of simulated machines (one clone each)
+            workers: Concurrent writers per machine
+            repos: Number of source repositories the operations refer to
+        """
+        self.work_dir = Path(work_dir).resolve()
+        self.remote = self.work_dir / "remote.git"
+        self.clone_count = clones
+        self.workers = workers
+        self.repo_count = repos
+        self.clones = []
+        self.repos = []
+
+    def setup(self):
+        """Create the bare remote, seed it, clone it per machine and add source repos."""
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        _git("-c", "init.defaultBranch=main", "init", "--bare", "--quiet", str(self.remote))
+
+        seed = self.work_dir / "seed"
+        _git("-c", "init.defaultBranch=main", "init", "--quiet", str(seed))
+        memory_dir = seed / "domains" / "dev" / "memory"
+        for name in ("episodes", "repositories"):
+            (memory_dir / name).mkdir(parents=True, exist_ok=True)
+            (memory_dir / name / ".gitkeep").write_text("", encoding="utf-8")
+        _git("-c", "user.name=seed", "-c", "user.email=seed@localhost",
+             "-C", str(seed), "add", "-A")
+        _git("-c", "user.name=seed", "-c", "user.email=seed@localhost",
+             "-C", str(seed), "commit", "--quiet", "-m", "Seed memory")
+        _git("-C", str(seed), "remote", "add", "origin", str(self.remote))
+        _git("-C", str(seed), "push", "--quiet", "-u", "origin", "main")
+
+        for i in range(self.clone_count):
+            machine = f"load-machine-{i}"
+            path = self.work_dir / "clones" / machine
+            _git("clone", "--quiet", str(self.remote), str(path))
+            _git("-C", str(path), "config", "user.name", machine)
+            _git("-C", str(path), "config", "user.email", f"{machine}@localhost")
+            self.clones.append((machine, OS_TYPES[i % len(OS_TYPES)], path))
+
+        for i in range(self.repo_count):
+            path = self.work_dir / "repos" / f"project-{i}"
+            _git("init", "--quiet", str(path))
+            _git("-C", str(path), "remote", "add", "origin", f"https://example.invalid/project-{i}.git")
+            self.repos.append(str(path))
+
+    def run(self, operations=20, rate=0.0, describe_ratio=0.2, on_duplicate="flag", seed=None):
+        """
+        Run the workload.
+
+        Args:
+            operations: Operations per worker
+            rate: Target operations per second across all workers (0: no limit)
+            describe_ratio: Fraction of operations that are describe-repo
+            on_duplicate: Near-duplicate policy passed to save
+            seed: Random seed for a reproducible operation mix
+
+        Returns:
+            dict: Throughput, latency percentiles (ms) per operation, push
+            rejections, retries, conflicts and errors
+        """
+        import contextlib
+        import io
+        import random
+
+        from manage_memory import ManageMemory
+
+        if not self.clones:
+            self.setup()
+
+        total_workers = len(self.clones) * self.workers
+        interval = total_workers / rate if rate > 0 else 0.0
+        samples = []
+        failures = []
+        retries = [0]
+        record = threading.Lock()
+
+        def worker(index, machine, os_type, clone):
+            rng = random.Random(None if seed is None else seed + index)
+            memory = ManageMemory(clone)
+            for n in range(operations):
+                if interval:
+                    delay = start + (n * total_workers + index) / rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                op = "describe-repo" if rng.random() < describe_ratio else "save"
+                repo_path = rng.choice(self.repos)
+                before = memory.git_sync.push_retries
+                began = time.perf_counter()
+                try:
+                    if op == "save":
+                        memory.save_episode(
+                            detail_level="brief",
+                            repo_path=repo_path,
+                            branch="main",
+                            commit=f"{rng.getrandbits(40):010x}",
+                            machine=machine,
+                            os=os_type,
+                            summary=f"{machine} session {n}: {rng.getrandbits(64):016x}",
+                            on_duplicate=on_duplicate,
+                        )
+                    else:
+                        memory.describe_repo(
+                            repo_path=repo_path,
+                            description=f"Described by {machine} ({n})",
+                            machine=machine,
+                            os=os_type,
+                        )
+                    error = None
+                except Exception as e:
+                    error = str(e)
+                elapsed = time.perf_counter() - began
+                with record:
+                    retries[0] += memory.git_sync.push_retries - before
+                    samples.append((op, elapsed))
+                    if error is not None:
+                        failures.append((op, error))
+
+        threads = []
+        index = 0
+        for machine, os_type, clone in self.clones:
+            for _ in range(self.workers):
+                threads.append(threading.Thread(
+                    target=worker, args=(index, machine, os_type, clone), daemon=True
+                ))
+                index += 1
+
+        # ManageMemory reports progress on stdout; keep it out of the report
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - start
+
+        return self._report(samples, failures, retries[0], wall)
+
+    def verify(self):
+        """
+        Check that every clone's commits reached the remote.
+
+        Returns:
+            dict: Commit count on the remote and clones that are not in sync
+        """
+        remote_head = _git("-C", str(self.remote), "rev-parse", "main").strip()
+        diverged = []
+        for machine, _, clone in self.clones:
+            _git("-C", str(clone), "fetch", "--quiet")
+            if _git("-C", str(clone), "rev-list", "--count", "origin/main..HEAD").strip() != "0":
+                diverged.append(machine)
+        commits = int(_git("-C", str(self.remote), "rev-list", "--count", remote_head).strip())
+        return {"remote_commits": commits, "unpushed_clones": diverged}
+
+    def _report(self, samples, failures, push_retries, wall):
+        latency = {}
+        for op in OPERATIONS + ("all",):
+            values = sorted(
+                elapsed * 1000 for name, elapsed in samples if op in ("all", name)
+            )
+            if not values:
+                continue
+            latency[op] = {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 1),
+                "p99": round(percentile(values, 99), 1),
+                "max": round(values[-1], 1),
+            }
+
+        conflicts = [e for _, e in failures if "pull --rebase failed" in e]
+        exhausted = [e for _, e in failures if e.startswith("Git push failed")]
+        completed = len(samples) - len(failures)
+        return {
+            "success": True,
+            "clones": len(self.clones),
+            "workers_per_clone": self.workers,
+            "operations": len(samples),
+            "completed": completed,
+            "elapsed_s": round(wall, 3),
+            "throughput_ops_s": round(completed / wall, 2) if wall else None,
+            "latency_ms": latency,
+            # Every retry follows a rejected push; so does a push that ran out of retries
+            "push_rejections": push_retries + len(exhausted),
+            "push_retries": push_retries,
+            "conflicts": len(conflicts),
+            "errors": len(failures),
+            "error_samples": [f"{op}: {error.splitlines()[0]}" for op, error in failures[:5]],
+        }
+
+
+def main():
+    import argparse
+    import shutil
+    import tempfile
+    from cli import run
+
+    parser = argparse.ArgumentParser(description="Load test the memory write path")
+    parser.add_argument("command", choices=["run"])
+    parser.add_argument("--work-dir", help="Directory for the remote and clones (default: a temp dir)")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory afterwards")
+    parser.add_argument("--clones", type=int, default=3, help="Simulated machines")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent writers per machine")
+    parser.add_argument("--operations", type=int, default=20, help="Operations per writer")
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="Target operations/second across all writers (0: unlimited)")
+    parser.add_argument("--describe-ratio", type=float, default=0.2,
+                        help="Fraction of operations that are describe-repo")
+    parser.add_argument("--repos", type=int, default=5, help="Source repositories to write about")
+    parser.add_argument("--on-duplicate", default="flag", choices=["flag", "skip", "ignore"])
+    parser.add_argument("--seed", type=int, help="Random seed for the operation mix")
+
+    args = parser.parse_args()
+
+    def load_test():
+        work_dir = args.work_dir or tempfile.mkdtemp(prefix="dev-memory-load-")
+        harness = LoadTest(work_dir, clones=args.clones, workers=args.workers, repos=args.repos)
+        try:
+            harness.setup()
+            result = harness.run(
+                operations=args.operations,
+                rate=args.rate,
+                describe_ratio=args.describe_ratio,
+                on_duplicate=args.on_duplicate,
+                seed=args.seed,
+            )
+            result.update(harness.verify())
+            result["work_dir"] = str(harness.work_dir) if args.keep else None
+            return result
+        finally:
+            if not args.keep:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    run(load_test)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,26 +3,73 @@
 Core memory operations: save episodes, manage repository metadata.
 """
 
-import sys
-import json
-import subprocess
+import functools
+import os
 from pathlib import Path
 from datetime import datetime, UTC
-import yaml
 
-from sync_git import SyncGit
-from utils import generate_episode_id, normalize_repo_slug
+import metrics
+from utils import (
+    AtomicWriter,
+    dump_frontmatter,
+    encode_episode_body,
+    generate_episode_id,
+    get_machine_id,
+    normalize_repo_slug,
+    split_frontmatter,
+    utc_now_iso,
+)
+
+
+EPISODE_REQUIRED_FIELDS = ("repo_path", "branch", "commit", "machine", "os", "summary")
+
+# Default write durability (none, batch, full); see utils.AtomicWriter
+DEFAULT_DURABILITY = os.environ.get("DEV_MEMORY_DURABILITY", "batch")
+# Default episode body storage (none, zlib, lzma); see utils.encode_episode_body
+DEFAULT_COMPRESSION = os.environ.get("DEV_MEMORY_COMPRESSION", "none")
+
+
+def _locked(method):
+    """
+    Run a write operation under the config repo's writer lock.
+
+    Concurrent skills on one machine then take turns on the working tree
+    and git index. Batched writes still pending when the operation ends are
+    flushed, or discarded if it failed, and access log lines it appended
+    but did not commit are taken back. Push retries made during the call
+    are reported in the result as ``push_retries``. Its duration and
+    outcome are recorded in the metrics.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with metrics.measure("manage", method.__name__), self.git_sync.lock():
+            before = self.git_sync.push_retries
+            try:
+                result = method(self, *args, **kwargs)
+            except BaseException:
+                self.writer.abort()
+                self._rollback_accesses()
+                raise
+            self.writer.flush()
+        if isinstance(result, dict):
+            result["push_retries"] = self.git_sync.push_retries - before
+        return result
+    return wrapper
 
 
 class ManageMemory:
     """Manage memory episodes and repository metadata."""
 
-    def __init__(self, config_repo_path):
+    def __init__(self, config_repo_path, durability=None, compression=None):
         """
         Initialize memory manager.
 
         Args:
             config_repo_path: Path to yoshiwatanabe-configurations repository
+            durability: Write durability, none, batch or full (default:
+                $DEV_MEMORY_DURABILITY or batch)
+            compression: Storage of large episode bodies, none, zlib or lzma
+                (default: $DEV_MEMORY_COMPRESSION or none)
         """
         self.config_repo = Path(config_repo_path).resolve()
         self.dev_domain = self.config_repo / "domains" / "dev"
@@ -30,14 +77,36 @@ class ManageMemory:
         self.episodes_dir = self.memory_dir / "episodes"
         self.repos_dir = self.memory_dir / "repositories"
         self.machines_dir = self.memory_dir / "machines"
-
-        # Ensure directories exist
+        self.access_dir = self.memory_dir / "access"
+        self.packs_dir = self.episodes_dir / "packs"
+        self.writer = AtomicWriter(durability or DEFAULT_DURABILITY)
+        self.compression = compression or DEFAULT_COMPRESSION
+        self._git_sync = None
+        # Access logs appended since the last commit: {path: size before, or None}
+        self._appended_logs = {}
+
+    @property
+    def git_sync(self):
+        """SyncGit for the config repo, created (and validated) on first use."""
+        if self._git_sync is None:
+            from sync_git import SyncGit
+
+            self._git_sync = SyncGit(self.config_repo)
+        return self._git_sync
+
+    def _commit(self, files, message):
+        """Flush batched writes, then commit and push the given files."""
+        self.writer.flush()
+        self.git_sync.commit_and_push(files=files, message=message)
+        self._appended_logs = {}
+
+    def _ensure_dirs(self):
+        """Create the memory directories; only write paths need them."""
         self.episodes_dir.mkdir(parents=True, exist_ok=True)
         self.repos_dir.mkdir(parents=True, exist_ok=True)
         self.machines_dir.mkdir(parents=True, exist_ok=True)
 
-        self.git_sync = SyncGit(self.config_repo)
-
+    @_locked
     def save_episode(self, **kwargs):
         """
         Save a memory episode.
@@ -53,76 +122,60 @@ class ManageMemory:
             keywords: str - comma-separated keywords (optional)
             tags: str - comma-separated tags (optional)
             worktree: str - worktree path (optional)
+            on_duplicate: str - what to do when a near-duplicate episode
+                already exists: flag (default, save and report it), skip
+                (keep the existing episode and save nothing) or ignore
+                (do not check)
 
         Returns:
-            dict: Result with episode_id, filepath, synced status
+            dict: Result with episode_id, filepath, synced status and any
+            near_duplicates
         """
         # Note: No automatic pull - users can pull manually when needed
         # If push fails due to being behind, git will show clear error
+        self._ensure_dirs()
 
         # Generate episode metadata
         episode_id = generate_episode_id()
-        timestamp = datetime.now(UTC).isoformat().replace('+00:00', 'Z')
-        repo_slug = normalize_repo_slug(kwargs["repo_path"], kwargs["machine"])
-
-        # Build filename
-        date_str = datetime.now(UTC).strftime("%Y-%m-%d")
-        filename = f"{date_str}_{kwargs['machine']}_{kwargs['os']}_{repo_slug}_{episode_id}.md"
-        filepath = self.episodes_dir / filename
-
-        # Get remote URL
+        now = datetime.now(UTC)
         remote_url = self._get_remote_url(kwargs["repo_path"])
+        repo_slug, filename, content = self._build_episode(episode_id, now, kwargs, remote_url)
+        filepath = self.episodes_dir / filename
 
-        # Build YAML frontmatter
-        frontmatter = {
-            "type": "memory-episode",
-            "version": "1.0",
-            "id": episode_id,
-            "timestamp": timestamp,
-            "machine": kwargs["machine"],
-            "os": kwargs["os"],
-            "repository": {
-                "name": repo_slug,
-                "path": kwargs["repo_path"],
-                "remote": remote_url,
-                "branch": kwargs["branch"],
-                "commit": kwargs["commit"],
-            },
-            "context": {
-                "detail_level": kwargs.get("detail_level", "normal"),
-                "tags": kwargs.get("tags", "").split(",") if kwargs.get("tags") else [],
-            },
-            "summary": kwargs["summary"],
-            "keywords": kwargs.get("keywords", "").split(",") if kwargs.get("keywords") else [],
-        }
-
-        if kwargs.get("worktree"):
-            frontmatter["repository"]["worktree"] = kwargs["worktree"]
+        # Look for near-duplicates before writing anything
+        on_duplicate = kwargs.get("on_duplicate") or "flag"
+        duplicates = []
+        sig = None
+        if on_duplicate != "ignore":
+            duplicates, sig = self._find_near_duplicates(filename, content)
+            if duplicates and on_duplicate == "skip":
+                print(f"Skipped near-duplicate of: {duplicates[0]['episode']}")
+                return {
+                    "success": True,
+                    "skipped": True,
+                    "duplicate_of": duplicates[0]["episode"],
+                    "near_duplicates": duplicates,
+                    "synced": False,
+                }
 
         # Write episode file
-        content = f"---\n{yaml.dump(frontmatter, default_flow_style=False, sort_keys=False)}---\n\n"
-        content += f"# Memory Episode: {kwargs['summary']}\n\n"
-        content += "## Context\n\n"
-        content += f"- **Machine:** {kwargs['machine']}\n"
-        content += f"- **OS:** {kwargs['os']}\n"
-        content += f"- **Repository:** {repo_slug}\n"
-        content += f"- **Branch:** {kwargs['branch']}\n"
-        content += f"- **Commit:** {kwargs['commit']}\n\n"
-        content += "## Summary\n\n"
-        content += f"{kwargs['summary']}\n"
-
-        filepath.write_text(content, encoding="utf-8")
+        self.writer.write_text(filepath, encode_episode_body(content, self.compression))
         print(f"Created episode: {filepath.relative_to(self.config_repo)}")
 
-        # Update repository metadata
-        self._update_repo_metadata(repo_slug, kwargs, remote_url)
+        # Record the access in this machine's log instead of rewriting the repository file
+        files = [str(filepath.relative_to(self.config_repo))]
+        files.extend(self._record_accesses(kwargs["machine"], [(repo_slug, now)]))
 
         # Commit and push
         print("Committing and pushing changes...")
-        self.git_sync.commit_and_push(
-            files=[str(filepath.relative_to(self.config_repo))],
+        self._commit(
+            files=files,
             message=f"Add memory episode: {kwargs['summary'][:50]}"
         )
+        metrics.inc("dev_memory_episodes_saved_total")
+        self._record_timeline([(repo_slug, now, kwargs["branch"], filename)])
+        if sig is not None:
+            self._index_signature(filename, sig)
 
         # Return result
         return {
@@ -130,8 +183,347 @@ class ManageMemory:
             "episode_id": episode_id,
             "filepath": str(filepath.relative_to(self.config_repo)),
             "synced": True,
+            "near_duplicates": duplicates,
+        }
+
+    @_locked
+    def import_episodes(self, input_path, workers=8):
+        """
+        Bulk import episodes from a JSONL file in a single commit.
+
+        Each line is a JSON object with the same fields as ``save_episode``
+        plus an optional ISO 8601 ``timestamp`` (default: now). ``keywords``
+        and ``tags`` may be comma-separated strings or lists; ``remote`` may
+        be given to skip the git lookup for that repository.
+
+        Args:
+            input_path: Path to the JSONL file
+            workers: Number of threads used to write episode files
+
+        Returns:
+            dict: Result with imported count, repositories touched and errors
+        """
+        import json
+        from concurrent.futures import ThreadPoolExecutor
+
+        self._ensure_dirs()
+
+        # Parse and validate every record before writing anything
+        records = []
+        errors = []
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    records.append((self._validate_episode_record(record), record))
+                except ValueError as e:
+                    errors.append(f"line {line_no}: {e}")
+
+        if errors:
+            return {"success": False, "imported": 0, "errors": errors}
+
+        # Build episodes; remote URLs are looked up once per repository path
+        remotes = {}
+        latest = {}
+        episodes = []
+        timeline = []
+        for when, record in records:
+            repo_path = record["repo_path"]
+            if repo_path not in remotes:
+                remotes[repo_path] = record.get("remote") or self._get_remote_url(repo_path)
+            repo_slug, filename, content = self._build_episode(
+                generate_episode_id(), when, record, remotes[repo_path]
+            )
+            content = encode_episode_body(content, self.compression)
+            episodes.append((self.episodes_dir / filename, content))
+            timeline.append((repo_slug, when, record["branch"], filename))
+            if repo_slug not in latest or when > latest[repo_slug][0]:
+                latest[repo_slug] = (when, record["machine"])
+
+        def write(episode):
+            filepath, content = episode
+            self.writer.write_text(filepath, content)
+            return str(filepath.relative_to(self.config_repo))
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            files = list(pool.map(write, episodes))
+        print(f"Created {len(files)} episodes")
+
+        # One logged access per repository, at its newest episode
+        by_machine = {}
+        for repo_slug, (when, machine) in latest.items():
+            by_machine.setdefault(machine, []).append((repo_slug, when))
+        for machine, accesses in sorted(by_machine.items()):
+            files.extend(self._record_accesses(machine, accesses))
+
+        if files:
+            print("Committing and pushing changes...")
+            self._commit(
+                files=files,
+                message=f"Import {len(episodes)} memory episodes"
+            )
+            metrics.inc("dev_memory_episodes_saved_total", len(episodes))
+            self._record_timeline(timeline)
+
+        return {
+            "success": True,
+            "imported": len(episodes),
+            "repositories": sorted(latest),
+            "errors": [],
+        }
+
+    @_locked
+    def compact_episodes(self, keep_months=3):
+        """
+        Roll loose episodes of closed months into monthly pack files.
+
+        Args:
+            keep_months: Number of most recent months left as loose files
+                (0 packs every month before the current one)
+
+        Returns:
+            dict: Result with packed months and episode count
+        """
+        from episode_pack import EpisodePack, index_path_for, month_cutoff, month_of, write_pack
+
+        cutoff = month_cutoff(keep_months)
+
+        by_month = {}
+        for episode_file in self.episodes_dir.glob("*.md"):
+            month = month_of(episode_file.name)
+            if month and month < cutoff:
+                by_month.setdefault(month, []).append(episode_file)
+
+        files = []
+        packed = 0
+        for month, loose in sorted(by_month.items()):
+            pack_path = self.packs_dir / f"{month}.pack"
+            loose_names = {f.name for f in loose}
+
+            # Merge with an existing pack for the same month
+            episodes = {}
+            if pack_path.exists():
+                with EpisodePack(pack_path) as pack:
+                    for name in pack.names():
+                        if name not in loose_names:
+                            with pack.view(name) as view:
+                                episodes[name] = bytes(view)
+            for episode_file in loose:
+                episodes[episode_file.name] = episode_file.read_bytes()
+
+            write_pack(pack_path, sorted(episodes.items()))
+            self.writer.sync(pack_path)
+            for episode_file in loose:
+                episode_file.unlink()
+                files.append(str(episode_file.relative_to(self.config_repo)))
+            files.append(str(pack_path.relative_to(self.config_repo)))
+            # Stages the removal of a legacy sidecar index, if there was one
+            files.append(str(index_path_for(pack_path).relative_to(self.config_repo)))
+            packed += len(loose)
+            print(f"Packed {len(loose)} episodes into {pack_path.relative_to(self.config_repo)}")
+
+        if files:
+            print("Committing and pushing changes...")
+            self._commit(
+                files=files,
+                message=f"Pack {packed} memory episodes into {len(by_month)} monthly packs"
+            )
+
+        return {
+            "success": True,
+            "months": sorted(by_month),
+            "episodes_packed": packed,
         }
 
+    @_locked
+    def unpack_episodes(self, month=None):
+        """
+        Restore packed episodes as loose files and remove the packs.
+
+        Args:
+            month: ``YYYY-MM`` of a single pack to unpack (default: all)
+
+        Returns:
+            dict: Result with unpacked months and episode count
+        """
+        from episode_pack import EpisodePack, index_path_for, list_packs
+
+        files = []
+        months = []
+        unpacked = 0
+        for pack_path in list_packs(self.packs_dir):
+            if month and pack_path.stem != month:
+                continue
+
+            with EpisodePack(pack_path) as pack:
+                for name in pack.names():
+                    episode_file = self.episodes_dir / name
+                    # A loose copy wins over the packed one
+                    if not episode_file.exists():
+                        with pack.view(name) as view:
+                            self.writer.write_bytes(episode_file, view)
+                        files.append(str(episode_file.relative_to(self.config_repo)))
+                        unpacked += 1
+
+            # The loose copies must be on disk before their pack goes
+            self.writer.flush()
+            index_path = index_path_for(pack_path)
+            pack_path.unlink()
+            index_path.unlink(missing_ok=True)
+            files.append(str(pack_path.relative_to(self.config_repo)))
+            files.append(str(index_path.relative_to(self.config_repo)))
+            months.append(pack_path.stem)
+            print(f"Unpacked {pack_path.relative_to(self.config_repo)}")
+
+        if files:
+            print("Committing and pushing changes...")
+            self._commit(
+                files=files,
+                message=f"Unpack {unpacked} memory episodes from {len(months)} monthly packs"
+            )
+
+        return {
+            "success": True,
+            "months": months,
+            "episodes_unpacked": unpacked,
+        }
+
+    @_locked
+    def tier_memory(self, episode_months=6, dry_run=False):
+        """
+        Move archived repositories and old episodes to the cold tier.
+
+        Archived repository files move to ``cold/repositories/`` and get a
+        tombstone in its index.json. Loose episodes and packs of months
+        older than ``episode_months`` move to ``cold/episodes/``.
+
+        Args:
+            episode_months: Number of most recent months of episodes kept hot
+            dry_run: Only report what would move
+
+        Returns:
+            dict: Result with moved repositories and episode counts
+        """
+        from access_log import read_latest
+        from cold_tier import cold_dirs, read_repo_tombstones, repo_tombstone, write_repo_tombstones
+        from episode_pack import EpisodePack, index_path_for, list_packs, month_cutoff, month_of, write_pack
+
+        cold_repos_dir, cold_episodes_dir, cold_packs_dir = cold_dirs(self.memory_dir)
+        cutoff = month_cutoff(episode_months)
+        moves = []
+
+        tombstones = read_repo_tombstones(self.memory_dir)
+        accessed = read_latest(self.access_dir)
+        repos = []
+        for repo_file in sorted(self.repos_dir.glob("*.md")):
+            frontmatter, _ = split_frontmatter(repo_file.read_text(encoding="utf-8"))
+            if frontmatter and frontmatter.get("archived", False):
+                repos.append(repo_file.stem)
+                # Tombstones carry the newest access, including one still in a log
+                location = frontmatter.get("location")
+                logged = accessed.get(repo_file.stem, "")
+                if isinstance(location, dict) and logged > str(location.get("last_accessed") or ""):
+                    location["last_accessed"] = logged
+                tombstones[repo_file.stem] = repo_tombstone(frontmatter)
+                moves.append((repo_file, cold_repos_dir / repo_file.name))
+
+        episodes = 0
+        for episode_file in sorted(self.episodes_dir.glob("*.md")):
+            month = month_of(episode_file.name)
+            if month and month < cutoff:
+                episodes += 1
+                moves.append((episode_file, cold_episodes_dir / episode_file.name))
+
+        packs = []
+        merges = []
+        for pack_path in list_packs(self.packs_dir):
+            if pack_path.stem < cutoff:
+                packs.append(pack_path.stem)
+                cold_pack = cold_packs_dir / pack_path.name
+                if cold_pack.exists():
+                    # The month was tiered before and its hot pack re-created
+                    # since (e.g. a backfill): merge instead of replacing
+                    merges.append((pack_path, cold_pack))
+                    continue
+                moves.append((pack_path, cold_pack))
+                index_path = index_path_for(pack_path)
+                if index_path.exists():
+                    moves.append((index_path, cold_packs_dir / index_path.name))
+
+        result = {
+            "success": True,
+            "dry_run": dry_run,
+            "repositories": repos,
+            "episodes": episodes,
+            "packs": packs,
+        }
+        if dry_run or not (moves or merges):
+            return result
+
+        files = []
+        for source, target in moves:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(source, target)
+            files.append(str(source.relative_to(self.config_repo)))
+            files.append(str(target.relative_to(self.config_repo)))
+        for hot_pack, cold_pack in merges:
+            # Same rule as compact_episodes: the hot copy of an episode wins
+            merged = {}
+            for pack_path in (cold_pack, hot_pack):
+                with EpisodePack(pack_path) as pack:
+                    for name in pack.names():
+                        with pack.view(name) as view:
+                            merged[name] = bytes(view)
+            write_pack(cold_pack, sorted(merged.items()))
+            self.writer.sync(cold_pack)
+            for path in (hot_pack, index_path_for(hot_pack)):
+                path.unlink(missing_ok=True)
+                files.append(str(path.relative_to(self.config_repo)))
+            files.append(str(cold_pack.relative_to(self.config_repo)))
+            files.append(str(index_path_for(cold_pack).relative_to(self.config_repo)))
+        self.writer.sync(*{path.parent for move in moves + merges for path in move})
+        if repos:
+            index_path = write_repo_tombstones(self.memory_dir, tombstones)
+            files.append(str(index_path.relative_to(self.config_repo)))
+        print(f"Moved {len(repos)} repositories, {episodes} episodes and {len(packs)} packs to cold storage")
+
+        print("Committing and pushing changes...")
+        self._commit(
+            files=files,
+            message=f"Move {len(repos)} archived repositories and {episodes + len(packs)} episode files to cold storage"
+        )
+        return result
+
+    @_locked
+    def compact_access(self, machine=None):
+        """
+        Fold the repository access logs back into the repository files.
+
+        Every machine's log is folded in, but only this machine's log is
+        emptied; other machines empty their own when they compact, so no two
+        machines ever edit the same log.
+
+        Args:
+            machine: Machine whose log to empty (default: this machine)
+
+        Returns:
+            dict: Result with the updated repository files
+        """
+        files = self._compact_access(machine or get_machine_id())
+        updated = [path for path in files if path.endswith(".md")]
+        if files:
+            print(f"Folded access logs into {len(updated)} repository files")
+            print("Committing and pushing changes...")
+            self._commit(
+                files=files,
+                message=f"Compact repository access logs ({len(updated)} repositories)"
+            )
+        return {"success": True, "updated": len(updated), "files": files}
+
+    @_locked
     def describe_repo(self, **kwargs):
         """
         Add or update repository metadata.
@@ -148,18 +540,17 @@ class ManageMemory:
         """
         # Note: No automatic pull - users can pull manually when needed
         # If push fails due to being behind, git will show clear error
+        self._ensure_dirs()
 
         repo_slug = normalize_repo_slug(kwargs["repo_path"], kwargs["machine"])
         filepath = self.repos_dir / f"{repo_slug}.md"
         remote_url = self._get_remote_url(kwargs["repo_path"])
+        restored = self._restore_cold_repo(repo_slug)
 
         # Load existing metadata if present
         if filepath.exists():
-            content = filepath.read_text(encoding="utf-8")
-            parts = content.split("---\n", 2)
-            if len(parts) >= 3:
-                frontmatter = yaml.safe_load(parts[1])
-            else:
+            frontmatter, _ = split_frontmatter(filepath.read_text(encoding="utf-8"))
+            if frontmatter is None:
                 frontmatter = self._create_repo_frontmatter(
                     repo_slug, remote_url, kwargs["machine"], kwargs["os"], kwargs["repo_path"]
                 )
@@ -179,21 +570,21 @@ class ManageMemory:
             "machine": kwargs["machine"],
             "os": kwargs["os"],
             "path": kwargs["repo_path"],
-            "last_accessed": datetime.now(UTC).isoformat().replace('+00:00', 'Z'),
+            "last_accessed": utc_now_iso(),
         })
 
         # Write file
-        content = f"---\n{yaml.dump(frontmatter, default_flow_style=False, sort_keys=False)}---\n\n"
+        content = dump_frontmatter(frontmatter)
         content += f"# Repository: {repo_slug}\n\n"
         content += f"## Description\n\n{kwargs['description']}\n\n"
 
-        filepath.write_text(content, encoding="utf-8")
+        self.writer.write_text(filepath, content)
         print(f"Updated repository: {filepath.relative_to(self.config_repo)}")
 
         # Commit and push
         print("Committing and pushing changes...")
-        self.git_sync.commit_and_push(
-            files=[str(filepath.relative_to(self.config_repo))],
+        self._commit(
+            files=[str(filepath.relative_to(self.config_repo))] + restored,
             message=f"Update repository metadata: {repo_slug}"
         )
 
@@ -203,6 +594,7 @@ class ManageMemory:
             "filepath": str(filepath.relative_to(self.config_repo)),
         }
 
+    @_locked
     def archive_repo(self, **kwargs):
         """
         Archive (hide) a repository.
@@ -226,31 +618,14 @@ class ManageMemory:
                 "error": f"Repository '{repo_slug}' not found in memory system"
             }
 
-        # Load existing metadata
-        content = filepath.read_text(encoding="utf-8")
-        parts = content.split("---\n", 2)
-        if len(parts) < 3:
+        # Load existing metadata and mark as archived
+        if not self._set_archived(filepath, True, kwargs.get("reason")):
             return {"success": False, "error": "Invalid repository metadata format"}
-
-        frontmatter = yaml.safe_load(parts[1])
-
-        # Mark as archived
-        frontmatter["archived"] = True
-        frontmatter["archived_date"] = datetime.now(UTC).isoformat().replace('+00:00', 'Z')
-        if kwargs.get("reason"):
-            frontmatter["archived_reason"] = kwargs["reason"]
-
-        # Write file
-        new_content = f"---\n{yaml.dump(frontmatter, default_flow_style=False, sort_keys=False)}---\n\n"
-        if len(parts) > 2:
-            new_content += parts[2]
-
-        filepath.write_text(new_content, encoding="utf-8")
         print(f"Archived repository: {filepath.relative_to(self.config_repo)}")
 
         # Commit and push
         print("Committing and pushing changes...")
-        self.git_sync.commit_and_push(
+        self._commit(
             files=[str(filepath.relative_to(self.config_repo))],
             message=f"Archive repository: {repo_slug}"
         )
@@ -262,6 +637,7 @@ class ManageMemory:
             "filepath": str(filepath.relative_to(self.config_repo)),
         }
 
+    @_locked
     def unarchive_repo(self, **kwargs):
         """
         Unarchive (restore) a repository.
@@ -278,39 +654,24 @@ class ManageMemory:
         repo_slug = kwargs["repo_name"]
         filepath = self.repos_dir / f"{repo_slug}.md"
 
+        # Bring the repository back from the cold tier if it was moved there
+        restored = self._restore_cold_repo(repo_slug)
+
         if not filepath.exists():
             return {
                 "success": False,
                 "error": f"Repository '{repo_slug}' not found in memory system"
             }
 
-        # Load existing metadata
-        content = filepath.read_text(encoding="utf-8")
-        parts = content.split("---\n", 2)
-        if len(parts) < 3:
+        # Load existing metadata and unarchive
+        if not self._set_archived(filepath, False):
             return {"success": False, "error": "Invalid repository metadata format"}
-
-        frontmatter = yaml.safe_load(parts[1])
-
-        # Unarchive
-        frontmatter["archived"] = False
-        if "archived_date" in frontmatter:
-            del frontmatter["archived_date"]
-        if "archived_reason" in frontmatter:
-            del frontmatter["archived_reason"]
-
-        # Write file
-        new_content = f"---\n{yaml.dump(frontmatter, default_flow_style=False, sort_keys=False)}---\n\n"
-        if len(parts) > 2:
-            new_content += parts[2]
-
-        filepath.write_text(new_content, encoding="utf-8")
         print(f"Unarchived repository: {filepath.relative_to(self.config_repo)}")
 
         # Commit and push
         print("Committing and pushing changes...")
-        self.git_sync.commit_and_push(
-            files=[str(filepath.relative_to(self.config_repo))],
+        self._commit(
+            files=[str(filepath.relative_to(self.config_repo))] + restored,
             message=f"Unarchive repository: {repo_slug}"
         )
 
@@ -321,8 +682,132 @@ class ManageMemory:
             "filepath": str(filepath.relative_to(self.config_repo)),
         }
 
+    @_locked
+    def bulk_archive(self, archive=True, pattern=None, machine=None, os_type=None, tag=None,
+                     older_than_days=None, reason=None, dry_run=False):
+        """
+        Archive or unarchive every repository matching a policy, in one commit.
+
+        Repositories are selected from the repository index (and, when
+        unarchiving, the cold tier's tombstones) without parsing every
+        metadata file. At least one filter is required.
+
+        Args:
+            archive: True to archive matching repositories, False to unarchive
+            pattern: Glob matched against the slug or repository name
+            machine: Only repositories on this machine
+            os_type: Only repositories on this OS
+            tag: Only repositories with this tag
+            older_than_days: Only repositories not accessed for this many days
+            reason: Archive reason recorded on each repository (archive only)
+            dry_run: Only report what would change
+
+        Returns:
+            dict: Result with the selected repository slugs
+        """
+        import time
+        from query_memory import QueryMemory
+        from repo_index import matches, repo_entry
+
+        if not any(v is not None for v in (pattern, machine, os_type, tag, older_than_days)):
+            raise ValueError("Bulk archive needs at least one of pattern, machine, os, tag, older_than_days")
+
+        filters = {
+            "pattern": pattern,
+            "machine": machine,
+            "os_type": os_type,
+            "tag": tag,
+            "accessed_before": None if older_than_days is None else time.time() - older_than_days * 86400,
+            "archived": not archive,
+        }
+        slugs = QueryMemory(self.config_repo).repo_index().select(**filters)
+        cold = []
+        if not archive:
+            from cold_tier import read_repo_tombstones
+
+            for slug, tombstone in read_repo_tombstones(self.memory_dir).items():
+                if slug not in slugs and matches(slug, repo_entry(tombstone, slug), **filters):
+                    cold.append(slug)
+            slugs = sorted(slugs + cold)
+
+        result = {
+            "success": True,
+            "dry_run": dry_run,
+            "archived": archive,
+            "repositories": slugs,
+            "from_cold": sorted(cold),
+        }
+        if dry_run or not slugs:
+            return result
+
+        files = []
+        for slug in slugs:
+            files.extend(self._restore_cold_repo(slug))
+            filepath = self.repos_dir / f"{slug}.md"
+            if self._set_archived(filepath, archive, reason):
+                files.append(str(filepath.relative_to(self.config_repo)))
+
+        verb = "Archive" if archive else "Unarchive"
+        print(f"{verb}d {len(slugs)} repositories")
+        print("Committing and pushing changes...")
+        self._commit(
+            files=files,
+            message=f"{verb} {len(slugs)} repositories"
+        )
+        return result
+
+    def _set_archived(self, filepath, archived, reason=None):
+        """
+        Set or clear a repository's archived state.
+
+        Returns:
+            bool: False if the file has no valid frontmatter (nothing written)
+        """
+        frontmatter, body = split_frontmatter(filepath.read_text(encoding="utf-8"))
+        if frontmatter is None:
+            return False
+
+        if archived:
+            frontmatter["archived"] = True
+            frontmatter["archived_date"] = utc_now_iso()
+            if reason:
+                frontmatter["archived_reason"] = reason
+        else:
+            frontmatter["archived"] = False
+            frontmatter.pop("archived_date", None)
+            frontmatter.pop("archived_reason", None)
+
+        self.writer.write_text(filepath, dump_frontmatter(frontmatter) + body)
+        return True
+
+    def _restore_cold_repo(self, repo_slug):
+        """
+        Move a repository file back from the cold tier and drop its tombstone.
+
+        Returns:
+            list: Changed paths relative to the repo (empty if it was not cold)
+        """
+        from cold_tier import cold_dirs, read_repo_tombstones, write_repo_tombstones
+
+        cold_file = cold_dirs(self.memory_dir)[0] / f"{repo_slug}.md"
+        filepath = self.repos_dir / f"{repo_slug}.md"
+        if not cold_file.exists() or filepath.exists():
+            return []
+
+        os.replace(cold_file, filepath)
+        tombstones = read_repo_tombstones(self.memory_dir)
+        tombstones.pop(repo_slug, None)
+        index_path = write_repo_tombstones(self.memory_dir, tombstones)
+        print(f"Restored from cold storage: {filepath.relative_to(self.config_repo)}")
+        return [
+            str(cold_file.relative_to(self.config_repo)),
+            str(index_path.relative_to(self.config_repo)),
+        ]
+
     def _get_remote_url(self, repo_path):
         """Get git remote URL for a repository."""
+        import subprocess
+
         try:
             result = subprocess.run(
                 ["git", "-C", repo_path, "remote", "get-url", "origin"],
@@ -334,6 +819,133 @@ class ManageMemory:
         except Exception:
             return ""
 
+    def _build_episode(self, episode_id, when, fields, remote_url):
+        """
+        Render an episode file.
+
+        Args:
+            episode_id: Episode ID from generate_episode_id()
+            when: Aware UTC datetime of the episode
+            fields: Episode fields as accepted by save_episode
+            remote_url: Remote URL of the repository
+
+        Returns:
+            tuple: (repo_slug, filename, content)
+        """
+        timestamp = when.isoformat().replace('+00:00', 'Z')
+        repo_slug = normalize_repo_slug(fields["repo_path"], fields["machine"])
+
+        # Build filename
+        date_str = when.strftime("%Y-%m-%d")
+        filename = f"{date_str}_{fields['machine']}_{fields['os']}_{repo_slug}_{episode_id}.md"
+
+        # Build YAML frontmatter
+        frontmatter = {
+            "type": "memory-episode",
+            "version": "1.0",
+            "id": episode_id,
+            "timestamp": timestamp,
+            "machine": fields["machine"],
+            "os": fields["os"],
+            "repository": {
+                "name": repo_slug,
+                "path": fields["repo_path"],
+                "remote": remote_url,
+                "branch": fields["branch"],
+                "commit": fields["commit"],
+            },
+            "context": {
+                "detail_level": fields.get("detail_level") or "normal",
+                "tags": _split_list(fields.get("tags")),
+            },
+            "summary": fields["summary"],
+            "keywords": _split_list(fields.get("keywords")),
+        }
+
+        if fields.get("worktree"):
+            frontmatter["repository"]["worktree"] = fields["worktree"]
+
+        content = dump_frontmatter(frontmatter)
+        content += f"# Memory Episode: {fields['summary']}\n\n"
+        content += "## Context\n\n"
+        content += f"- **Machine:** {fields['machine']}\n"
+        content += f"- **OS:** {fields['os']}\n"
+        content += f"- **Repository:** {repo_slug}\n"
+        content += f"- **Branch:** {fields['branch']}\n"
+        content += f"- **Commit:** {fields['commit']}\n\n"
+        content += "## Summary\n\n"
+        content += f"{fields['summary']}\n"
+
+        return repo_slug, filename, content
+
+    def _record_timeline(self, records):
+        """
+        Append new episodes to the per-repository timelines.
+
+        Only done once the timelines exist; until then the first
+        resume-context builds them from scratch.
+
+        Args:
+            records: (repo_slug, aware datetime, branch, filename) tuples
+        """
+        from timeline import Timeline
+        from utils import ensure_index_dir
+
+        timeline = Timeline(ensure_index_dir(self.memory_dir, "timeline"))
+        if timeline.built:
+            timeline.append(
+                (slug, when.timestamp(), branch, filename) for slug, when, branch, filename in records
+            )
+
+    def _find_near_duplicates(self, filename, content):
+        """
+        Existing episodes whose content nearly matches a new episode.
+
+        The MinHash index is refreshed first. The new episode is not added
+        to it here: it may never be saved (skipped as a duplicate, or its
+        commit may fail); see _index_signature.
+
+        Returns:
+            tuple: ({"episode", "similarity"} dicts, most similar first;
+            the new episode's signature)
+        """
+        from near_duplicates import episode_text, signature
+        from query_memory import QueryMemory
+
+        frontmatter, body = split_frontmatter(content)
+        sig = signature(episode_text(frontmatter, body))
+        with QueryMemory(self.config_repo).near_duplicate_index() as index:
+            matches = index.find(sig, exclude={filename})
+
+        return [{"episode": name, "similarity": round(score, 3)} for name, score in matches], sig
+
+    def _index_signature(self, filename, sig):
+        """Add a committed episode's signature so the next save does not reparse it."""
+        from query_memory import QueryMemory
+
+        with QueryMemory(self.config_repo).near_duplicate_index(refresh=False) as index:
+            index.add(filename, sig)
+
+    def _validate_episode_record(self, record):
+        """
+        Check an imported episode record and return its timestamp.
+
+        Raises:
+            ValueError: If a required field is missing or the timestamp is invalid
+        """
+        if not isinstance(record, dict):
+            raise ValueError("record must be a JSON object")
+        missing = [f for f in EPISODE_REQUIRED_FIELDS if not record.get(f)]
+        if missing:
+            raise ValueError(f"missing required fields: {', '.join(missing)}")
+
+        if not record.get("timestamp"):
+            return datetime.now(UTC)
+        when = datetime.fromisoformat(str(record["timestamp"]))
+        if when.tzinfo is None:
+            return when.replace(tzinfo=UTC)
+        return when.astimezone(UTC)
+
     def _create_repo_frontmatter(self, repo_slug, remote_url, machine, os_type, repo_path):
         """Create initial repository frontmatter."""
         return {
@@ -348,43 +960,148 @@ class ManageMemory:
                 "machine": machine,
                 "os": os_type,
                 "path": repo_path,
-                "last_accessed": datetime.now(UTC).isoformat().replace('+00:00', 'Z'),
+                "last_accessed": utc_now_iso(),
             },
         }
 
-    def _update_repo_metadata(self, repo_slug, context, remote_url):
-        """Update repository metadata with latest access time."""
+    def _record_accesses(self, machine, accesses):
+        """
+        Append repository accesses to a machine's access log.
+
+        Only repositories with a metadata file are recorded. The log's
+        previous size is remembered until the next commit, so a failed
+        operation can take the lines back (see _rollback_accesses).
+        Compaction is left to the compact-access command, since it
+        rewrites repository files shared with other machines.
+
+        Args:
+            machine: Machine whose log to append to
+            accesses: Iterable of (repo_slug, aware datetime)
+
+        Returns:
+            list: Changed paths relative to the repo
+        """
+        from access_log import COMPACT_BYTES, append_accesses, log_path
+
+        records = [
+            (repo_slug, when.astimezone(UTC).isoformat().replace('+00:00', 'Z'))
+            for repo_slug, when in accesses
+            if (self.repos_dir / f"{repo_slug}.md").exists()
+        ]
+        if not records:
+            return []
+        path = log_path(self.access_dir, machine)
+        if path not in self._appended_logs:
+            self._appended_logs[path] = path.stat().st_size if path.exists() else None
+        append_accesses(self.access_dir, machine, records)
+        if self.writer.durability == "full":
+            self.writer.sync(path)
+        if path.stat().st_size > COMPACT_BYTES:
+            print(f"Access log {path.name} is over {COMPACT_BYTES // 1024} KiB; run compact-access to fold it")
+        return [str(path.relative_to(self.config_repo))]
+
+    def _rollback_accesses(self):
+        """
+        Truncate access logs appended since the last commit back to their
+        previous size.
+
+        Lines that made it into a local commit (a push that failed after
+        committing) are kept; they go out with the next push.
+        """
+        import subprocess
+
+        appended, self._appended_logs = self._appended_logs, {}
+        for path, size in appended.items():
+            relpath = path.relative_to(self.config_repo).as_posix()
+            committed = subprocess.run(
+                ["git", "-C", str(self.config_repo), "cat-file", "-s", f"HEAD:{relpath}"],
+                capture_output=True, text=True,
+            )
+            if committed.returncode == 0 and path.exists() and int(committed.stdout) == path.stat().st_size:
+                continue
+            # Unstage it too, in case the failure came after staging
+            subprocess.run(["git", "-C", str(self.config_repo), "reset", "-q", "--", relpath],
+                           capture_output=True)
+            if size is None:
+                path.unlink(missing_ok=True)
+            else:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+    def _compact_access(self, machine):
+        """
+        Fold every access log into the repository files and empty ``machine``'s log.
+
+        Returns:
+            list: Changed paths relative to the repo
+        """
+        from access_log import log_path, read_latest
+
+        files = []
+        for repo_slug, accessed in sorted(read_latest(self.access_dir).items()):
+            updated = self._update_repo_metadata(repo_slug, accessed)
+            if updated:
+                files.append(updated)
+
+        path = log_path(self.access_dir, machine)
+        if path.exists():
+            path.unlink()
+            self.writer.sync(path.parent)
+            files.append(str(path.relative_to(self.config_repo)))
+        return files
+
+    def _update_repo_metadata(self, repo_slug, accessed):
+        """
+        Update repository metadata with a newer access time.
+
+        Args:
+            repo_slug: Repository slug
+            accessed: ISO 8601 timestamp; an older value never replaces a
+                newer last_accessed
+
+        Returns:
+            str: Path of the updated file relative to the repo, or None
+        """
         filepath = self.repos_dir / f"{repo_slug}.md"
+        if not filepath.exists():
+            return None
 
-        if filepath.exists():
-            content = filepath.read_text(encoding="utf-8")
-            parts = content.split("---\n", 2)
-            if len(parts) >= 3:
-                frontmatter = yaml.safe_load(parts[1])
-
-                # Update last_accessed for this location
-                if "location" not in frontmatter:
-                    frontmatter["location"] = {}
-                frontmatter["location"]["last_accessed"] = datetime.now(UTC).isoformat().replace('+00:00', 'Z')
-
-                # Re-write file
-                new_content = f"---\n{yaml.dump(frontmatter, default_flow_style=False, sort_keys=False)}---\n\n"
-                if len(parts) > 2:
-                    new_content += parts[2]
-                filepath.write_text(new_content, encoding="utf-8")
-
-                # Add to git
-                self.git_sync.commit_and_push(
-                    files=[str(filepath.relative_to(self.config_repo))],
-                    message=f"Update repository access time: {repo_slug}"
-                )
+        frontmatter, body = split_frontmatter(filepath.read_text(encoding="utf-8"))
+        if frontmatter is None:
+            return None
+        # Legacy files without a location get one for the access time
+        location = frontmatter.setdefault("location", {})
+        if str(location.get("last_accessed") or "") >= accessed:
+            return None
+        location["last_accessed"] = accessed
+
+        # dump_frontmatter ends with a blank line; don't add one per compaction
+        self.writer.write_text(filepath, dump_frontmatter(frontmatter) + body.lstrip("\n"))
+        return str(filepath.relative_to(self.config_repo))
+
+
+def _split_list(value):
+    """Normalize a comma-separated string or list field to a list."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return value.split(",")
+    return list(value)
 
 
 def main():
     import argparse
+    from cli import run
 
     parser = argparse.ArgumentParser(description="Manage memory operations")
-    parser.add_argument("command", choices=["save", "describe-repo", "archive-repo", "unarchive-repo"])
+    parser.add_argument(
+        "command",
+        choices=[
+            "save", "import-episodes", "compact-episodes", "unpack-episodes", "tier-memory",
+            "describe-repo", "archive-repo", "unarchive-repo", "bulk-archive", "bulk-unarchive",
+            "compact-access",
+        ],
+    )
     parser.add_argument("--config-repo", required=True, help="Path to config repository")
     parser.add_argument("--detail-level", default="normal")
     parser.add_argument("--repo-path", help="Repository path")
@@ -399,14 +1116,33 @@ def main():
     parser.add_argument("--description", help="Repository description")
     parser.add_argument("--repo-name", help="Repository name/slug")
     parser.add_argument("--reason", help="Reason for archiving (optional)")
+    parser.add_argument("--input", help="JSONL file of episode records (import-episodes)")
+    parser.add_argument("--workers", type=int, default=8, help="Writer threads (import-episodes)")
+    parser.add_argument("--keep-months", type=int, default=3,
+                        help="Recent months left as loose files (compact-episodes)")
+    parser.add_argument("--month", help="YYYY-MM of a single pack (unpack-episodes)")
+    parser.add_argument("--episode-months", type=int, default=6,
+                        help="Recent months of episodes kept hot (tier-memory)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    parser.add_argument("--on-duplicate", default="flag", choices=["flag", "skip", "ignore"],
+                        help="Handling of near-duplicate episodes (save)")
+    parser.add_argument("--pattern", help="Glob over repository slugs/names (bulk-archive, bulk-unarchive)")
+    parser.add_argument("--tag", help="Only repositories with this tag (bulk-archive, bulk-unarchive)")
+    parser.add_argument("--older-than-days", type=int,
+                        help="Only repositories not accessed for this many days (bulk-archive, bulk-unarchive)")
+    parser.add_argument("--durability", choices=["none", "batch", "full"],
+                        help="fsync policy for written files (default: $DEV_MEMORY_DURABILITY or batch)")
+    parser.add_argument("--compression", choices=["none", "zlib", "lzma"],
+                        help="Store large episode bodies compressed (save, import-episodes; "
+                             "default: $DEV_MEMORY_COMPRESSION or none)")
 
     args = parser.parse_args()
 
-    ops = ManageMemory(args.config_repo)
+    ops = ManageMemory(args.config_repo, durability=args.durability, compression=args.compression)
 
-    try:
+    def handler():
         if args.command == "save":
-            result = ops.save_episode(
+            return ops.save_episode(
                 detail_level=args.detail_level,
                 repo_path=args.repo_path,
                 branch=args.branch,
@@ -417,9 +1153,18 @@ def main():
                 keywords=args.keywords,
                 tags=args.tags,
                 worktree=args.worktree,
+                on_duplicate=args.on_duplicate,
             )
+        elif args.command == "import-episodes":
+            return ops.import_episodes(args.input, workers=args.workers)
+        elif args.command == "compact-episodes":
+            return ops.compact_episodes(keep_months=args.keep_months)
+        elif args.command == "unpack-episodes":
+            return ops.unpack_episodes(month=args.month)
+        elif args.command == "tier-memory":
+            return ops.tier_memory(episode_months=args.episode_months, dry_run=args.dry_run)
         elif args.command == "describe-repo":
-            result = ops.describe_repo(
+            return ops.describe_repo(
                 repo_path=args.repo_path,
                 description=args.description,
                 tags=args.tags,
@@ -427,23 +1172,29 @@ def main():
                 os=args.os,
             )
         elif args.command == "archive-repo":
-            result = ops.archive_repo(
+            return ops.archive_repo(
                 repo_name=args.repo_name,
                 reason=args.reason,
             )
         elif args.command == "unarchive-repo":
-            result = ops.unarchive_repo(
+            return ops.unarchive_repo(
                 repo_name=args.repo_name,
             )
+        elif args.command in ("bulk-archive", "bulk-unarchive"):
+            return ops.bulk_archive(
+                archive=args.command == "bulk-archive",
+                pattern=args.pattern,
+                machine=args.machine,
+                os_type=args.os,
+                tag=args.tag,
+                older_than_days=args.older_than_days,
+                reason=args.reason,
+                dry_run=args.dry_run,
+            )
+        elif args.command == "compact-access":
+            return ops.compact_access(machine=args.machine)
 
-        print(json.dumps(result, indent=2))
-        sys.exit(0)
-
-    except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}), file=sys.stderr)
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+    run(handler)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+Structured search queries, compiled to episode table lookups.
+
+Terms are ANDed. Each is one of:
+
+- ``word``: appears in the episode (header or body), case-insensitive
+- ``"a phrase"``: the same, for text with spaces
+- ``word*``: a word starting with ``word``
+- ``field:value``: a field equals the value; ``*`` and ``?`` glob
+  (``branch:feature/*``), quotes keep spaces (``summary:"key vault"``)
+- ``after:2026-09``, ``before:2026-10-01``, ``date:2026-09`` or
+  ``date:2026-09..2026-10``: timestamp ranges, where a date stands for the
+  whole year, month or day it names (``since``/``until`` are aliases)
+- ``a OR b``, ``NOT a`` (or ``-a``) and parentheses
+
+Fields are machine, os, repo, branch and detail (episode table columns),
+tag, keyword, id and summary (header fields), and text (a bare word).
+
+A query is run in stages. Conditions on table columns and timestamps are
+answered from the episode table before any file is read, most selective
+first, each scanning only the rows the previous one kept. The surviving
+episodes are then read and checked, header conditions before text ones,
+since text may need the (possibly compressed) body. Words every match
+must contain also rule out whole shards through their Bloom filters. The
+cold tier has no episode table, so each of its episodes is read and
+checked against the whole query.
+"""
+
+import functools
+import re
+from collections import namedtuple
+
+# Stages, in the order conditions are evaluated
+TABLE, HEADER, TEXT = 0, 1, 2
+STAGE_NAMES = ("table", "header", "text")
+
+TABLE_FIELDS = ("machine", "os", "repo", "branch", "detail")
+FIELD_STAGES = dict(
+    {field: TABLE for field in TABLE_FIELDS},
+    timestamp=TABLE, tag=HEADER, keyword=HEADER, id=HEADER, summary=HEADER, text=TEXT,
+)
+FIELD_ALIASES = {
+    "repository": "repo",
+    "tags": "tag",
+    "keywords": "keyword",
+    "since": "after",
+    "until": "before",
+}
+RANGE_FIELDS = ("after", "before", "date")
+OPERATORS = ("AND", "OR", "NOT")
+
+# field: column or header field; kind: eq, glob, text, prefix or range;
+# text: the term as written back by describe()
+Term = namedtuple("Term", "field kind value text")
+
+_WORD = re.compile(r'(?:([A-Za-z_]+):)?(?:"([^"]*)(?:"|$)|([^\s()"]+))')
+_DATE = re.compile(r"(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?")
+
+
+def parse(query):
+    """
+    Parse a query into a tree.
+
+    Returns:
+        Term, or a tuple ``("and" | "or", [nodes])`` / ``("not", node)``;
+        an empty query is ``("and", [])``, which matches every episode
+
+    Raises:
+        ValueError: If the query is malformed
+    """
+    tokens = _tokenize(query or "")
+    if not tokens:
+        return ("and", [])
+    parser = _Parser(tokens)
+    node = parser.parse_or()
+    if parser.pos < len(tokens):
+        raise ValueError("Unexpected ')' in query")
+    return node
+
+
+def describe(node, canonical=False):
+    """
+    Write a query tree back as query text.
+
+    Args:
+        node: Parsed query
+        canonical: Sort and de-duplicate AND/OR operands, so equivalent
+            queries read the same (used as the result cache key)
+    """
+    if isinstance(node, Term):
+        return node.text
+    op, operand = node
+    if op == "not":
+        inner = describe(operand, canonical)
+        return f"-{inner}" if isinstance(operand, Term) or operand[0] == "not" else f"-({inner})"
+    parts = [describe(child, canonical) for child in operand]
+    if op == "and":
+        parts = [f"({part})" if _is_op(child, "or") else part
+                 for part, child in zip(parts, operand)]
+    if canonical:
+        parts = sorted(set(parts))
+    return (" OR " if op == "or" else " ").join(parts)
+
+
+def stage(node):
+    """Latest stage a condition needs: TABLE, HEADER or TEXT."""
+    if isinstance(node, Term):
+        return FIELD_STAGES[node.field]
+    op, operand = node
+    if op == "not":
+        return stage(operand)
+    return max((stage(child) for child in operand), default=TABLE)
+
+
+class SearchPlan:
+    """A parsed query split into table, header and text stages."""
+
+    def __init__(self, node):
+        """
+        Args:
+            node: Parsed query (see parse)
+        """
+        self.node = node
+        conjuncts = node[1] if _is_op(node, "and") else [node]
+        # Every condition, cheapest stage first (stable, so query order breaks ties)
+        self.conjuncts = sorted(conjuncts, key=stage)
+        self.table_conjuncts = [c for c in self.conjuncts if stage(c) == TABLE]
+        self.file_conjuncts = [c for c in self.conjuncts if stage(c) != TABLE]
+        # Text every match contains, which Bloom filters can rule out
+        self.required_text = [
+            c.value for c in conjuncts if isinstance(c, Term) and c.field == "text"
+        ]
+
+    def select_rows(self, table):
+        """
+        Rows of an episode table that satisfy the table conditions.
+
+        Conditions run most selective first (by their estimated row
+        count over the whole table); each scans only the rows the
+        previous ones kept, and an empty result stops the scan.
+
+        Args:
+            table: Open EpisodeTable
+
+        Returns:
+            tuple: (row numbers in table order, list of step dicts with
+            the predicate, its estimated rows and the rows left after it)
+        """
+        planner = _TablePlanner(table)
+        return planner.select(self.table_conjuncts, range(table.rows))
+
+    def iter_rows(self, table):
+        """
+        Rows of an episode table that satisfy the table conditions, newest
+        first.
+
+        The table is walked page by page (see EpisodeTable.newest_first)
+        and the conditions run over each page, most selective first, so
+        memory stays bounded by the page size rather than the match count.
+
+        Args:
+            table: Open EpisodeTable (kept open while iterating)
+        """
+        planner = _TablePlanner(table)
+        conjuncts = [node for node, _ in sorted(
+            ((c, planner.estimate(c)) for c in self.table_conjuncts), key=lambda p: p[1])]
+        for page in table.newest_first():
+            for node in conjuncts:
+                page = planner.evaluate(node, page)
+                if not page:
+                    break
+            yield from page
+
+    def matches(self, episode, conjuncts=None):
+        """
+        Whether an episode satisfies the conditions.
+
+        Args:
+            episode: Episode view
+            conjuncts: Conditions to check (default: all of them)
+        """
+        return all(matches(c, episode) for c in (self.conjuncts if conjuncts is None else conjuncts))
+
+    def steps(self):
+        """Header and text stages, as described by --explain."""
+        return [
+            {"stage": STAGE_NAMES[stage(c)], "predicate": describe(c)}
+            for c in self.file_conjuncts
+        ]
+
+
+class Episode:
+    """An episode's header and text, decoded only as conditions need them."""
+
+    def __init__(self, frontmatter, body):
+        self.frontmatter = frontmatter
+        self._body = body
+        self._row = None
+        self._header_text = None
+        self._text = None
+
+    @property
+    def row(self):
+        """The episode's episode-table fields."""
+        if self._row is None:
+            from episode_table import episode_row
+
+            self._row = episode_row(self.frontmatter)
+        return self._row
+
+    @property
+    def header_text(self):
+        """Lower-cased header, as plain keywords are matched against."""
+        if self._header_text is None:
+            import json
+
+            self._header_text = json.dumps(self.frontmatter).lower()
+        return self._header_text
+
+    @property
+    def text(self):
+        """Lower-cased header and body."""
+        if self._text is None:
+            from utils import episode_body
+
+            self._text = self.header_text + " " + episode_body(self.frontmatter, self._body).lower()
+        return self._text
+
+    def values(self, field):
+        """Lower-cased values of a header field (tag, keyword, id)."""
+        if field == "tag":
+            values = (self.frontmatter.get("context") or {}).get("tags") or []
+        elif field == "keyword":
+            values = self.frontmatter.get("keywords") or []
+        else:
+            values = [self.frontmatter.get(field)]
+        if not isinstance(values, list):
+            values = [values]
+        return [str(v).lower() for v in values if v is not None]
+
+
+def matches(node, episode):
+    """Whether one episode satisfies a query tree."""
+    from fnmatch import fnmatchcase
+
+    if isinstance(node, Term):
+        field, kind, value = node.field, node.kind, node.value
+        if field == "timestamp":
+            start, end = value
+            timestamp = episode.row["timestamp"]
+            return (start is None or timestamp >= start) and (end is None or timestamp < end)
+        if field in TABLE_FIELDS:
+            actual = episode.row[field]
+            return fnmatchcase(actual, value) if kind == "glob" else actual == value
+        if field == "summary":
+            return value in str(episode.frontmatter.get("summary") or "").lower()
+        if field == "text":
+            # The header first; the body only if the header lacks it
+            if kind == "prefix":
+                pattern = _word_start(value)
+                return bool(pattern.search(episode.header_text) or pattern.search(episode.text))
+            return value in episode.header_text or value in episode.text
+        values = episode.values(field)
+        if kind == "glob":
+            return any(fnmatchcase(v, value) for v in values)
+        return value in values
+
+    op, operand = node
+    if op == "not":
+        return not matches(operand, episode)
+    if op == "or":
+        return any(matches(child, episode) for child in sorted(operand, key=stage))
+    return all(matches(child, episode) for child in sorted(operand, key=stage))
+
+
+class _TablePlanner:
+    """Evaluates table conditions over row numbers of an EpisodeTable."""
+
+    def __init__(self, table):
+        self.table = table
+        self._counts = {}
+
+    def select(self, conjuncts, rows):
+        """AND of conditions, most selective first; returns (rows, steps)."""
+        steps = []
+        for node, estimate in sorted(((c, self.estimate(c)) for c in conjuncts), key=lambda p: p[1]):
+            rows = self.evaluate(node, rows)
+            steps.append({"stage": "table", "predicate": describe(node),
+                          "estimated_rows": estimate, "rows": len(rows)})
+            if not rows:
+                break
+        return list(rows), steps
+
+    def estimate(self, node):
+        """Rows a condition matches over the whole table."""
+        import operator
+        from itertools import repeat
+
+        total = self.table.rows
+        if isinstance(node, Term):
+            if node.field == "timestamp":
+                start, end = node.value
+                values = self.table.column("timestamp")
+                count = total
+                if start is not None:
+                    count = sum(map(operator.ge, values, repeat(start)))
+                if end is not None:
+                    count -= sum(map(operator.ge, values, repeat(end)))
+                return max(count, 0)
+            counts = self._value_counts(node.field)
+            return sum(counts[i] for i in self._ids(node))
+
+        op, operand = node
+        if op == "not":
+            return total - self.estimate(operand)
+        estimates = [self.estimate(child) for child in operand]
+        if op == "or":
+            return min(total, sum(estimates))
+        return min(estimates, default=total)
+
+    def evaluate(self, node, rows):
+        """The subset of ``rows`` (in order) matching a condition."""
+        import operator
+        from itertools import compress, repeat
+
+        if isinstance(node, Term):
+            if node.field == "timestamp":
+                start, end = node.value
+                if start is not None:
+                    rows = list(compress(rows, map(operator.ge, self.table.values("timestamp", rows), repeat(start))))
+                if end is not None:
+                    rows = list(compress(rows, map(operator.lt, self.table.values("timestamp", rows), repeat(end))))
+                return list(rows)
+            ids = self._ids(node)
+            if not ids:
+                return []
+            values = self.table.values(node.field, rows)
+            if len(ids) == 1:
+                return list(compress(rows, map(operator.eq, values, repeat(next(iter(ids))))))
+            return list(compress(rows, map(ids.__contains__, values)))
+
+        op, operand = node
+        if op == "and":
+            return self.select(operand, rows)[0]
+        if op == "not":
+            excluded = set(self.evaluate(operand, rows))
+            return [row for row in rows if row not in excluded]
+        matched = set()
+        for child in operand:
+            matched.update(self.evaluate(child, rows))
+        return [row for row in rows if row in matched]
+
+    def _ids(self, node):
+        """String ids a column condition accepts."""
+        from fnmatch import fnmatchcase
+
+        if node.kind == "glob":
+            strings = self.table.strings[node.field]
+            return {i for i, s in enumerate(strings) if fnmatchcase(s, node.value)}
+        value_id = self.table.string_id(node.field, node.value)
+        return set() if value_id is None else {value_id}
+
+    def _value_counts(self, column):
+        """Rows per string id of a column, counted once per query."""
+        from collections import Counter
+
+        if column not in self._counts:
+            self._counts[column] = Counter(self.table.column(column))
+        return self._counts[column]
+
+
+class _Parser:
+    """Recursive descent over tokens: OR binds loosest, then AND, then NOT."""
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self._peek() == "OR":
+            self.pos += 1
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and(self):
+        nodes = []
+        while True:
+            token = self._peek()
+            if token is None or token in (")", "OR"):
+                break
+            if token == "AND":
+                self.pos += 1
+                continue
+            node = self.parse_not()
+            # a (b c) is a b c
+            nodes.extend(node[1] if _is_op(node, "and") else [node])
+        if not nodes:
+            raise ValueError("Expected a search term in query")
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_not(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError("Query ends after an operator")
+        self.pos += 1
+        if token in ("NOT", "-"):
+            return ("not", self.parse_not())
+        if token == "(":
+            node = self.parse_or()
+            if self._peek() != ")":
+                raise ValueError("Missing ')' in query")
+            self.pos += 1
+            return node
+        if token == ")":
+            raise ValueError("Unexpected ')' in query")
+        return token
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+
+def _is_op(node, op):
+    """Whether a node is an ``op`` ("and", "or", "not") rather than a Term."""
+    return not isinstance(node, Term) and node[0] == op
+
+
+def _tokenize(query):
+    """Split a query into "(", ")", "-", operators and Terms."""
+    tokens = []
+    pos = 0
+    while pos < len(query):
+        char = query[pos]
+        if char.isspace():
+            pos += 1
+        elif char in "()":
+            tokens.append(char)
+            pos += 1
+        elif char == "-" and pos + 1 < len(query) and not query[pos + 1].isspace():
+            tokens.append("-")
+            pos += 1
+        else:
+            match = _WORD.match(query, pos)
+            field, quoted, word = match.groups()
+            pos = match.end()
+            if field is None and quoted is None and word in OPERATORS:
+                tokens.append(word)
+            else:
+                tokens.append(_term(field, quoted if quoted is not None else word, quoted is not None))
+    return tokens
+
+
+def _term(field, value, quoted):
+    """Build the Term for one ``[field:]value`` token."""
+    name = FIELD_ALIASES.get(field.lower(), field.lower()) if field else None
+    if name is None or (name not in FIELD_STAGES and name not in RANGE_FIELDS):
+        # Not a field (e.g. a URL): the whole token is text
+        text = (value if name is None else f"{field}:{value}").lower()
+        if quoted:
+            return Term("text", "text", text, f'"{text}"')
+        if not quoted and len(text) > 1 and text.endswith("*"):
+            return Term("text", "prefix", text[:-1], text)
+        return Term("text", "text", text, text)
+
+    if not value:
+        raise ValueError(f"Missing value for '{name}:' in query")
+    if name in RANGE_FIELDS:
+        return Term("timestamp", "range", _range(name, value), f"{name}:{value}")
+
+    shown = f'"{value}"' if quoted else value
+    if name == "text":
+        return _term(None, value, quoted)
+    if name in TABLE_FIELDS:
+        kind = "glob" if not quoted and ("*" in value or "?" in value) else "eq"
+        return Term(name, kind, value, f"{name}:{shown}")
+    value = value.lower()
+    shown = shown.lower()
+    if name == "summary":
+        return Term(name, "text", value, f"{name}:{shown}")
+    kind = "glob" if not quoted and ("*" in value or "?" in value) else "eq"
+    return Term(name, kind, value, f"{name}:{shown}")
+
+
+def _range(name, value):
+    """(start, end) POSIX seconds of an after/before/date condition (None = open)."""
+    if name == "after":
+        return _period(value)[0], None
+    if name == "before":
+        return None, _period(value)[0]
+    first, sep, last = value.partition("..")
+    if not sep:
+        return _period(value)
+    return _period(first)[0] if first else None, _period(last)[1] if last else None
+
+
+def _period(value):
+    """
+    (start, end) POSIX seconds of the year, month or day a date names, or
+    of the second a full ISO timestamp names.
+    """
+    from datetime import UTC, datetime, timedelta
+    from utils import parse_timestamp
+
+    match = _DATE.fullmatch(value)
+    if match is None:
+        timestamp = parse_timestamp(value)
+        if not timestamp:
+            raise ValueError(f"Invalid date in query: {value}")
+        return timestamp, timestamp + 1
+
+    year, month, day = match.groups()
+    try:
+        if day is not None:
+            start = datetime(int(year), int(month), int(day), tzinfo=UTC)
+            end = start + timedelta(days=1)
+        elif month is not None:
+            start = datetime(int(year), int(month), 1, tzinfo=UTC)
+            end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+        else:
+            start = datetime(int(year), 1, 1, tzinfo=UTC)
+            end = start.replace(year=start.year + 1)
+    except ValueError:
+        raise ValueError(f"Invalid date in query: {value}") from None
+    return int(start.timestamp()), int(end.timestamp())
+
+
+@functools.lru_cache(maxsize=64)
+def _word_start(prefix):
+    """Pattern matching a word that starts with ``prefix``."""
+    return re.compile(r"(?<!\w)" + re.escape(prefix))
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Prometheus metrics for memory operations, exported as a textfile.
+
+Operations record counters, gauges and histograms in process memory (a
+dict update under a lock, so recording stays on permanently). When
+``$DEV_MEMORY_METRICS_DIR`` names a node-exporter textfile collector
+directory, they are flushed there on exit as ``dev_memory.prom``.
+
+Every command is a short-lived process, so flushing merges into the
+existing file rather than replacing it: counters and histogram series are
+added to what is there, gauges take the latest value. The merge runs under
+a lock file next to it, and the file is replaced atomically so the
+collector never reads a partial one.
+
+Only builtin modules are imported up front, so scripts can load this one
+on their fast paths (find-repo) without adding to startup time.
+"""
+
+import _thread
+import os
+import time
+
+METRICS_DIR_ENV = "DEV_MEMORY_METRICS_DIR"
+PROM_FILENAME = "dev_memory.prom"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+
+# name: (type, help)
+METRICS = {
+    "dev_memory_operation_duration_seconds": (
+        "histogram", "Duration of memory operations"),
+    "dev_memory_operations_total": (
+        "counter", "Memory operations by outcome"),
+    "dev_memory_git_duration_seconds": (
+        "histogram", "Duration of git subprocesses run by SyncGit"),
+    "dev_memory_push_retries_total": (
+        "counter", "Pushes retried after the remote moved ahead"),
+    "dev_memory_push_failures_total": (
+        "counter", "Pushes that failed for good"),
+    "dev_memory_episodes_saved_total": (
+        "counter", "Episodes saved or imported"),
+    "dev_memory_episodes": (
+        "gauge", "Hot episodes in the memory repository"),
+    "dev_memory_repositories": (
+        "gauge", "Repository metadata files"),
+    "dev_memory_scanned_repositories": (
+        "gauge", "Repositories found by the last scan, by status"),
+    "dev_memory_query_read_bytes": (
+        "histogram", "Episode content read per query"),
+}
+
+_BUCKETS = {
+    "dev_memory_operation_duration_seconds": LATENCY_BUCKETS,
+    "dev_memory_git_duration_seconds": LATENCY_BUCKETS,
+    "dev_memory_query_read_bytes": BYTES_BUCKETS,
+}
+
+_samples = {}
+_gauges = set()
+# threading is off limits on the find-repo path (it is measured too), and
+# importing it inside the recording functions would load it there all the
+# same. _thread's documented allocate_lock() and get_ident() are all that
+# is needed: the lock guards the samples, and each thread's open measure()
+# frames live under its ident.
+_lock = _thread.allocate_lock()
+_frames = {}
+_flush_registered = False
+
+
+def inc(name, value=1, **labels):
+    """Add to a counter."""
+    _add(_series(name, "", labels), value)
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge."""
+    key = _series(name, "", labels)
+    with _lock:
+        _samples[key] = value
+        _gauges.add(key)
+    _register_flush()
+
+
+def observe(name, value, **labels):
+    """Record one observation in a histogram."""
+    label_text = _label_text(labels)
+    prefix = label_text[:-1] + "," if label_text else "{"
+    with _lock:
+        # Every bucket is written, even empty ones, so quantiles see all bounds
+        for bound in _BUCKETS[name]:
+            key = f'{name}_bucket{prefix}le="{_number(bound)}"}}'
+            _samples[key] = _samples.get(key, 0) + (value <= bound)
+        for key, amount in ((f'{name}_bucket{prefix}le="+Inf"}}', 1),
+                            (f"{name}_sum{label_text}", value),
+                            (f"{name}_count{label_text}", 1)):
+            _samples[key] = _samples.get(key, 0) + amount
+    _register_flush()
+
+
+def measure(component, operation):
+    """
+    Context manager timing an operation and counting its outcome.
+
+    Episode bytes reported through add_read_bytes while it runs are
+    recorded per query operation.
+    """
+    return _Measure(component, operation)
+
+
+def measured(component):
+    """Decorator running a method under measure(component, <method name>)."""
+    import functools
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with measure(component, method.__name__):
+                return method(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def add_read_bytes(count):
+    """Count episode content read by the operations currently measured on this thread."""
+    for frame in _frames.get(_thread.get_ident(), ()):
+        frame[0] += count
+
+
+def flush(directory=None):
+    """
+    Merge this process's metrics into the textfile and reset them.
+
+    Args:
+        directory: Textfile collector directory (default: $DEV_MEMORY_METRICS_DIR)
+
+    Returns:
+        Path: The .prom file, or None if no directory is configured or
+        nothing was recorded
+    """
+    from pathlib import Path
+    from utils import FileLock
+
+    directory = directory or os.environ.get(METRICS_DIR_ENV)
+    with _lock:
+        samples = dict(_samples)
+        gauges = set(_gauges)
+        _samples.clear()
+        _gauges.clear()
+    if not directory or not samples:
+        return None
+
+    path = Path(directory) / PROM_FILENAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with FileLock(path.with_name(PROM_FILENAME + ".lock")):
+        merged = _parse(path)
+        for key, value in samples.items():
+            merged[key] = value if key in gauges else merged.get(key, 0) + value
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        tmp.write_text(_render(merged), encoding="utf-8")
+        os.replace(tmp, path)
+    return path
+
+
+class _Measure:
+    """What measure() returns (a class, so contextlib isn't needed)."""
+
+    def __init__(self, component, operation):
+        self.component = component
+        self.operation = operation
+        self.frame = [0]
+        self.start = None
+
+    def __enter__(self):
+        with _lock:
+            _frames.setdefault(_thread.get_ident(), []).append(self.frame)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        ident = _thread.get_ident()
+        with _lock:
+            frames = _frames[ident]
+            frames.pop()
+            if not frames:
+                del _frames[ident]
+        status = "ok" if exc_type is None else "error"
+        labels = {"component": self.component, "operation": self.operation}
+        observe("dev_memory_operation_duration_seconds", elapsed, **labels)
+        inc("dev_memory_operations_total", status=status, **labels)
+        if self.component == "query":
+            observe("dev_memory_query_read_bytes", self.frame[0], operation=self.operation)
+        return False
+
+
+def _add(key, value):
+    with _lock:
+        _samples[key] = _samples.get(key, 0) + value
+    _register_flush()
+
+
+def _register_flush():
+    """Flush at exit, once, if a textfile directory is configured."""
+    global _flush_registered
+    if _flush_registered:
+        return
+    _flush_registered = True
+    if os.environ.get(METRICS_DIR_ENV):
+        import atexit
+
+        atexit.register(_flush_at_exit)
+
+
+def _flush_at_exit():
+    # Metrics must never turn a finished command into a failed one
+    try:
+        flush()
+    except Exception:
+        pass
+
+
+def _series(name, suffix, labels):
+    return f"{name}{suffix}{_label_text(labels)}"
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _base_name(key):
+    """Metric a series belongs to (histogram series map to their histogram)."""
+    name = key.split("{", 1)[0]
+    if name not in METRICS:
+        for suffix in ("_bucket", "_sum", "_count"):
+            if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+                return name[:-len(suffix)]
+    return name
+
+
+def _parse(path):
+    """Series and values of an existing textfile written by _render."""
+    series = {}
+    try:
+        text = path.read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return series
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        key, _, value = line.rpartition(" ")
+        if _base_name(key) not in METRICS:
+            continue
+        try:
+            series[key] = int(value) if value.lstrip("-").isdigit() else float(value)
+        except ValueError:
+            continue
+    return series
+
+
+def _render(series):
+    by_metric = {}
+    for key, value in series.items():
+        by_metric.setdefault(_base_name(key), []).append((key, value))
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        if name not in by_metric:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.extend(f"{key} {_number(value)}" for key, value in sorted(by_metric[name], key=_sort_key))
+    return "\n".join(lines) + "\n"
+
+
+def _sort_key(item):
+    """Order series by labels, then buckets (by increasing bound), sum and count."""
+    name, _, labels = item[0].partition("{")
+    bound = -1.0
+    if 'le="' in labels:
+        labels, _, rest = labels.partition('le="')
+        value = rest.split('"', 1)[0]
+        bound = float("inf") if value == "+Inf" else float(value)
+    suffix = next((i for i, end in enumerate(("_bucket", "_sum", "_count")) if name.endswith(end)), -1)
+    return (labels.rstrip(",}"), suffix, bound)
@@ -13,46 +13,94 @@ This script will:
 2. Extract the clones array
 3. Create a new file for each clone with the new naming scheme
 4. Convert frontmatter from v1.0 to v2.0 format
-5. Optionally backup or delete old files
+5. Back up and delete old files, journaling each completed file so an
+   interrupted run resumes where it stopped
+6. Commit all changes in a single commit
 """
 
 import sys
 import json
+import os
+import shutil
+import threading
 from pathlib import Path
 from datetime import datetime, UTC
-import yaml
-import shutil
 
 # Import from utils
-from utils import normalize_repo_slug
+from utils import atomic_write_text, dump_frontmatter, normalize_repo_slug, split_frontmatter
+
+JOURNAL_NAME = "journal.jsonl"
 
 
 class MigrateRepoFiles:
     """Migrate repository metadata files to new format."""
 
-    def __init__(self, config_repo_path, dry_run=True):
+    def __init__(self, config_repo_path, dry_run=True, verbose=False):
         """
         Initialize migration.
 
         Args:
             config_repo_path: Path to yoshiwatanabe-configurations repository
             dry_run: If True, only show what would be done without making changes
+            verbose: If True, print each file and clone as it is converted
         """
         self.config_repo = Path(config_repo_path).resolve()
         self.repos_dir = self.config_repo / "domains" / "dev" / "memory" / "repositories"
         self.dry_run = dry_run
+        self.verbose = verbose
         self.backup_dir = self.repos_dir / ".migration_backup"
+        self.journal_path = self.backup_dir / JOURNAL_NAME
+        self._journal_lock = threading.Lock()
 
-    def migrate(self):
+    def migrate(self, workers=8, commit=True):
         """
         Perform migration.
 
+        Each source file is converted in a worker thread: new files are
+        written atomically, the source is backed up, the completion is
+        appended to a journal in the backup directory, and only then is the
+        source deleted. A run interrupted at any point can simply be run
+        again; journaled sources are not converted twice. With commit=True
+        all changes, including those of interrupted earlier runs, go into a
+        single commit and the journal is cleared once it is pushed.
+
+        Args:
+            workers: Number of files converted in parallel
+            commit: Commit and push the result through SyncGit
+
         Returns:
             dict: Migration results
         """
         if not self.repos_dir.exists():
             return {"success": False, "error": "Repositories directory not found"}
 
+        if self.dry_run or not commit:
+            return self._migrate(workers)
+
+        from sync_git import SyncGit
+
+        git_sync = SyncGit(self.config_repo)
+        with git_sync.lock():
+            results = self._migrate(workers)
+            journal = self._read_journal()
+            files = []
+            for source, created in journal.items():
+                files.extend(created)
+                files.append(str((self.repos_dir / source).relative_to(self.config_repo)))
+            if files:
+                print("Committing and pushing changes...")
+                git_sync.commit_and_push(
+                    files=files,
+                    message=f"Migrate {len(journal)} repository metadata files to v2.0"
+                )
+                self.journal_path.unlink()
+            results["committed"] = len(journal)
+        return results
+
+    def _migrate(self, workers):
+        """Convert every pending source file; no git operations."""
+        from concurrent.futures import ThreadPoolExecutor
+
         # Create backup directory
         if not self.dry_run:
             self.backup_dir.mkdir(exist_ok=True)
@@ -61,15 +109,27 @@ class MigrateRepoFiles:
             "files_processed": 0,
             "files_created": 0,
             "files_backed_up": 0,
+            "resumed": 0,
             "errors": [],
             "actions": [],
         }
 
-        # Process each .md file
-        for old_file in self.repos_dir.glob("*.md"):
+        # Sources converted by an earlier, interrupted run only need deleting
+        journal = self._read_journal()
+        for source in journal:
+            old_file = self.repos_dir / source
+            if old_file.exists() and not self.dry_run:
+                old_file.unlink()
+                results["actions"].append(f"DELETE: {source} (resumed)")
+        results["resumed"] = len(journal)
+
+        pending = []
+        for old_file in sorted(self.repos_dir.glob("*.md")):
             # Skip hidden files, READMEs, and already-migrated files
             if old_file.name.startswith(".") or old_file.stem.lower() == "readme":
                 continue
+            if old_file.name in journal:
+                continue
 
             # Check if this is already in new format (contains hash)
             # New format: repo-name-12345678.md (ends with 8 hex chars)
@@ -77,35 +137,44 @@ class MigrateRepoFiles:
             if len(stem_parts) == 2 and len(stem_parts[1]) == 8 and all(c in "0123456789abcdef" for c in stem_parts[1]):
                 results["actions"].append(f"SKIP: {old_file.name} (already in new format)")
                 continue
+            pending.append(old_file)
 
+        def run(old_file):
+            outcome = {"actions": [], "created": 0, "backed_up": 0}
             try:
-                self._migrate_file(old_file, results)
-                results["files_processed"] += 1
+                self._migrate_file(old_file, outcome)
             except Exception as e:
-                error_msg = f"Error processing {old_file.name}: {str(e)}"
-                results["errors"].append(error_msg)
-                print(f"ERROR: {error_msg}")
+                outcome["error"] = f"Error processing {old_file.name}: {str(e)}"
+            return outcome
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            for outcome in pool.map(run, pending):
+                results["actions"].extend(outcome["actions"])
+                if "error" in outcome:
+                    results["errors"].append(outcome["error"])
+                    print(f"ERROR: {outcome['error']}")
+                    continue
+                results["files_processed"] += 1
+                results["files_created"] += outcome["created"]
+                results["files_backed_up"] += outcome["backed_up"]
 
         return results
 
-    def _migrate_file(self, old_file, results):
+    def _migrate_file(self, old_file, outcome):
         """Migrate a single repository metadata file."""
-        print(f"\nProcessing: {old_file.name}")
+        self._log(f"\nProcessing: {old_file.name}")
 
         # Read existing file
         content = old_file.read_text(encoding="utf-8")
-        parts = content.split("---\n", 2)
+        frontmatter, body = split_frontmatter(content)
 
-        if len(parts) < 3:
+        if frontmatter is None:
             raise ValueError("Invalid file format (no frontmatter)")
 
-        frontmatter = yaml.safe_load(parts[1])
-        body = parts[2] if len(parts) > 2 else ""
-
         # Check version
         version = frontmatter.get("version", "1.0")
         if version == "2.0":
-            results["actions"].append(f"SKIP: {old_file.name} (already v2.0)")
+            outcome["actions"].append(f"SKIP: {old_file.name} (already v2.0)")
             return
 
         # Get repository info
@@ -119,11 +188,12 @@ class MigrateRepoFiles:
         if not clones:
             # No clones array - this might be an old file or manually created
             # Create a single clone entry as best guess
-            print(f"  WARNING: No clones array found, cannot migrate automatically")
-            results["actions"].append(f"SKIP: {old_file.name} (no clones array)")
+            self._log("  WARNING: No clones array found, cannot migrate automatically")
+            outcome["actions"].append(f"SKIP: {old_file.name} (no clones array)")
             return
 
         # Create a new file for each clone
+        created = []
         for i, clone in enumerate(clones):
             machine = clone.get("machine", "unknown")
             os_type = clone.get("os", "unknown")
@@ -131,15 +201,15 @@ class MigrateRepoFiles:
             last_accessed = clone.get("last_accessed", datetime.now(UTC).isoformat().replace('+00:00', 'Z'))
 
             if not path:
-                print(f"  WARNING: Clone {i} has no path, skipping")
+                self._log(f"  WARNING: Clone {i} has no path, skipping")
                 continue
 
             # Generate new filename
             new_slug = normalize_repo_slug(path, machine)
             new_file = self.repos_dir / f"{new_slug}.md"
 
-            print(f"  Clone {i+1}/{len(clones)}: {machine}:{path}")
-            print(f"    -> {new_file.name}")
+            self._log(f"  Clone {i+1}/{len(clones)}: {machine}:{path}")
+            self._log(f"    -> {new_file.name}")
 
             # Create new frontmatter (v2.0)
             new_frontmatter = {
@@ -171,31 +241,68 @@ class MigrateRepoFiles:
                     new_frontmatter["archived_reason"] = frontmatter["archived_reason"]
 
             # Build new content
-            new_content = f"---\n{yaml.dump(new_frontmatter, default_flow_style=False, sort_keys=False)}---\n\n"
-            new_content += body
+            new_content = dump_frontmatter(new_frontmatter) + body
 
             # Write new file (if not dry run)
             if not self.dry_run:
-                new_file.write_text(new_content, encoding="utf-8")
-                results["files_created"] += 1
+                atomic_write_text(new_file, new_content)
+                created.append(str(new_file.relative_to(self.config_repo)))
+                outcome["created"] += 1
             else:
-                print(f"    [DRY RUN] Would create: {new_file.name}")
+                self._log(f"    [DRY RUN] Would create: {new_file.name}")
 
-            results["actions"].append(f"CREATE: {new_file.name} from {old_file.name} clone {i+1}")
+            outcome["actions"].append(f"CREATE: {new_file.name} from {old_file.name} clone {i+1}")
 
-        # Backup old file
+        # Backup old file, record it as done, then delete it
         if not self.dry_run:
             backup_file = self.backup_dir / old_file.name
-            shutil.copy2(old_file, backup_file)
-            results["files_backed_up"] += 1
-            print(f"  Backed up to: {backup_file.relative_to(self.config_repo)}")
+            tmp_backup = backup_file.with_name(f".{backup_file.name}.tmp")
+            shutil.copy2(old_file, tmp_backup)
+            os.replace(tmp_backup, backup_file)
+            outcome["backed_up"] += 1
+            self._log(f"  Backed up to: {backup_file.relative_to(self.config_repo)}")
+
+            self._append_journal(old_file.name, created)
 
             # Delete old file
             old_file.unlink()
-            print(f"  Deleted: {old_file.name}")
-            results["actions"].append(f"DELETE: {old_file.name} (backed up)")
+            self._log(f"  Deleted: {old_file.name}")
+            outcome["actions"].append(f"DELETE: {old_file.name} (backed up)")
         else:
-            print(f"  [DRY RUN] Would backup and delete: {old_file.name}")
+            self._log(f"  [DRY RUN] Would backup and delete: {old_file.name}")
+
+    def _read_journal(self):
+        """Completed sources from the journal: source filename -> created paths."""
+        journal = {}
+        if not self.journal_path.exists():
+            return journal
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash; that source is redone
+                    continue
+                journal[entry["source"]] = entry["created"]
+        return journal
+
+    def _append_journal(self, source, created):
+        """Durably record that a source file has been fully converted."""
+        line = json.dumps({"source": source, "created": created}) + "\n"
+        with self._journal_lock:
+            with open(self.journal_path, "a+", encoding="utf-8") as f:
+                # Start after a torn last line, or this entry would be lost with it
+                if f.tell():
+                    f.seek(f.tell() - 1)
+                    if f.read(1) != "\n":
+                        line = "\n" + line
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _log(self, message):
+        if self.verbose or self.dry_run:
+            print(message)
 
 
 def main():
@@ -220,6 +327,22 @@ def main():
         action="store_true",
         help="Actually perform the migration (turns off dry-run)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of files converted in parallel (default: 8)",
+    )
+    parser.add_argument(
+        "--no-commit",
+        action="store_true",
+        help="Leave the migrated files uncommitted",
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Print every file and clone as it is converted",
+    )
 
     args = parser.parse_args()
 
@@ -240,10 +363,10 @@ def main():
             print("Migration cancelled.")
             sys.exit(0)
 
-    migrator = MigrateRepoFiles(args.config_repo, dry_run=dry_run)
+    migrator = MigrateRepoFiles(args.config_repo, dry_run=dry_run, verbose=args.verbose)
 
     try:
-        results = migrator.migrate()
+        results = migrator.migrate(workers=args.workers, commit=not args.no_commit)
 
         print("\n" + "=" * 70)
         print("Migration Results:")
@@ -251,6 +374,8 @@ def main():
         print(f"Files processed: {results['files_processed']}")
         print(f"Files created: {results['files_created']}")
         print(f"Files backed up: {results['files_backed_up']}")
+        if results["resumed"]:
+            print(f"Resumed from journal: {results['resumed']}")
         print(f"Errors: {len(results['errors'])}")
 
         if results['errors']:
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate episode detection with MinHash signatures and LSH banding.
+
+Each episode's summary, keywords and free-form body (the generated Context
+section is left out, since it repeats for every session in a repository)
+is reduced to word 3-gram shingles and a 64-value MinHash signature. The
+signature is split into 16 bands of 4 values; episodes sharing any band
+hash are candidates, and candidates are confirmed with the signature's
+Jaccard estimate.
+
+The index lives under ``memory/index/minhash/``:
+
+- ``signatures.col``: uint64 signature values, NUM_PERM per row
+- ``names.txt``: episode filename of each row
+- ``band_keys.col`` / ``band_rows.col``: per band, the band hashes of the
+  first ``sorted_rows`` rows in sorted order with their row numbers, so a
+  lookup is a binary search per band
+- ``meta.json``: row counts
+
+Rows appended since the band arrays were last sorted are scanned linearly
+and merged in once there are more than TAIL_LIMIT of them.
+"""
+
+import json
+import re
+import struct
+import sys
+from pathlib import Path
+
+# 2: band keys from blake2b instead of hash()
+INDEX_VERSION = 2
+NUM_PERM = 64
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.8
+TAIL_LIMIT = 1024
+
+_MERSENNE = (1 << 61) - 1
+_BAND = struct.Struct(f"<{ROWS_PER_BAND}Q")
+_WORD = re.compile(r"\w+")
+_CONTEXT_SECTION = re.compile(r"^## Context\n.*?(?=^## |\Z)", re.M | re.S)
+
+
+def _permutations():
+    """Fixed (a, b) pairs of the universal hash family, one per signature value."""
+    import random
+
+    rng = random.Random(0x6D656D6F)
+    return [(rng.randrange(1, _MERSENNE), rng.randrange(0, _MERSENNE)) for _ in range(NUM_PERM)]
+
+
+_PERMS = _permutations()
+
+
+def episode_text(frontmatter, body):
+    """Text of an episode that identifies its content."""
+    body = _CONTEXT_SECTION.sub("", body or "")
+    body = "\n".join(line for line in body.splitlines() if not line.startswith("# Memory Episode:"))
+    keywords = " ".join(str(k) for k in (frontmatter or {}).get("keywords") or [])
+    return f"{(frontmatter or {}).get('summary') or ''}\n{keywords}\n{body}"
+
+
+def signature(text):
+    """MinHash signature (NUM_PERM ints) of a text's word shingles."""
+    import hashlib
+
+    words = _WORD.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+        for s in shingles
+    ]
+    return [min([(a * h + b) % _MERSENNE for h in hashes]) for a, b in _PERMS]
+
+
+def band_keys(sig):
+    """
+    One 64-bit hash per LSH band of a signature.
+
+    Keys are stored in band_keys.col, so they come from blake2b over the
+    packed band values rather than the builtin hash(), which differs
+    between Python versions and builds.
+    """
+    import hashlib
+
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                _BAND.pack(*sig[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]), digest_size=8,
+            ).digest(),
+            "little",
+        )
+        for band in range(BANDS)
+    ]
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+class NearDuplicateIndex:
+    """Persistent MinHash/LSH index over episodes."""
+
+    def __init__(self, index_dir):
+        """
+        Open (or prepare) an index directory.
+
+        Args:
+            index_dir: Directory holding the index files
+        """
+        self.index_dir = Path(index_dir)
+        self.meta_path = self.index_dir / "meta.json"
+        self.names_path = self.index_dir / "names.txt"
+        self.rows = 0
+        self.sorted_rows = 0
+        self._names = None
+        self._arrays = {}
+        self._load()
+
+    def names(self):
+        """Episode filename of every row."""
+        if self._names is None:
+            if self.rows:
+                self._names = self.names_path.read_text(encoding="utf-8").split("\n")[:self.rows]
+            else:
+                self._names = []
+        return self._names
+
+    def signature_of(self, row):
+        """Stored signature of a row."""
+        values = self._array("signatures", "Q")
+        return list(values[row * NUM_PERM:(row + 1) * NUM_PERM])
+
+    def candidates(self, sig):
+        """Rows sharing at least one band with a signature."""
+        from bisect import bisect_left
+
+        keys = band_keys(sig)
+        found = set()
+
+        if self.sorted_rows:
+            sorted_keys = self._array("band_keys", "Q")
+            sorted_rows = self._array("band_rows", "I")
+            for band, key in enumerate(keys):
+                lo = band * self.sorted_rows
+                hi = lo + self.sorted_rows
+                i = bisect_left(sorted_keys, key, lo, hi)
+                while i < hi and sorted_keys[i] == key:
+                    found.add(sorted_rows[i])
+                    i += 1
+
+        for row in range(self.sorted_rows, self.rows):
+            if any(a == b for a, b in zip(keys, band_keys(self.signature_of(row)))):
+                found.add(row)
+
+        return found
+
+    def find(self, sig, threshold=DEFAULT_THRESHOLD, exclude=()):
+        """
+        Episodes whose estimated similarity to a signature reaches threshold.
+
+        Returns:
+            list: (filename, similarity) pairs, most similar first
+        """
+        names = self.names()
+        matches = []
+        for row in self.candidates(sig):
+            if names[row] in exclude:
+                continue
+            score = similarity(sig, self.signature_of(row))
+            if score >= threshold:
+                matches.append((names[row], score))
+        matches.sort(key=lambda m: (-m[1], m[0]))
+        return matches
+
+    def clusters(self, threshold=DEFAULT_THRESHOLD):
+        """
+        Group the indexed episodes into near-duplicate clusters.
+
+        Each LSH bucket is compared against its first member only, so the
+        work is linear in rows x bands rather than quadratic in rows.
+
+        Returns:
+            list: Clusters (lists of filenames, sorted) with two or more members
+        """
+        self._merge_tail()
+        parent = list(range(self.rows))
+
+        def root(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        if self.sorted_rows:
+            sorted_keys = self._array("band_keys", "Q")
+            sorted_rows = self._array("band_rows", "I")
+            for band in range(BANDS):
+                lo = band * self.sorted_rows
+                start = lo
+                for i in range(lo + 1, lo + self.sorted_rows + 1):
+                    if i < lo + self.sorted_rows and sorted_keys[i] == sorted_keys[start]:
+                        continue
+                    if i - start > 1:
+                        first = sorted_rows[start]
+                        first_sig = self.signature_of(first)
+                        for j in range(start + 1, i):
+                            row = sorted_rows[j]
+                            if root(row) != root(first) and \
+                                    similarity(first_sig, self.signature_of(row)) >= threshold:
+                                parent[root(row)] = root(first)
+                    start = i
+
+        groups = {}
+        names = self.names()
+        for row in range(self.rows):
+            groups.setdefault(root(row), []).append(names[row])
+        return sorted(sorted(g) for g in groups.values() if len(g) > 1)
+
+    def update(self, names, read_episodes):
+        """
+        Bring the index in line with the current set of episodes.
+
+        Args:
+            names: Iterable of every current episode filename
+            read_episodes: Callable taking a list of filenames and yielding
+                (filename, frontmatter, body) triples
+
+        Returns:
+            dict: Counts of rows added and removed
+        """
+        import array
+
+        current = set(names)
+        known = self.names()
+        removed = 0
+        if self._version != INDEX_VERSION:
+            self._write([], array.array("Q"))
+            known = []
+        elif not current.issuperset(known):
+            keep = [i for i, name in enumerate(known) if name in current]
+            removed = len(known) - len(keep)
+            signatures = array.array("Q")
+            for row in keep:
+                signatures.extend(self.signature_of(row))
+            self._write([known[i] for i in keep], signatures)
+            known = self.names()
+
+        known_set = set(known)
+        new_names = sorted(name for name in current if name not in known_set)
+        if new_names:
+            signatures = array.array("Q")
+            added = []
+            for name, frontmatter, body in read_episodes(new_names):
+                signatures.extend(signature(episode_text(frontmatter, body)))
+                added.append(name)
+            self._append(added, signatures)
+
+        if self.rows - self.sorted_rows > TAIL_LIMIT:
+            self._merge_tail()
+
+        return {"added": len(new_names), "removed": removed, "rows": self.rows}
+
+    def add(self, name, sig):
+        """Append one episode's signature (no-op if it is already indexed)."""
+        import array
+
+        if name not in self.names():
+            self._append([name], array.array("Q", sig))
+
+    def close(self):
+        """Release the mapped arrays."""
+        for view, mapping in self._arrays.values():
+            if isinstance(view, memoryview):
+                view.release()
+            if mapping is not None:
+                mapping.close()
+        self._arrays = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _array(self, name, typecode):
+        """Map an index file as a typed array."""
+        if name not in self._arrays:
+            import array
+
+            path = self.index_dir / f"{name}.col"
+            itemsize = array.array(typecode).itemsize
+            count = {"signatures": self.rows * NUM_PERM}.get(name, self.sorted_rows * BANDS)
+            if count == 0 or not path.exists():
+                self._arrays[name] = (array.array(typecode), None)
+            elif sys.byteorder != "little":
+                values = array.array(typecode, path.read_bytes()[:count * itemsize])
+                values.byteswap()
+                self._arrays[name] = (values, None)
+            else:
+                import mmap
+
+                with open(path, "rb") as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                view = memoryview(mapping)[:count * itemsize].cast(typecode)
+                self._arrays[name] = (view, mapping)
+        return self._arrays[name][0]
+
+    def _load(self):
+        """Read meta.json; a missing or unreadable index is empty."""
+        self._version = INDEX_VERSION
+        if not self.meta_path.exists():
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        except ValueError:
+            self._version = None
+            return
+        self._version = meta.get("version")
+        if meta.get("num_perm") != NUM_PERM or meta.get("bands") != BANDS:
+            self._version = None
+            return
+        self.rows = meta.get("rows", 0)
+        self.sorted_rows = meta.get("sorted_rows", 0)
+
+    def _write(self, names, signatures):
+        """Replace the whole index with the given rows (band arrays unsorted)."""
+        self.close()
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._write_array("signatures", signatures)
+        self.names_path.write_text("".join(f"{n}\n" for n in names), encoding="utf-8")
+        self._names = list(names)
+        self.rows = len(names)
+        self.sorted_rows = 0
+        self._version = INDEX_VERSION
+        self._write_meta()
+
+    def _append(self, names, signatures):
+        """Append rows after the committed row count."""
+        import array
+
+        self.close()
+        path = self.index_dir / "signatures.col"
+        itemsize = array.array("Q").itemsize
+        with open(path, "ab") as f:
+            f.truncate(self.rows * NUM_PERM * itemsize)
+            if sys.byteorder != "little":
+                signatures.byteswap()
+            signatures.tofile(f)
+
+        known = self.names()
+        with open(self.names_path, "ab") as f:
+            f.truncate(sum(len(n.encode("utf-8")) + 1 for n in known))
+            f.write("".join(f"{n}\n" for n in names).encode("utf-8"))
+
+        self._names = known + list(names)
+        self.rows += len(names)
+        self._write_meta()
+
+    def _merge_tail(self):
+        """Rebuild the sorted band arrays over all rows."""
+        import array
+
+        if self.sorted_rows == self.rows:
+            return
+
+        # Invalidate the band arrays before rewriting them
+        self.sorted_rows = 0
+        self._write_meta()
+
+        per_band = [[] for _ in range(BANDS)]
+        for row in range(self.rows):
+            for band, key in enumerate(band_keys(self.signature_of(row))):
+                per_band[band].append((key, row))
+
+        keys = array.array("Q")
+        rows = array.array("I")
+        for entries in per_band:
+            entries.sort()
+            keys.extend(key for key, _ in entries)
+            rows.extend(row for _, row in entries)
+
+        self.close()
+        self._write_array("band_keys", keys)
+        self._write_array("band_rows", rows)
+        self.sorted_rows = len(rows) // BANDS
+        self._write_meta()
+
+    def _write_array(self, name, values):
+        """Atomically replace one array file."""
+        from utils import atomic_write_bytes
+
+        if sys.byteorder != "little":
+            values = values.__copy__()
+            values.byteswap()
+        atomic_write_bytes(self.index_dir / f"{name}.col", values)
+
+    def _write_meta(self):
+        """Atomically replace meta.json."""
+        meta = {
+            "version": INDEX_VERSION,
+            "num_perm": NUM_PERM,
+            "bands": BANDS,
+            "rows": self.rows,
+            "sorted_rows": self.sorted_rows,
+        }
+        from utils import atomic_write_text
+
+        atomic_write_text(self.meta_path, json.dumps(meta))
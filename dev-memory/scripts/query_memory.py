@@ -3,10 +3,25 @@
 Search and query memory episodes and repositories.
 """
 
-import sys
-import json
 from pathlib import Path
-import yaml
+
+from utils import episode_body, split_frontmatter
+
+
+def _measured(method):
+    """
+    metrics.measured("query"), importing metrics on the first call instead
+    of when this module loads, so find-repo startup doesn't pay for it.
+    """
+    import functools
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        import metrics
+
+        with metrics.measure("query", method.__name__):
+            return method(*args, **kwargs)
+    return wrapper
 
 
 class QueryMemory:
@@ -24,7 +39,13 @@ class QueryMemory:
         self.memory_dir = self.dev_domain / "memory"
         self.episodes_dir = self.memory_dir / "episodes"
         self.repos_dir = self.memory_dir / "repositories"
+        self.access_dir = self.memory_dir / "access"
+        self.packs_dir = self.episodes_dir / "packs"
+        self._snapshot = None
+        self._snapshot_checked = False
+        self._repo_snapshot = None
 
+    @_measured
     def find_repo(self, repo_name):
         """
         Find all clones of a repository across machines.
@@ -37,20 +58,25 @@ class QueryMemory:
         """
         repo_file = self.repos_dir / f"{repo_name}.md"
 
-        if not repo_file.exists():
-            return {"repository": repo_name, "clones": [], "found": False}
+        try:
+            stat = repo_file.stat()
+        except FileNotFoundError:
+            return self._find_cold_repo(repo_name)
 
-        content = repo_file.read_text(encoding="utf-8")
-        parts = content.split("---\n", 2)
-        if len(parts) < 3:
+        frontmatter = self._snapshot_repo(repo_name, [stat.st_size, stat.st_mtime_ns])
+        if frontmatter is None:
+            frontmatter, _ = split_frontmatter(repo_file.read_text(encoding="utf-8"))
+        if frontmatter is None:
             return {"repository": repo_name, "clones": [], "found": False}
 
-        frontmatter = yaml.safe_load(parts[1])
-
         # Handle both version 2.0 (location) and legacy (clones) formats
         version = frontmatter.get("version", "1.0")
         if version == "2.0" and "location" in frontmatter:
-            clones = [frontmatter["location"]]
+            # Accesses may still be in the access logs rather than the file
+            index = self.repo_index(refresh=False)
+            index.update_access(self.access_dir)
+            location = frontmatter["location"]
+            clones = [dict(location, last_accessed=index.last_accessed(repo_name, location.get("last_accessed")))]
         else:
             clones = frontmatter.get("clones", [])
 
@@ -65,6 +91,7 @@ class QueryMemory:
             "found": True,
         }
 
+    @_measured
     def list_recent_repos(self, count=5, filter_type="all", include_archived=False):
         """
         List recently accessed repositories.
@@ -77,18 +104,57 @@ class QueryMemory:
         Returns:
             list: Recently accessed repositories
         """
-        repos = []
-
-        for repo_file in self.repos_dir.glob("*.md"):
-            content = repo_file.read_text(encoding="utf-8")
-            parts = content.split("---\n", 2)
-            if len(parts) < 3:
+        # Rank by the index (last_accessed merged with the access logs) and
+        # parse only the repository files that make the cut
+        index = self.repo_index()
+        ranked = []
+        for slug, entry in index.repos.items():
+            if not include_archived and entry.get("archived"):
                 continue
+            accessed = index.last_accessed(slug)
+            if accessed:
+                ranked.append((accessed, slug, None))
 
-            frontmatter = yaml.safe_load(parts[1])
+        # Archived repositories moved to the cold tier are listed from their tombstones
+        if include_archived:
+            from cold_tier import read_repo_tombstones
 
-            # Skip archived repositories unless explicitly requested
-            if not include_archived and frontmatter.get("archived", False):
+            for slug, tombstone in read_repo_tombstones(self.memory_dir).items():
+                location = tombstone.get("location") or {}
+                accessed = index.last_accessed(slug, location.get("last_accessed"))
+                if accessed:
+                    ranked.append((accessed, slug, tombstone))
+
+        # Sort by last accessed (most recent first)
+        ranked.sort(key=lambda x: x[0], reverse=True)
+
+        repos = []
+        for accessed, slug, tombstone in ranked:
+            if len(repos) >= count:
+                break
+            if tombstone is not None:
+                location = dict(tombstone.get("location") or {}, last_accessed=accessed)
+                repos.append({
+                    "name": slug,
+                    "description": tombstone.get("description", ""),
+                    "last_accessed": accessed,
+                    "last_machine": location.get("machine"),
+                    "last_os": location.get("os"),
+                    "clones": [location],
+                    "tags": tombstone.get("tags", []),
+                    "archived": tombstone.get("archived", True),
+                })
+                continue
+
+            # The snapshot has the parsed file if it is unchanged since
+            frontmatter = self._snapshot_repo(slug, index.repos[slug]["stat"])
+            if frontmatter is None:
+                try:
+                    content = (self.repos_dir / f"{slug}.md").read_text(encoding="utf-8")
+                except FileNotFoundError:
+                    continue
+                frontmatter, _ = split_frontmatter(content)
+            if frontmatter is None:
                 continue
 
             # Handle both version 2.0 (location) and legacy (clones) formats
@@ -99,33 +165,27 @@ class QueryMemory:
 
             if version == "2.0" and "location" in frontmatter:
                 # Version 2.0: single location field
-                location = frontmatter["location"]
-                most_recent = location.get("last_accessed")
-                most_recent_location = location
-                locations = [location]
+                most_recent_location = dict(frontmatter["location"], last_accessed=accessed)
+                locations = [most_recent_location]
             else:
                 # Legacy format: clones array
                 for clone in frontmatter.get("clones", []):
-                    accessed = clone.get("last_accessed")
-                    if accessed and (not most_recent or accessed > most_recent):
-                        most_recent = accessed
+                    clone_accessed = clone.get("last_accessed")
+                    if clone_accessed and (not most_recent or clone_accessed > most_recent):
+                        most_recent = clone_accessed
                         most_recent_location = clone
                 locations = frontmatter.get("clones", [])
 
-            if most_recent:
-                repos.append({
-                    "name": frontmatter["repository"]["slug"],
-                    "description": frontmatter.get("description", ""),
-                    "last_accessed": most_recent,
-                    "last_machine": most_recent_location.get("machine") if most_recent_location else None,
-                    "last_os": most_recent_location.get("os") if most_recent_location else None,
-                    "clones": locations,  # Return locations for compatibility
-                    "tags": frontmatter.get("tags", []),
-                    "archived": frontmatter.get("archived", False),
-                })
-
-        # Sort by last accessed (most recent first)
-        repos.sort(key=lambda x: x["last_accessed"], reverse=True)
+            repos.append({
+                "name": frontmatter["repository"]["slug"],
+                "description": frontmatter.get("description", ""),
+                "last_accessed": accessed,
+                "last_machine": most_recent_location.get("machine") if most_recent_location else None,
+                "last_os": most_recent_location.get("os") if most_recent_location else None,
+                "clones": locations,  # Return locations for compatibility
+                "tags": frontmatter.get("tags", []),
+                "archived": frontmatter.get("archived", False),
+            })
 
         # Apply filter (simplified - could check remote URL for work/personal)
         # For now, return all
@@ -135,85 +195,964 @@ class QueryMemory:
 
         return repos[:count]
 
-    def search_memory(self, query, limit=10):
+    @_measured
+    def search_memory(self, query, limit=10, include_cold=False, explain=False):
         """
-        Search memory episodes by keywords.
+        Search memory episodes.
+
+        Plain keywords must all appear in the episode (case-insensitive);
+        the query may also use fields, date ranges, phrases, prefixes, OR
+        and NOT (see memory_query). Conditions on episode table columns
+        are answered from the table before any episode is read.
+
+        Matching streams through a pipeline (candidates -> Bloom pruning ->
+        read -> match) that never holds more than ``limit`` results. Hot
+        candidates come from the episode table a page at a time, newest
+        first, so the search stops after the first ``limit`` matches
+        without listing every candidate; cold episodes have no table rows
+        and go through a bounded heap instead.
 
         Args:
-            query: Search query (keywords)
+            query: Search query
             limit: Maximum number of results
+            include_cold: Also search episodes moved to the cold tier
+            explain: Return the plan and its cost instead of running it
+
+        Returns:
+            list: Matching memory episodes, most recent first (with explain,
+            a dict describing each stage and how many episodes it leaves)
+        """
+        import heapq
+        from itertools import chain, islice
+        from operator import itemgetter
+        from memory_query import SearchPlan, describe, parse
+
+        plan = SearchPlan(parse(query))
+        with self.episode_table() as table:
+            names = table.names()
+
+            cold = []
+            if include_cold:
+                # Cold episodes aren't in the table; they are read and checked in full
+                hot = set(names)
+                cold = [name for name in self._episode_names(include_cold=True) if name not in hot]
+
+            # Shards whose Bloom filter rules out a required word are not read at all
+            skip = set()
+            if table.rows or cold:
+                skip = self._shards_without(plan.required_text, include_cold)
+
+            if explain:
+                rows, steps = plan.select_rows(table)
+                if plan.required_text:
+                    steps.append({"stage": "bloom", "terms": plan.required_text, "shards_skipped": len(skip)})
+                return {
+                    "success": True,
+                    "query": describe(plan.node),
+                    "plan": steps + plan.steps(),
+                    "cost": {
+                        "table_rows": table.rows,
+                        "table_candidates": len(rows),
+                        "cold_episodes": len(cold),
+                        "episodes_to_read": len(rows) + len(cold),
+                        "shards_skipped": len(skip),
+                        # Hot candidates are read newest first until `limit` match
+                        "stops_after_matches": limit,
+                    },
+                }
+
+            # Table conditions already hold for table candidates, which
+            # arrive newest first, so the first `limit` matches are the answer
+            candidates = (names[row] for row in plan.iter_rows(table))
+            matches = islice(
+                _search_matches(plan, self._iter_hot_episodes(candidates, skip), plan.file_conjuncts),
+                limit,
+            )
+            if cold:
+                episodes = self._iter_episodes(names=cold, include_cold=True, skip_shards=skip)
+                matches = chain(matches, _search_matches(plan, episodes, None))
+            return [result for _, result in heapq.nlargest(limit, matches, key=itemgetter(0))]
+
+    @_measured
+    def resume_context(self, repo_name=None, branch=None, count=5, repo_path=None, machine=None):
+        """
+        The most recent episodes of a repository (and optionally a branch).
+
+        Reads the repository's timeline and then only the episodes returned.
+
+        Args:
+            repo_name: Repository slug
+            branch: Only episodes on this branch
+            count: Number of episodes to return
+            repo_path: Local repository path, used with ``machine`` to derive
+                the slug when repo_name is not given
+            machine: Machine of repo_path (default: this machine)
 
         Returns:
-            list: Matching memory episodes
+            dict: Repository, branch and its episodes, most recent first
         """
-        results = []
-        keywords = query.lower().split()
+        from utils import get_machine_id, normalize_repo_slug
 
-        for episode_file in self.episodes_dir.glob("*.md"):
-            content = episode_file.read_text(encoding="utf-8")
-            parts = content.split("---\n", 2)
-            if len(parts) < 3:
+        if repo_name is None:
+            if repo_path is None:
+                raise ValueError("resume-context needs a repository name or path")
+            repo_name = normalize_repo_slug(str(Path(repo_path).resolve()), machine or get_machine_id())
+
+        entries = self.timeline().entries(repo_name, branch)
+        episodes = []
+        for _, _, name in reversed(entries):
+            if len(episodes) >= count:
+                break
+            content = self._read_episode(name)
+            if content is None:
+                continue
+            frontmatter, body = split_frontmatter(content)
+            if frontmatter is None:
                 continue
+            repository = frontmatter.get("repository", {})
+            body = episode_body(frontmatter, body)
+            episodes.append({
+                "episode_id": frontmatter.get("id"),
+                "timestamp": frontmatter.get("timestamp"),
+                "machine": frontmatter.get("machine"),
+                "os": frontmatter.get("os"),
+                "branch": repository.get("branch"),
+                "commit": repository.get("commit"),
+                "summary": frontmatter.get("summary"),
+                "keywords": frontmatter.get("keywords", []),
+                "tags": frontmatter.get("context", {}).get("tags", []),
+                "body": body,
+            })
 
-            frontmatter = yaml.safe_load(parts[1])
-            body = parts[2] if len(parts) > 2 else ""
-
-            # Search in frontmatter and body
-            searchable = json.dumps(frontmatter).lower() + " " + body.lower()
-
-            if all(kw in searchable for kw in keywords):
-                results.append({
-                    "episode_id": frontmatter.get("id"),
-                    "timestamp": frontmatter.get("timestamp"),
-                    "machine": frontmatter.get("machine"),
-                    "os": frontmatter.get("os"),
-                    "repository": frontmatter.get("repository", {}).get("name"),
-                    "branch": frontmatter.get("repository", {}).get("branch"),
-                    "commit": frontmatter.get("repository", {}).get("commit"),
-                    "summary": frontmatter.get("summary"),
-                    "keywords": frontmatter.get("keywords", []),
-                    "tags": frontmatter.get("context", {}).get("tags", []),
-                })
+        return {
+            "repository": repo_name,
+            "branch": branch,
+            "total_episodes": len(entries),
+            "episodes": episodes,
+        }
+
+    @_measured
+    def stats(self, bucket="week", since=None, until=None, machine=None, os=None,
+              repo=None, top=10):
+        """
+        Summarize session activity across repositories, machines and time.
+
+        Computed from the columnar episode table, so no episode is parsed
+        unless it was added since the table was last refreshed.
+
+        Args:
+            bucket: Time bucket size (day, week, month)
+            since: Only count episodes at or after this ISO date/time
+            until: Only count episodes before this ISO date/time
+            machine: Only count episodes from this machine
+            os: Only count episodes from this OS
+            repo: Only count episodes of this repository slug
+            top: Number of entries in the per-repo/branch rankings
+
+        Returns:
+            dict: Totals, per-bucket breakdown, top branches and streaks
+
+        Raises:
+            ValueError: On an unknown bucket or a since/until that isn't an
+                ISO date/time
+        """
+        import operator
+        from collections import Counter
+        from datetime import date, timedelta
+        from itertools import repeat
+
+        if bucket not in ("day", "week", "month"):
+            raise ValueError(f"Unknown bucket: {bucket}")
+        since = _iso_bound(since, "since")
+        until = _iso_bound(until, "until")
+
+        with self.episode_table() as table:
+            rows = table.select(
+                since=since,
+                until=until,
+                machine=machine,
+                os=os,
+                repo=repo,
+            )
+            repo_ids = table.values("repo", rows)
+            machine_ids = table.values("machine", rows)
+            os_ids = table.values("os", rows)
+            branch_ids = table.values("branch", rows)
+            days = list(map(operator.floordiv, table.values("timestamp", rows), repeat(86400)))
+            strings = table.strings
+
+        # Bucket key per row, resolved once per distinct day
+        epoch = date(1970, 1, 1)
+        day_keys = {}
+        for day in set(days):
+            d = epoch + timedelta(days=day)
+            if bucket == "week":
+                d -= timedelta(days=d.weekday())
+            elif bucket == "month":
+                d = d.replace(day=1)
+            day_keys[day] = d.isoformat()
+        bucket_keys = list(map(day_keys.__getitem__, days))
 
-        # Sort by timestamp (most recent first)
-        results.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
+        def named(counter, column):
+            return {strings[column][i]: n for i, n in counter.most_common()}
 
-        return results[:limit]
+        def by_bucket(ids, column):
+            per = {}
+            for (key, value_id), n in Counter(zip(bucket_keys, ids)).items():
+                per.setdefault(key, {})[strings[column][value_id]] = n
+            return per
+
+        bucket_totals = Counter(bucket_keys)
+        per_repo = by_bucket(repo_ids, "repo")
+        per_machine = by_bucket(machine_ids, "machine")
+        per_os = by_bucket(os_ids, "os")
+        buckets = [
+            {
+                "start": key,
+                "sessions": bucket_totals[key],
+                "repositories": per_repo[key],
+                "machines": per_machine[key],
+                "os": per_os[key],
+            }
+            for key in sorted(bucket_totals)
+        ]
+
+        branches = [
+            {
+                "repository": strings["repo"][repo_id],
+                "branch": strings["branch"][branch_id],
+                "sessions": n,
+            }
+            for (repo_id, branch_id), n in Counter(zip(repo_ids, branch_ids)).most_common(top)
+        ]
+
+        return {
+            "sessions": len(rows),
+            "bucket": bucket,
+            "repositories": named(Counter(repo_ids), "repo"),
+            "machines": named(Counter(machine_ids), "machine"),
+            "os": named(Counter(os_ids), "os"),
+            "buckets": buckets,
+            "top_branches": branches,
+            "activity": _activity_streaks(sorted(set(days)), epoch, top),
+        }
+
+    @_measured
+    def dedupe(self, threshold=None):
+        """
+        Cluster near-duplicate episodes across the whole corpus.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity (default: 0.8)
+
+        Returns:
+            dict: Clusters of near-duplicate episode filenames, newest first
+        """
+        from near_duplicates import DEFAULT_THRESHOLD
+
+        threshold = DEFAULT_THRESHOLD if threshold is None else threshold
+        with self.near_duplicate_index() as index:
+            clusters = index.clusters(threshold)
+
+        clusters = [sorted(c, reverse=True) for c in clusters]
+        clusters.sort(key=lambda c: (-len(c), c[0]))
+        return {
+            "threshold": threshold,
+            "clusters": clusters,
+            "duplicate_episodes": sum(len(c) - 1 for c in clusters),
+        }
+
+    def near_duplicate_index(self, refresh=True):
+        """
+        Open the MinHash/LSH near-duplicate index.
+
+        Args:
+            refresh: Index episodes added since the last use (default: True)
+
+        Returns:
+            NearDuplicateIndex: Caller should close it when done
+        """
+        from near_duplicates import NearDuplicateIndex
+        from utils import ensure_index_dir
+
+        index = NearDuplicateIndex(ensure_index_dir(self.memory_dir, "minhash"))
+        if refresh:
+            index.update(self._episode_names(), self._read_episodes)
+        return index
+
+    def cached(self, command, params, compute):
+        """
+        Return a cached result for a query, computing and storing it on a miss.
+
+        Results are keyed on the command, its normalized parameters and a
+        fingerprint of the memory tree (see result_cache), so they are
+        reused only while no memory file has changed.
+
+        Args:
+            command: Query name
+            params: JSON-serializable, normalized query parameters
+            compute: Zero-argument callable producing the result
+
+        Returns:
+            The query result
+        """
+        from result_cache import ResultCache, memory_fingerprint
+        from utils import ensure_index_dir
+
+        cache = ResultCache(ensure_index_dir(self.memory_dir, "query-cache"))
+        key = cache.key(command, params, memory_fingerprint(self.config_repo, self.memory_dir))
+        hit, result = cache.get(key)
+        if not hit:
+            result = compute()
+            cache.put(key, result)
+        return result
+
+    def refresh_indexes(self):
+        """
+        Bring the derived episode indexes up to date.
+
+        Called after new episodes arrive (e.g. by a background prefetch) so
+        the next query doesn't pay for parsing them.
+
+        Returns:
+            dict: Per-index update counts
+        """
+        result = {"snapshot": self.snapshot(refresh=True)[1]}
+        with self.episode_table(refresh=False) as table:
+            result["episode_table"] = table.update(self._episode_names(), self._read_episode_headers)
+        with self.near_duplicate_index(refresh=False) as index:
+            result["minhash"] = index.update(self._episode_names(), self._read_episodes)
+        return result
+
+    def snapshot(self, refresh=True):
+        """
+        Load the binary snapshot of repository metadata and episode headers.
+
+        A snapshot matching the current memory fingerprint is used as is;
+        otherwise it is refreshed (parsing only what changed) and rewritten.
+        Once loaded, episode headers are served from it instead of parsing
+        episode files. Reader commands load it lazily, only once they have
+        headers or repository files to parse (see _episode_snapshot and
+        _snapshot_repo).
+
+        Args:
+            refresh: Bring a stale snapshot up to date (default: True); if
+                False, a stale or missing snapshot yields None
+
+        Returns:
+            tuple: (MemorySnapshot or None, refresh counts or None)
+        """
+        from result_cache import memory_fingerprint
+        from snapshot import MemorySnapshot
+        from utils import ensure_index_dir
+
+        self._snapshot_checked = True
+        ensure_index_dir(self.memory_dir, "snapshot")
+        path = self._snapshot_path()
+        fingerprint = memory_fingerprint(self.config_repo, self.memory_dir)
+        if self._snapshot is not None and self._snapshot.fingerprint == fingerprint:
+            return self._snapshot, None
+
+        snapshot = MemorySnapshot.load(path)
+        counts = None
+        if snapshot is None or snapshot.fingerprint != fingerprint:
+            if not refresh:
+                return None, None
+            snapshot = snapshot or MemorySnapshot()
+            counts = snapshot.refresh(
+                fingerprint,
+                self.repos_dir,
+                self._episode_names(include_cold=True),
+                lambda names: self._read_episode_headers(names, include_cold=True),
+            )
+            snapshot.save(path)
+        self._snapshot = snapshot
+        return snapshot, counts
+
+    def repo_index(self, refresh=True):
+        """
+        Open the repository metadata index.
+
+        Args:
+            refresh: Re-read repository files changed since the last use
+                (default: True)
+
+        Returns:
+            RepoIndex: The index
+        """
+        import metrics
+        from repo_index import RepoIndex
+        from utils import ensure_index_dir
+
+        index = RepoIndex(ensure_index_dir(self.memory_dir, "repos"))
+        if refresh:
+            index.update(self.repos_dir, self.access_dir)
+            metrics.set_gauge("dev_memory_repositories", len(index.repos))
+        return index
+
+    def timeline(self, refresh=True):
+        """
+        Open the per-repository episode timelines.
+
+        Args:
+            refresh: Catch up with episodes committed since the last use
+                (default: True)
+
+        Returns:
+            Timeline: The timelines
+        """
+        import subprocess
+        from timeline import Timeline
+        from utils import ensure_index_dir
+
+        timeline = Timeline(ensure_index_dir(self.memory_dir, "timeline"))
+        if not refresh:
+            return timeline
+
+        def git(*args):
+            result = subprocess.run(
+                ["git", "-C", str(self.config_repo)] + list(args), capture_output=True, text=True
+            )
+            return result.stdout if result.returncode == 0 else None
+
+        head = (git("rev-parse", "--verify", "--quiet", "HEAD") or "").strip() or None
+
+        def added_since(old_head):
+            memory = self.memory_dir.relative_to(self.config_repo).as_posix()
+            output = git("diff", "--name-only", "--diff-filter=A", "-z", old_head, head, "--",
+                         f"{memory}/episodes", f"{memory}/cold/episodes")
+            if output is None:
+                return None
+            names = set()
+            for path in output.split("\0"):
+                filename = path.rsplit("/", 1)[-1]
+                if filename.endswith(".md"):
+                    names.add(filename)
+                elif filename.endswith(".pack"):
+                    names.update(self._pack_names(filename))
+            return sorted(names)
+
+        def read_all():
+            return self.snapshot()[0].episodes.items()
+
+        def read_headers(names):
+            for name in names:
+                content = self._read_episode(name)
+                if content is not None:
+                    yield name, split_frontmatter(content)[0]
+
+        timeline.sync(head, added_since, read_all, read_headers)
+        return timeline
+
+    def episode_table(self, refresh=True):
+        """
+        Open the columnar episode metadata table.
+
+        Args:
+            refresh: Append rows for episodes added since the last use
+                (default: True)
+
+        Returns:
+            EpisodeTable: Caller should close it when done
+        """
+        import metrics
+        from episode_table import EpisodeTable
+        from utils import ensure_index_dir
+
+        table = EpisodeTable(ensure_index_dir(self.memory_dir, "episode-table"))
+        if refresh:
+            table.update(self._episode_names(), self._read_episode_headers)
+            metrics.set_gauge("dev_memory_episodes", table.rows)
+        return table
+
+    def _episode_names(self, include_cold=False):
+        """Filenames of all loose and packed episodes, without reading them."""
+        from episode_pack import EpisodePack, list_packs
+
+        names = []
+        for _, episodes_dir, packs_dir in self._tiers(include_cold):
+            names.extend(f.name for f in episodes_dir.glob("*.md"))
+            for pack_path in list_packs(packs_dir):
+                names.extend(EpisodePack(pack_path).names())
+        if include_cold:
+            # A hot episode shadows a cold copy of the same name
+            names = list(dict.fromkeys(names))
+        return names
+
+    def _snapshot_path(self):
+        """Path of the binary snapshot (see snapshot)."""
+        return self.memory_dir / "index" / "snapshot" / "state.bin"
+
+    def _episode_snapshot(self):
+        """
+        The snapshot, loaded on first use if it matches the memory fingerprint.
+
+        Returns:
+            MemorySnapshot: The snapshot, or None if missing or stale
+        """
+        if self._snapshot is None and not self._snapshot_checked:
+            self.snapshot(refresh=False)
+        return self._snapshot
+
+    def _snapshot_repo(self, slug, stat):
+        """
+        Parsed frontmatter of a repository file from the snapshot, if it
+        holds this exact version of the file.
+
+        Repository entries carry their file's [size, mtime_ns], which is
+        check enough, so the snapshot file is loaded without computing the
+        memory fingerprint (and its git calls) when none is loaded yet.
+
+        Args:
+            slug: Repository slug
+            stat: [size, mtime_ns] of the repository file
+        """
+        if self._repo_snapshot is None:
+            from snapshot import MemorySnapshot
+
+            self._repo_snapshot = self._snapshot or MemorySnapshot.load(self._snapshot_path()) or MemorySnapshot()
+        entry = (self._snapshot or self._repo_snapshot).repos.get(slug)
+        if entry is not None and list(entry[:2]) == list(stat):
+            return entry[2]
+        return None
+
+    def _read_episode_headers(self, names, include_cold=False):
+        """Yield (filename, frontmatter) for the given episodes, from the snapshot when it is current."""
+        snapshot = self._episode_snapshot()
+        if snapshot is not None:
+            known = snapshot.episodes
+            missing = []
+            for name in names:
+                if name in known:
+                    yield name, known[name]
+                else:
+                    missing.append(name)
+            names = missing
+            if not names:
+                return
+        for name, content in self._iter_episodes(names, include_cold=include_cold):
+            frontmatter, _ = split_frontmatter(content)
+            yield name, frontmatter
+
+    def _read_episodes(self, names):
+        """Yield (filename, frontmatter, body) for the given episodes."""
+        for name, content in self._iter_episodes(names):
+            frontmatter, body = split_frontmatter(content)
+            yield name, frontmatter, episode_body(frontmatter, body)
+
+    def _iter_hot_episodes(self, names, skip_shards=()):
+        """
+        Yield (filename, content) for hot episodes, in the order given.
+
+        Each episode is read from its loose file or, failing that, from its
+        month's pack. Only one pack is open at a time, which suits a
+        time-ordered walk: it moves from pack to pack month by month.
+        Episodes in ``skip_shards`` are not read.
+        """
+        import metrics
+        from episode_pack import EpisodePack, month_of
+
+        pack = None
+        try:
+            for name in names:
+                episode_file = self.episodes_dir / name
+                if episode_file.is_file():
+                    if skip_shards and _loose_shard("hot", name) in skip_shards:
+                        continue
+                    content = episode_file.read_text(encoding="utf-8")
+                else:
+                    pack_path = self.packs_dir / f"{month_of(name)}.pack"
+                    if pack is None or pack.pack_path != pack_path:
+                        if pack is not None:
+                            pack.close()
+                            pack = None
+                        if not pack_path.exists():
+                            continue
+                        pack = EpisodePack(pack_path)
+                    if name not in pack.entries or (skip_shards and _pack_shard("hot", pack_path) in skip_shards):
+                        continue
+                    content = pack.read_text(name)
+                metrics.add_read_bytes(len(content))
+                yield name, content
+        finally:
+            if pack is not None:
+                pack.close()
+
+    def _iter_episodes(self, names=None, include_cold=False, skip_shards=()):
+        """
+        Yield (filename, content) for every episode, or only for ``names``.
+
+        Loose files under episodes/ come first, then monthly packs; a loose
+        file shadows a packed episode of the same name. With include_cold,
+        the cold tier follows in the same order. Episodes in ``skip_shards``
+        (see _loose_shard/_pack_shard) are not read, but still shadow.
+        """
+        import metrics
+        from episode_pack import EpisodePack, list_packs
+
+        wanted = set(names) if names is not None else None
+        seen = set()
+        for tier, episodes_dir, packs_dir in self._tiers(include_cold):
+            for episode_file in episodes_dir.glob("*.md"):
+                seen.add(episode_file.name)
+                if skip_shards and _loose_shard(tier, episode_file.name) in skip_shards:
+                    continue
+                if wanted is None or episode_file.name in wanted:
+                    content = episode_file.read_text(encoding="utf-8")
+                    metrics.add_read_bytes(len(content))
+                    yield episode_file.name, content
+
+            for pack_path in list_packs(packs_dir):
+                with EpisodePack(pack_path) as pack:
+                    if skip_shards and _pack_shard(tier, pack_path) in skip_shards:
+                        seen.update(pack.names())
+                        continue
+                    for name in pack.names():
+                        if name not in seen and (wanted is None or name in wanted):
+                            seen.add(name)
+                            content = pack.read_text(name)
+                            metrics.add_read_bytes(len(content))
+                            yield name, content
+
+    def _read_episode(self, name):
+        """Content of one episode wherever it is stored (hot or cold, loose or packed), or None."""
+        import metrics
+        from episode_pack import EpisodePack, month_of
+
+        month = month_of(name)
+        for _, episodes_dir, packs_dir in self._tiers(include_cold=True):
+            content = None
+            try:
+                content = (episodes_dir / name).read_text(encoding="utf-8")
+            except FileNotFoundError:
+                pack_path = packs_dir / f"{month}.pack"
+                if month and pack_path.exists():
+                    with EpisodePack(pack_path) as pack:
+                        if name in pack.entries:
+                            content = pack.read_text(name)
+            if content is not None:
+                metrics.add_read_bytes(len(content))
+                return content
+        return None
+
+    def _pack_names(self, pack_filename):
+        """Episode names in a pack, wherever the pack now lives."""
+        from episode_pack import EpisodePack
+
+        for _, _, packs_dir in self._tiers(include_cold=True):
+            pack_path = packs_dir / pack_filename
+            if pack_path.exists():
+                return EpisodePack(pack_path).names()
+        return []
+
+    def _tiers(self, include_cold=False):
+        """(tier, loose episodes dir, packs dir) for the hot and optionally cold tier."""
+        from cold_tier import cold_dirs
+
+        tiers = [("hot", self.episodes_dir, self.packs_dir)]
+        if include_cold:
+            tiers.append(("cold",) + cold_dirs(self.memory_dir)[1:])
+        return tiers
+
+    def _shards_without(self, keywords, include_cold=False):
+        """
+        Ids of episode shards whose Bloom filter rules out one of the keywords.
+
+        Filters of new or changed shards are (re)built first, so the result
+        never skips a shard that could match.
+        """
+        import os
+        from bloom_index import ShardBloomIndex, query_grams
+        from episode_pack import EpisodePack, list_packs
+        from utils import ensure_index_dir
+
+        grams = set()
+        for keyword in keywords:
+            grams |= query_grams(keyword) or set()
+        if not grams:
+            return set()
+
+        def loose_texts(episodes_dir):
+            def read(names):
+                for name in names:
+                    frontmatter, body = split_frontmatter((episodes_dir / name).read_text(encoding="utf-8"))
+                    yield _searchable_text(frontmatter, body) if frontmatter is not None else ""
+            return read
+
+        def pack_texts(pack_path):
+            def read():
+                with EpisodePack(pack_path) as pack:
+                    for name in pack.names():
+                        frontmatter, body = split_frontmatter(pack.read_text(name))
+                        yield _searchable_text(frontmatter, body) if frontmatter is not None else ""
+            return read
+
+        tiers = self._tiers(include_cold)
+        live = []
+        with ShardBloomIndex(ensure_index_dir(self.memory_dir, "bloom")) as blooms:
+            for tier, episodes_dir, packs_dir in tiers:
+                loose = {}
+                if episodes_dir.exists():
+                    with os.scandir(episodes_dir) as entries:
+                        for entry in entries:
+                            if entry.name.endswith(".md") and entry.is_file():
+                                stat = entry.stat()
+                                shard = loose.setdefault(_loose_shard(tier, entry.name), {})
+                                shard[entry.name] = [stat.st_size, stat.st_mtime_ns]
+                for shard, files in loose.items():
+                    blooms.sync_loose(shard, files, loose_texts(episodes_dir))
+                    live.append(shard)
+
+                for pack_path in list_packs(packs_dir):
+                    shard = _pack_shard(tier, pack_path)
+                    stat = pack_path.stat()
+                    blooms.sync_sealed(shard, [stat.st_size, stat.st_mtime_ns], pack_texts(pack_path))
+                    live.append(shard)
+
+            blooms.prune(live, tiers=[tier for tier, _, _ in tiers])
+            return {shard for shard in live if not blooms.may_contain(shard, grams)}
+
+    def _find_cold_repo(self, repo_name):
+        """find_repo result for a repository in the cold tier, from its tombstone."""
+        from cold_tier import read_repo_tombstones
+
+        tombstone = read_repo_tombstones(self.memory_dir).get(repo_name)
+        if tombstone is None:
+            return {"repository": repo_name, "clones": [], "found": False}
+
+        location = tombstone.get("location")
+        return {
+            "repository": repo_name,
+            "description": tombstone.get("description", ""),
+            "clones": [location] if location else [],
+            "tags": tombstone.get("tags", []),
+            "archived": tombstone.get("archived", True),
+            "archived_date": tombstone.get("archived_date"),
+            "archived_reason": tombstone.get("archived_reason"),
+            "found": True,
+            "cold": True,
+        }
+
+
+def _iso_bound(value, option):
+    """
+    POSIX seconds of a --since/--until value (None if not given).
+
+    parse_timestamp turns anything unparseable into 0, which would quietly
+    drop or invert the filter, so the value is validated first.
+    """
+    from datetime import datetime
+    from utils import parse_timestamp
+
+    if not value:
+        return None
+    try:
+        datetime.fromisoformat(str(value))
+    except ValueError:
+        raise ValueError(f"Invalid --{option}: {value} (expected an ISO date/time, e.g. 2026-09-01)") from None
+    return parse_timestamp(value)
+
+
+def _search_matches(plan, episodes, conjuncts):
+    """
+    Match stage of search_memory: yield (POSIX timestamp, result) for each
+    episode satisfying the plan.
+
+    Args:
+        plan: SearchPlan
+        episodes: Iterable of (filename, content)
+        conjuncts: Conditions to check (None: all of them)
+    """
+    from memory_query import Episode
+    from utils import parse_timestamp
+
+    for _, content in episodes:
+        frontmatter, body = split_frontmatter(content)
+        if frontmatter is None or not plan.matches(Episode(frontmatter, body), conjuncts):
+            continue
+        repository = frontmatter.get("repository", {})
+        yield parse_timestamp(frontmatter.get("timestamp")), {
+            "episode_id": frontmatter.get("id"),
+            "timestamp": frontmatter.get("timestamp"),
+            "machine": frontmatter.get("machine"),
+            "os": frontmatter.get("os"),
+            "repository": repository.get("name"),
+            "branch": repository.get("branch"),
+            "commit": repository.get("commit"),
+            "summary": frontmatter.get("summary"),
+            "keywords": frontmatter.get("keywords", []),
+            "tags": frontmatter.get("context", {}).get("tags", []),
+        }
+
+
+def _header_text(frontmatter):
+    """Lower-cased text of an episode's header, as searched."""
+    import json
+
+    return json.dumps(frontmatter).lower()
+
+
+def _searchable_text(frontmatter, body):
+    """Lower-cased text search_memory matches keywords against."""
+    return _header_text(frontmatter) + " " + episode_body(frontmatter, body).lower()
+
+
+def _loose_shard(tier, filename):
+    """Bloom filter shard of a loose episode file: its tier and month."""
+    from episode_pack import month_of
+
+    return f"{tier}/loose/{month_of(filename) or 'undated'}"
+
+
+def _pack_shard(tier, pack_path):
+    """Bloom filter shard of a monthly pack."""
+    return f"{tier}/pack/{pack_path.stem}"
+
+
+def _activity_streaks(active_days, epoch, top):
+    """
+    Streaks of consecutive active days and the longest gaps between them.
+
+    Args:
+        active_days: Sorted distinct day numbers (days since ``epoch``)
+        epoch: date corresponding to day 0
+        top: Number of gaps to report
+    """
+    from datetime import UTC, datetime, timedelta
+
+    def iso(day):
+        return (epoch + timedelta(days=day)).isoformat()
+
+    if not active_days:
+        return {"active_days": 0, "longest_streak": None, "current_streak": 0, "longest_gaps": []}
+
+    longest = (active_days[0], active_days[0])
+    start = active_days[0]
+    gaps = []
+    for prev, day in zip(active_days, active_days[1:]):
+        if day != prev + 1:
+            gaps.append((day - prev - 1, prev, day))
+            start = day
+        if day - start > longest[1] - longest[0]:
+            longest = (start, day)
+
+    today = (datetime.now(UTC).date() - epoch).days
+    last = active_days[-1]
+    current = last - start + 1 if today - last <= 1 else 0
+    gaps.sort(reverse=True)
+
+    return {
+        "active_days": len(active_days),
+        "first_day": iso(active_days[0]),
+        "last_day": iso(last),
+        "longest_streak": {
+            "days": longest[1] - longest[0] + 1,
+            "start": iso(longest[0]),
+            "end": iso(longest[1]),
+        },
+        "current_streak": current,
+        "longest_gaps": [
+            {"days": length, "after": iso(prev), "before": iso(day)}
+            for length, prev, day in gaps[:top]
+        ],
+    }
 
 
 def main():
     import argparse
+    from cli import run
 
     parser = argparse.ArgumentParser(description="Query memory")
-    parser.add_argument("command", choices=["find-repo", "list-recent-repos", "search-memory"])
+    parser.add_argument(
+        "command",
+        choices=["find-repo", "list-recent-repos", "search-memory", "resume-context", "stats", "dedupe",
+                 "snapshot"],
+    )
     parser.add_argument("--config-repo", required=True)
     parser.add_argument("--repo-name", help="Repository name")
     parser.add_argument("--count", type=int, default=5)
     parser.add_argument("--filter", default="all")
-    parser.add_argument("--query", help="Search query")
+    parser.add_argument("--query", help="Search query, e.g. 'tag:auth machine:work-main after:2026-09 branch:feature/*'")
+    parser.add_argument("--explain", action="store_true",
+                        help="Show the search plan and its cost instead of running it (search-memory)")
     parser.add_argument("--limit", type=int, default=10)
     parser.add_argument("--include-archived", action="store_true", help="Include archived repositories")
+    parser.add_argument("--include-cold", action="store_true",
+                        help="Also search episodes in cold storage (search-memory)")
+    parser.add_argument("--bucket", default="week", choices=["day", "week", "month"],
+                        help="Time bucket for stats")
+    parser.add_argument("--since", help="Only count episodes at or after this ISO date (stats)")
+    parser.add_argument("--until", help="Only count episodes before this ISO date (stats)")
+    parser.add_argument("--machine", help="Only count episodes from this machine (stats)")
+    parser.add_argument("--os", help="Only count episodes from this OS (stats)")
+    parser.add_argument("--threshold", type=float, help="Similarity threshold (dedupe, default: 0.8)")
+    parser.add_argument("--repo-path", help="Local repository path, instead of --repo-name (resume-context)")
+    parser.add_argument("--branch", help="Only episodes on this branch (resume-context)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Bypass the query result cache (list-recent-repos, search-memory)")
 
     args = parser.parse_args()
 
     engine = QueryMemory(args.config_repo)
 
-    try:
+    def cached(command, params, compute):
+        if args.no_cache:
+            return compute()
+        return engine.cached(command, params, compute)
+
+    def handler():
         if args.command == "find-repo":
-            result = engine.find_repo(args.repo_name)
+            # Not cached: one file read costs less than the cache's git fingerprint
+            return engine.find_repo(args.repo_name)
         elif args.command == "list-recent-repos":
-            result = engine.list_recent_repos(args.count, args.filter, args.include_archived)
+            return cached(
+                "list-recent-repos",
+                {"count": args.count, "filter": args.filter, "include_archived": args.include_archived},
+                lambda: engine.list_recent_repos(args.count, args.filter, args.include_archived),
+            )
         elif args.command == "search-memory":
-            result = engine.search_memory(args.query, args.limit)
+            if args.explain:
+                return engine.search_memory(args.query, args.limit, args.include_cold, explain=True)
+            from memory_query import describe, parse
 
-        print(json.dumps(result, indent=2))
-        sys.exit(0)
+            # AND/OR operands commute, so equivalent queries share a cache entry
+            query = describe(parse(args.query), canonical=True)
+            return cached(
+                "search-memory",
+                {"query": query, "limit": args.limit, "include_cold": args.include_cold},
+                lambda: engine.search_memory(args.query, args.limit, args.include_cold),
+            )
+        elif args.command == "resume-context":
+            return engine.resume_context(
+                repo_name=args.repo_name,
+                branch=args.branch,
+                count=args.count,
+                repo_path=args.repo_path,
+                machine=args.machine,
+            )
+        elif args.command == "stats":
+            return engine.stats(
+                bucket=args.bucket,
+                since=args.since,
+                until=args.until,
+                machine=args.machine,
+                os=args.os,
+                repo=args.repo_name,
+                top=args.count,
+            )
+        elif args.command == "dedupe":
+            return engine.dedupe(args.threshold)
+        elif args.command == "snapshot":
+            snapshot, refreshed = engine.snapshot()
+            return {
+                "success": True,
+                "fingerprint": snapshot.fingerprint,
+                "repos": len(snapshot.repos),
+                "episodes": len(snapshot.episodes),
+                "refreshed": refreshed,
+            }
 
-    except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}), file=sys.stderr)
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+    run(handler)
 
 
 if __name__ == "__main__":
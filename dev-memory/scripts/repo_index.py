@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Index of repository metadata for selecting repositories without parsing.
+
+``memory/index/repos/repos.json`` maps each repository slug to the fields
+bulk operations filter on (name, machine, OS, path, tags, last_accessed,
+archived) together with the (size, mtime) of the file they were read from.
+Refreshing the index stats the repositories directory and parses only
+files that are new or changed since the last refresh.
+
+It also holds the newest access per slug from the per-machine access logs
+(see access_log), read incrementally: a log that grew is read from where
+the last refresh stopped, and only a log that shrank or disappeared (it was
+compacted into the repository files) causes the logs to be re-read.
+"""
+
+import json
+import os
+from pathlib import Path
+
+INDEX_VERSION = 1
+
+
+def repo_entry(frontmatter, slug):
+    """Indexed fields of one repository metadata file."""
+    repository = frontmatter.get("repository") or {}
+    location = frontmatter.get("location")
+    if not location:
+        # Legacy v1.0 files list clones; use the most recently accessed one
+        clones = [c for c in frontmatter.get("clones") or [] if isinstance(c, dict)]
+        location = max(clones, key=lambda c: str(c.get("last_accessed") or ""), default={})
+    return {
+        "name": repository.get("name") or slug,
+        "machine": location.get("machine"),
+        "os": location.get("os"),
+        "path": location.get("path"),
+        "last_accessed": str(location.get("last_accessed") or "") or None,
+        "tags": [str(t) for t in frontmatter.get("tags") or []],
+        "archived": bool(frontmatter.get("archived", False)),
+    }
+
+
+class RepoIndex:
+    """Repository metadata index with incremental refresh."""
+
+    def __init__(self, index_dir):
+        """
+        Open (or prepare) the index.
+
+        Args:
+            index_dir: Directory holding repos.json
+        """
+        self.index_dir = Path(index_dir)
+        self.index_path = self.index_dir / "repos.json"
+        self.repos = {}
+        # {"logs": {name: [size, mtime_ns, offset, last line read]},
+        #  "latest": {slug: timestamp}}
+        self.access = {"logs": {}, "latest": {}}
+        if self.index_path.exists():
+            try:
+                data = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except ValueError:
+                data = {}
+            if data.get("version") == INDEX_VERSION:
+                self.repos = data.get("repos", {})
+                self.access = data.get("access") or self.access
+
+    def update(self, repos_dir, access_dir=None):
+        """
+        Bring the index in line with a repositories directory.
+
+        Args:
+            repos_dir: The ``memory/repositories`` directory
+            access_dir: The ``memory/access`` log directory (optional)
+
+        Returns:
+            dict: Counts of parsed and removed entries
+        """
+        from utils import split_frontmatter
+
+        repos_dir = Path(repos_dir)
+        current = {}
+        if repos_dir.exists():
+            with os.scandir(repos_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not name.endswith(".md") or name.startswith(".") or name[:-3].lower() == "readme":
+                        continue
+                    stat = entry.stat()
+                    current[name[:-3]] = [stat.st_size, stat.st_mtime_ns]
+
+        parsed = 0
+        removed = [slug for slug in self.repos if slug not in current]
+        for slug in removed:
+            del self.repos[slug]
+        for slug, stat in current.items():
+            known = self.repos.get(slug)
+            if known is not None and known["stat"] == stat:
+                continue
+            try:
+                frontmatter, _ = split_frontmatter((repos_dir / f"{slug}.md").read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                continue
+            entry = repo_entry(frontmatter or {}, slug)
+            entry["stat"] = stat
+            self.repos[slug] = entry
+            parsed += 1
+
+        changed = bool(parsed or removed)
+        if access_dir is not None:
+            changed = self._update_access(access_dir) or changed
+        if changed:
+            self._save()
+        return {"parsed": parsed, "removed": len(removed), "repos": len(self.repos)}
+
+    def update_access(self, access_dir):
+        """
+        Read new access log lines without re-checking the repository files.
+
+        Args:
+            access_dir: The ``memory/access`` log directory
+        """
+        if self._update_access(access_dir):
+            self._save()
+
+    def last_accessed(self, slug, recorded=None):
+        """
+        Newest access of a repository.
+
+        Args:
+            slug: Repository slug
+            recorded: last_accessed from the file (default: the indexed one)
+
+        Returns:
+            str: ISO timestamp, or None if never accessed
+        """
+        if recorded is None:
+            recorded = (self.repos.get(slug) or {}).get("last_accessed")
+        logged = self.access["latest"].get(slug)
+        return max(str(recorded or ""), logged or "") or None
+
+    def select(self, pattern=None, machine=None, os_type=None, tag=None, accessed_before=None,
+               archived=None):
+        """
+        Slugs of repositories matching every given filter.
+
+        Args:
+            pattern: fnmatch glob matched against the slug or repository name
+            machine: Exact machine
+            os_type: Exact OS
+            tag: Tag the repository must have
+            accessed_before: POSIX time; last_accessed must be earlier (or missing)
+            archived: True/False to require that archived state
+
+        Returns:
+            list: Matching slugs, sorted
+        """
+        return sorted(slug for slug, entry in self.repos.items() if matches(
+            slug, dict(entry, last_accessed=self.last_accessed(slug)),
+            pattern, machine, os_type, tag, accessed_before, archived
+        ))
+
+    def _update_access(self, access_dir):
+        """Fold new access log lines into ``self.access``; True if anything changed."""
+        from access_log import parse_lines
+
+        access_dir = Path(access_dir)
+        current = {}
+        if access_dir.exists():
+            with os.scandir(access_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".log"):
+                        stat = entry.stat()
+                        current[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+        logs = self.access["logs"]
+        latest = self.access["latest"]
+        changed = False
+        for name in [name for name in logs if name not in current]:
+            del logs[name]
+            changed = True
+        for name, (size, mtime) in current.items():
+            known = logs.get(name)
+            if known is not None and known[:2] == [size, mtime]:
+                continue
+            with open(access_dir / name, "rb") as f:
+                offset = _resume_offset(f, known, size)
+                f.seek(offset)
+                data = f.read(size - offset)
+            # A line still being appended is picked up next time
+            complete = data.rfind(b"\n") + 1
+            lines = data[:complete].decode("utf-8", "replace")
+            parse_lines(lines, latest)
+            if lines:
+                tail = lines.splitlines()[-1]
+            else:
+                tail = known[3] if offset else ""
+            logs[name] = [size, mtime, offset + complete, tail]
+            changed = True
+        return changed
+
+    def _save(self):
+        from utils import atomic_write_text
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.index_path,
+                          json.dumps({"version": INDEX_VERSION, "repos": self.repos, "access": self.access}))
+
+
+def _resume_offset(f, known, size):
+    """
+    Where to continue reading a log: after the last line read, if the log
+    still has that line there, or from the start if it was rewritten.
+    Entries folded from an old version of the log stay valid, since each
+    one was a real access.
+    """
+    if known is None or len(known) < 4 or size < known[2]:
+        return 0
+    offset, tail = known[2], known[3].encode("utf-8") + b"\n"
+    if offset < len(tail):
+        return 0
+    f.seek(offset - len(tail))
+    return offset if f.read(len(tail)) == tail else 0
+
+
+def matches(slug, entry, pattern=None, machine=None, os_type=None, tag=None, accessed_before=None,
+            archived=None):
+    """Whether one repository entry (see repo_entry) passes the filters of RepoIndex.select."""
+    from fnmatch import fnmatchcase
+    from utils import parse_timestamp
+
+    if pattern and not (fnmatchcase(slug, pattern) or fnmatchcase(entry.get("name") or "", pattern)):
+        return False
+    if machine and entry.get("machine") != machine:
+        return False
+    if os_type and entry.get("os") != os_type:
+        return False
+    if tag and tag not in (entry.get("tags") or []):
+        return False
+    if accessed_before is not None and parse_timestamp(entry.get("last_accessed")) >= accessed_before:
+        return False
+    if archived is not None and bool(entry.get("archived")) != archived:
+        return False
+    return True
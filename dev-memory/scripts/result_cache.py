@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of query results, keyed on the state of the memory tree.
+
+A result is stored under a key built from the command, its normalized
+arguments and a fingerprint of ``domains/dev/memory``: the git tree hash of
+the directory at HEAD, plus the status and (size, mtime) of any files that
+differ from it. Any commit, pull or local edit under the memory directory
+changes the fingerprint, so a hit is always what the query would return.
+When the config repo is not a git checkout, the fingerprint covers every
+file's (size, mtime) instead.
+
+Entries live in ``memory/index/query-cache/`` as one JSON file each and are
+evicted least-recently-used once there are more than MAX_ENTRIES, more than
+MAX_BYTES in total, or they are older than MAX_AGE seconds.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+CACHE_VERSION = 1
+MAX_ENTRIES = 256
+MAX_BYTES = 8 * 1024 * 1024
+MAX_AGE = 7 * 24 * 3600
+
+
+def memory_fingerprint(config_repo, memory_dir):
+    """
+    Fingerprint of the memory directory's current contents.
+
+    Args:
+        config_repo: Root of the config repository
+        memory_dir: The ``domains/dev/memory`` directory inside it
+
+    Returns:
+        str: Hex digest that changes whenever a memory file changes
+    """
+    import hashlib
+    import subprocess
+
+    config_repo = Path(config_repo)
+    relpath = Path(memory_dir).relative_to(config_repo).as_posix()
+    digest = hashlib.sha256()
+
+    tree = subprocess.run(
+        ["git", "-C", str(config_repo), "rev-parse", "--verify", "--quiet", f"HEAD:{relpath}"],
+        capture_output=True,
+    )
+    status = subprocess.run(
+        ["git", "-C", str(config_repo), "status", "--porcelain", "-z",
+         "--untracked-files=all", "--", relpath],
+        capture_output=True,
+    )
+    if status.returncode != 0:
+        # Not a git checkout: fall back to stat'ing every file
+        for path in sorted(Path(memory_dir).rglob("*")):
+            if "index" in path.relative_to(memory_dir).parts[:1] or not path.is_file():
+                continue
+            stat = path.stat()
+            digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode("utf-8"))
+        return digest.hexdigest()
+
+    digest.update(tree.stdout)
+    digest.update(status.stdout)
+    # Changed files keep the same status line when edited again; their
+    # stat tells the edits apart
+    for entry in status.stdout.split(b"\0"):
+        if len(entry) > 3:
+            try:
+                stat = (config_repo / os.fsdecode(entry[3:])).stat()
+            except OSError:
+                continue
+            digest.update(f"{stat.st_size}\0{stat.st_mtime_ns}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Bounded directory of cached JSON results."""
+
+    def __init__(self, cache_dir, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        """
+        Args:
+            cache_dir: Directory holding the entries
+            max_entries: Most entries kept
+            max_bytes: Most total bytes kept
+            max_age: Seconds after which an entry is dropped
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    @staticmethod
+    def key(command, params, fingerprint):
+        """Cache key for a command, its normalized parameters and a fingerprint."""
+        import hashlib
+
+        material = json.dumps([CACHE_VERSION, command, params, fingerprint], sort_keys=True)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up an entry.
+
+        Returns:
+            tuple: (True, result) on a hit, (False, None) otherwise
+        """
+        path = self.cache_dir / f"{key}.json"
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return False, None
+        if time.time() - entry.get("created", 0) > self.max_age:
+            return False, None
+        # Reading marks the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return True, entry["result"]
+
+    def put(self, key, result):
+        """Store an entry, then evict entries beyond the bounds."""
+        from utils import atomic_write_text
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        text = json.dumps({"created": time.time(), "result": result})
+        if len(text) > self.max_bytes:
+            return
+        atomic_write_text(self.cache_dir / f"{key}.json", text)
+        self._evict()
+
+    def clear(self):
+        """Remove every entry."""
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _evict(self):
+        entries = []
+        now = time.time()
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        entries.sort(reverse=True)
+        kept = total = 0
+        for mtime, size, path in entries:
+            total += size
+            kept += 1
+            if kept > self.max_entries or total > self.max_bytes or now - mtime > self.max_age:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
@@ -3,12 +3,15 @@
 Scan local repositories and compare with memory system.
 """
 
-import sys
-import json
 from pathlib import Path
-import platform
-import yaml
-from utils import normalize_repo_slug, get_machine_id, get_os_type
+
+import metrics
+from utils import normalize_repo_slug, get_machine_id, split_frontmatter
+
+# Seconds of quiet that end a burst of filesystem events in watch mode
+WATCH_DEBOUNCE = 0.05
+# Clones checked concurrently by repo-status
+REPO_STATUS_WORKERS = 16
 
 
 class ScanRepos:
@@ -25,6 +28,7 @@ class ScanRepos:
         self.dev_domain = self.config_repo / "domains" / "dev"
         self.repos_dir = self.dev_domain / "memory" / "repositories"
 
+    @metrics.measured("scan")
     def scan_repos(self, mode="all", machine=None):
         """
         Scan local repositories.
@@ -72,10 +76,87 @@ class ScanRepos:
         result["total_local"] = len(local_repos)
         result["total_tracked"] = len(tracked_repos)
 
+        metrics.set_gauge("dev_memory_scanned_repositories", len(untracked_slugs), status="untracked")
+        metrics.set_gauge("dev_memory_scanned_repositories", len(missing_slugs), status="missing")
+        metrics.set_gauge("dev_memory_scanned_repositories", len(local_slugs & tracked_slugs), status="tracked")
+
         return result
 
+    @metrics.measured("scan")
+    def repo_status(self, machine=None, workers=REPO_STATUS_WORKERS, use_cache=True):
+        """
+        Status of every local clone, joined with its metadata and last episode.
+
+        Branch, HEAD and upstream are read from each clone's .git directory.
+        git runs for the dirty state and (when HEAD and upstream differ) the
+        ahead/behind counts, on a bounded thread pool. The counts are cached
+        per clone until its HEAD or upstream moves; the dirty state is always
+        checked, since editing a file changes neither the index nor any ref.
+
+        Args:
+            machine: Machine identifier (optional, will be auto-detected)
+            workers: Clones checked concurrently
+            use_cache: Reuse cached ahead/behind counts of clones whose HEAD
+                and upstream haven't moved (default: True)
+
+        Returns:
+            dict: Per-clone status, sorted by name, and how many took their
+            ahead/behind counts from the cache
+        """
+        import json
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+
+        from query_memory import QueryMemory
+        from utils import atomic_write_text, ensure_index_dir
+
+        started = time.perf_counter()
+        if not machine:
+            machine = get_machine_id()
+        local_repos = self._scan_local_repos(self._get_scan_paths(), machine)
+
+        cache_path = ensure_index_dir(self.dev_domain / "memory", "repo-status") / "status.json"
+        cache = {}
+        if use_cache:
+            try:
+                cache = json.loads(cache_path.read_text(encoding="utf-8"))
+            except (FileNotFoundError, ValueError):
+                cache = {}
+
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+            statuses = list(pool.map(lambda repo: _clone_status(repo, cache.get(repo["path"])), local_repos))
+
+        # Join with the tracked metadata and each repository's last episode
+        engine = QueryMemory(self.config_repo)
+        index = engine.repo_index()
+        timeline = engine.timeline()
+        for status in statuses:
+            entry = index.repos.get(status["slug"])
+            status["tracked"] = entry is not None
+            status["archived"] = bool(entry and entry.get("archived"))
+            status["tags"] = entry.get("tags", []) if entry else []
+            status["last_accessed"] = index.last_accessed(status["slug"]) if entry else None
+            status["last_episode"] = _last_episode(engine, timeline, status["slug"])
+
+        atomic_write_text(cache_path, json.dumps({
+            status["path"]: status["cache"] for status in statuses if status.get("cache")
+        }))
+        cached = sum(1 for status in statuses if status.pop("from_cache", False))
+        for status in statuses:
+            status.pop("cache", None)
+
+        return {
+            "success": True,
+            "repos": sorted(statuses, key=lambda x: x["name"]),
+            "total": len(statuses),
+            "cached": cached,
+            "elapsed_s": round(time.perf_counter() - started, 3),
+        }
+
     def _get_scan_paths(self):
         """Determine repository scan paths based on OS."""
+        import platform
+
         paths = []
 
         if platform.system() == "Windows":
@@ -97,17 +178,24 @@ class ScanRepos:
                 continue
 
             for item in scan_path.iterdir():
-                if item.is_dir() and (item / ".git").exists():
-                    # Generate the same slug that would be used in memory system
-                    slug = normalize_repo_slug(str(item), machine)
-                    repos.append({
-                        'name': item.name,
-                        'path': str(item),
-                        'slug': slug
-                    })
+                repo = self._local_repo(item, machine)
+                if repo:
+                    repos.append(repo)
 
         return repos
 
+    def _local_repo(self, item, machine):
+        """Local repository entry for a directory, or None if it isn't a git repo."""
+        if item.is_dir() and (item / ".git").exists():
+            # Generate the same slug that would be used in memory system
+            slug = normalize_repo_slug(str(item), machine)
+            return {
+                'name': item.name,
+                'path': str(item),
+                'slug': slug
+            }
+        return None
+
     def _get_tracked_repos(self):
         """Get list of tracked repositories from memory."""
         repos = {}
@@ -116,51 +204,464 @@ class ScanRepos:
             return repos
 
         for repo_file in self.repos_dir.glob("*.md"):
-            # Exclude hidden files and READMEs
-            if repo_file.name.startswith(".") or repo_file.stem.lower() == "readme":
-                continue
+            info = self._tracked_repo(repo_file)
+            if info is not None:
+                repos[repo_file.stem] = info
 
-            # Read metadata to get location info
-            try:
-                content = repo_file.read_text(encoding="utf-8")
-                parts = content.split("---\n", 2)
-                if len(parts) >= 3:
-                    frontmatter = yaml.safe_load(parts[1])
-                    location = frontmatter.get("location", {})
-                    repos[repo_file.stem] = {
-                        "path": location.get("path", "unknown"),
-                        "machine": location.get("machine", "unknown"),
-                        "os": location.get("os", "unknown"),
-                    }
-            except Exception:
-                # If we can't parse the file, just use the slug
-                repos[repo_file.stem] = {"path": "unknown", "machine": "unknown", "os": "unknown"}
+        # Repositories in the cold tier are still tracked
+        repos.update((slug, info) for slug, info in self._cold_repos().items() if slug not in repos)
 
         return repos
 
+    def _tracked_repo(self, repo_file):
+        """Location info of one repository metadata file, or None to ignore it."""
+        # Exclude hidden files and READMEs
+        if repo_file.name.startswith(".") or repo_file.stem.lower() == "readme":
+            return None
+
+        # Read metadata to get location info
+        try:
+            frontmatter, _ = split_frontmatter(repo_file.read_text(encoding="utf-8"))
+            if frontmatter is None:
+                # Not a metadata file
+                return None
+            location = frontmatter.get("location", {})
+            return {
+                "path": location.get("path", "unknown"),
+                "machine": location.get("machine", "unknown"),
+                "os": location.get("os", "unknown"),
+            }
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # If we can't parse the file, just use the slug
+            return {"path": "unknown", "machine": "unknown", "os": "unknown"}
+
+    def _cold_repos(self):
+        """Location info of repositories moved to the cold tier, from their tombstones."""
+        from cold_tier import read_repo_tombstones
+
+        repos = {}
+        for slug, tombstone in read_repo_tombstones(self.dev_domain / "memory").items():
+            location = tombstone.get("location") or {}
+            repos[slug] = {
+                "path": location.get("path", "unknown"),
+                "machine": location.get("machine", "unknown"),
+                "os": location.get("os", "unknown"),
+            }
+        return repos
+
+    def watch(self, machine=None, poll_interval=2.0, use_inotify=None):
+        """
+        Create a RepoWatcher that keeps the untracked/missing sets current.
+
+        Args:
+            machine: Machine identifier (optional, will be auto-detected)
+            poll_interval: Seconds between rescans when inotify is unavailable
+            use_inotify: Force (True) or disable (False) inotify; default auto
+
+        Returns:
+            RepoWatcher: Call events() to consume changes, close() when done
+        """
+        return RepoWatcher(self, machine, poll_interval, use_inotify)
+
+
+def _clone_status(repo, cached):
+    """
+    Status of one clone (see ScanRepos.repo_status).
+
+    Args:
+        repo: Local repository entry (name, path, slug)
+        cached: Cached git results for this clone, or None
+
+    Returns:
+        dict: The status, with the entry to cache under "cache"
+    """
+    import subprocess
+    from git_state import git_dir, read_head, resolve_ref, upstream_ref
+
+    status = dict(repo)
+    gdir = git_dir(repo["path"])
+    if gdir is None:
+        status["error"] = "not a git repository"
+        return status
+
+    branch, head = read_head(gdir)
+    upstream = upstream_ref(gdir, branch)
+    upstream_head = resolve_ref(gdir, upstream) if upstream else None
+    status.update({
+        "branch": branch,
+        "head": head,
+        "detached": branch is None,
+        "upstream": upstream[len("refs/remotes/"):] if upstream and upstream.startswith("refs/remotes/") else upstream,
+    })
+
+    def git(*args):
+        # --no-optional-locks: don't refresh (and so rewrite) the index
+        return subprocess.run(
+            ["git", "--no-optional-locks", "-C", repo["path"]] + list(args),
+            capture_output=True, text=True,
+        )
+
+    result = {"dirty": None, "changes": None, "ahead": None, "behind": None}
+    changes = git("status", "--porcelain", "--untracked-files=normal")
+    if changes.returncode == 0:
+        lines = [line for line in changes.stdout.splitlines() if line]
+        result["dirty"] = bool(lines)
+        result["changes"] = len(lines)
+    key = [head, upstream_head]
+    if cached is not None and cached.get("key") == key:
+        # The counts depend only on the two commits
+        result.update(cached["result"])
+        status["from_cache"] = True
+    elif head and upstream_head:
+        if head == upstream_head:
+            result["ahead"] = result["behind"] = 0
+        else:
+            counts = git("rev-list", "--left-right", "--count", f"{head}...{upstream_head}")
+            if counts.returncode == 0:
+                ahead, behind = counts.stdout.split()
+                result["ahead"], result["behind"] = int(ahead), int(behind)
+
+    status.update(result)
+    status["cache"] = {"key": key, "result": {"ahead": result["ahead"], "behind": result["behind"]}}
+    return status
+
+
+def _last_episode(engine, timeline, slug):
+    """Timestamp, branch and summary of a repository's latest episode, or None."""
+    from datetime import datetime, UTC
+
+    entries = timeline.entries(slug)
+    if not entries:
+        return None
+    timestamp, branch, name = entries[-1]
+    summary = None
+    content = engine._read_episode(name)
+    if content is not None:
+        frontmatter, _ = split_frontmatter(content)
+        summary = (frontmatter or {}).get("summary")
+    return {
+        "timestamp": datetime.fromtimestamp(timestamp, UTC).isoformat().replace("+00:00", "Z"),
+        "branch": branch,
+        "episode": name,
+        "summary": summary,
+    }
+
+
+class RepoWatcher:
+    """
+    Incrementally maintained scan-repos result.
+
+    The scan roots, each repository directory under them (for ``.git``
+    appearing or disappearing) and the memory repositories directory are
+    watched with inotify where available, otherwise rescanned every
+    ``poll_interval`` seconds. Only the entries an event names are
+    re-examined, and each change to the untracked or missing sets is
+    reported as an event dict.
+    """
+
+    def __init__(self, scanner, machine=None, poll_interval=2.0, use_inotify=None):
+        from cold_tier import cold_dirs
+        from inotify_shim import Inotify
+
+        self.scanner = scanner
+        self.machine = machine or get_machine_id()
+        self.poll_interval = poll_interval
+        self.scan_paths = scanner._get_scan_paths()
+        self.local = {}
+        self.tracked = {}
+        self._cold_dir = cold_dirs(scanner.dev_domain / "memory")[0]
+        self._cold_watched = False
+        self._inotify = None
+        self._repo_watches = {}
+        self._mtimes = {}
+        if use_inotify is None:
+            use_inotify = Inotify.available()
+        if use_inotify:
+            self._inotify = Inotify()
+        self._resync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    @property
+    def backend(self):
+        return "inotify" if self._inotify is not None else "poll"
+
+    def snapshot(self):
+        """Current result, shaped like scan_repos(mode="all")."""
+        untracked, missing = self._sets()
+        return {
+            "untracked": sorted(
+                ({"name": repo["name"], "path": repo["path"], "slug": slug}
+                 for slug, repo in self._local_by_slug().items() if slug in untracked),
+                key=lambda x: x["name"],
+            ),
+            "missing": sorted(
+                ({"slug": slug, "info": self.tracked[slug]} for slug in missing),
+                key=lambda x: x["slug"],
+            ),
+            "scan_paths": [str(p) for p in self.scan_paths],
+            "total_local": len(self.local),
+            "total_tracked": len(self.tracked),
+        }
+
+    def events(self, timeout=None):
+        """
+        Yield change events until ``timeout`` seconds pass (None: forever).
+
+        Each event is a dict with ``event`` (untracked or missing),
+        ``change`` (added or removed), ``slug`` and the repository's
+        ``name``/``path`` (untracked) or tracked ``info`` (missing).
+        """
+        import time
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return
+            before = self._sets()
+            local_before = self._local_by_slug()
+            tracked_before = dict(self.tracked)
+            if self._inotify is not None:
+                # Let a burst of related events (a clone, a tier move) settle first
+                batch = self._inotify.read(remaining)
+                while batch:
+                    self._apply_inotify(batch)
+                    batch = self._inotify.read(WATCH_DEBOUNCE)
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                self._poll()
+            yield from self._diff(before, local_before, tracked_before)
+
+    def _sets(self):
+        local_slugs = set(self._local_by_slug())
+        tracked_slugs = set(self.tracked)
+        return local_slugs - tracked_slugs, tracked_slugs - local_slugs
+
+    def _local_by_slug(self):
+        return {repo["slug"]: repo for repo in self.local.values()}
+
+    def _diff(self, before, local_before, tracked_before):
+        untracked, missing = self._sets()
+        local_now = self._local_by_slug()
+        for slug in sorted(untracked - before[0]):
+            repo = local_now[slug]
+            yield {"event": "untracked", "change": "added", "slug": slug,
+                   "name": repo["name"], "path": repo["path"]}
+        for slug in sorted(before[0] - untracked):
+            repo = local_before[slug]
+            yield {"event": "untracked", "change": "removed", "slug": slug,
+                   "name": repo["name"], "path": repo["path"]}
+        for slug in sorted(missing - before[1]):
+            yield {"event": "missing", "change": "added", "slug": slug, "info": self.tracked[slug]}
+        for slug in sorted(before[1] - missing):
+            yield {"event": "missing", "change": "removed", "slug": slug, "info": tracked_before[slug]}
+
+    def _resync(self):
+        """Full rescan; also (re)establishes inotify watches."""
+        from inotify_shim import IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO, IN_CLOSE_WRITE, IN_ONLYDIR
+
+        self.local = {}
+        for scan_path in self.scan_paths:
+            for item in scan_path.iterdir():
+                self._update_local(item)
+        # Taken before reading, so the first poll sees any change made since
+        self._mtimes = self._metadata_mtimes()
+        self.tracked = self.scanner._get_tracked_repos()
+        if self._inotify is not None:
+            dir_events = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+            for scan_path in self.scan_paths:
+                self._inotify.add_watch(scan_path, dir_events)
+            if self.scanner.repos_dir.exists():
+                self._inotify.add_watch(
+                    self.scanner.repos_dir, IN_CLOSE_WRITE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+                )
+            self._cold_watched = False
+            self._watch_cold()
+
+    def _watch_cold(self):
+        """Watch the cold repository index once its directory exists."""
+        from inotify_shim import IN_CLOSE_WRITE, IN_DELETE, IN_MOVED_TO, IN_ONLYDIR
+
+        if self._inotify is None or self._cold_watched or not self._cold_dir.exists():
+            return
+        self._cold_watched = self._inotify.add_watch(
+            self._cold_dir, IN_CLOSE_WRITE | IN_DELETE | IN_MOVED_TO | IN_ONLYDIR
+        ) >= 0
+
+    def _update_local(self, item):
+        """Re-examine one directory under a scan root."""
+        from inotify_shim import IN_CREATE, IN_DELETE, IN_MOVED_FROM, IN_MOVED_TO, IN_ONLYDIR
+
+        key = str(item)
+        repo = self.scanner._local_repo(item, self.machine)
+        if repo:
+            self.local[key] = repo
+        else:
+            self.local.pop(key, None)
+
+        if self._inotify is not None:
+            # Watch candidate directories so a clone's .git arriving later is seen
+            if item.is_dir() and key not in self._repo_watches:
+                wd = self._inotify.add_watch(item, IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR)
+                if wd >= 0:
+                    self._repo_watches[key] = wd
+            elif not item.is_dir() and key in self._repo_watches:
+                self._inotify.rm_watch(self._repo_watches.pop(key))
+
+    def _update_tracked(self, name):
+        """Re-read one file in the repositories directory."""
+        if not name.endswith(".md"):
+            return
+        slug = name[:-3]
+        info = self.scanner._tracked_repo(self.scanner.repos_dir / name)
+        if info is None:
+            # Moved to the cold tier: still tracked through its tombstone. The
+            # tombstone may be written just after the move; the cold index
+            # watch picks it up then.
+            self._watch_cold()
+            info = self.scanner._cold_repos().get(slug)
+        if info is None:
+            self.tracked.pop(slug, None)
+        else:
+            self.tracked[slug] = info
+
+    def _update_cold(self):
+        """Re-read the cold repository index."""
+        cold = self.scanner._cold_repos()
+        for slug in list(self.tracked):
+            if slug not in cold and not (self.scanner.repos_dir / f"{slug}.md").exists():
+                del self.tracked[slug]
+        for slug, info in cold.items():
+            self.tracked.setdefault(slug, info)
+
+    def _apply_inotify(self, events):
+        from inotify_shim import IN_Q_OVERFLOW
+
+        roots = {str(p) for p in self.scan_paths}
+        repos_dir = str(self.scanner.repos_dir)
+        for directory, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                self._resync()
+                return
+            if directory is None:
+                continue
+            if directory in roots:
+                self._update_local(Path(directory) / name)
+            elif directory == repos_dir:
+                self._update_tracked(name)
+            elif directory == str(self._cold_dir):
+                if name == "index.json":
+                    self._update_cold()
+            elif name == ".git":
+                self._update_local(Path(directory))
+
+    def _poll(self):
+        """Polling fallback: rescan the roots and changed metadata files."""
+        seen = set()
+        for scan_path in self.scan_paths:
+            for item in scan_path.iterdir():
+                seen.add(str(item))
+                self._update_local(item)
+        for key in set(self.local) - seen:
+            del self.local[key]
+
+        mtimes = self._metadata_mtimes()
+        previous, self._mtimes = self._mtimes, mtimes
+        for name in set(mtimes) | set(previous):
+            if mtimes.get(name) != previous.get(name):
+                if name == "index.json":
+                    self._update_cold()
+                else:
+                    self._update_tracked(name)
+
+    def _metadata_mtimes(self):
+        """mtime of every repository file and of the cold index, by filename."""
+        mtimes = {}
+        if self.scanner.repos_dir.exists():
+            for repo_file in self.scanner.repos_dir.glob("*.md"):
+                try:
+                    mtimes[repo_file.name] = repo_file.stat().st_mtime_ns
+                except FileNotFoundError:
+                    continue
+        cold_index = self._cold_dir / "index.json"
+        mtimes[cold_index.name] = cold_index.stat().st_mtime_ns if cold_index.exists() else None
+        return mtimes
+
 
 def main():
     import argparse
+    from cli import run
 
     parser = argparse.ArgumentParser(description="Scan repositories")
-    parser.add_argument("command", choices=["scan-repos"])
+    parser.add_argument("command", choices=["scan-repos", "repo-status"])
     parser.add_argument("--config-repo", required=True)
     parser.add_argument("--mode", default="all", choices=["all", "untracked", "missing"])
     parser.add_argument("--machine", help="Machine identifier")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and print changes as NDJSON (snapshot first)")
+    parser.add_argument("--duration", type=float,
+                        help="Stop watching after this many seconds (default: run until interrupted)")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="Seconds between rescans when inotify is unavailable")
+    parser.add_argument("--workers", type=int, default=REPO_STATUS_WORKERS,
+                        help="Clones checked concurrently (repo-status)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-run git for every clone (repo-status)")
 
     args = parser.parse_args()
 
     scanner = ScanRepos(args.config_repo)
 
-    try:
-        result = scanner.scan_repos(args.mode, args.machine)
-        print(json.dumps(result, indent=2))
-        sys.exit(0)
+    if args.watch:
+        watch(scanner, args)
+        return
+
+    if args.command == "repo-status":
+        run(lambda: scanner.repo_status(args.machine, args.workers, use_cache=not args.no_cache))
+        return
 
+    run(lambda: scanner.scan_repos(args.mode, args.machine))
+
+
+def watch(scanner, args):
+    """Print a snapshot and then one JSON line per change until stopped."""
+    import json
+    import sys
+
+    from utils import utc_now_iso
+
+    def emit(event):
+        if args.mode != "all" and event["event"] not in ("snapshot", args.mode):
+            return
+        event["time"] = utc_now_iso()
+        print(json.dumps(event), flush=True)
+
+    try:
+        with scanner.watch(args.machine, args.poll_interval) as watcher:
+            snapshot = watcher.snapshot()
+            if args.mode == "untracked":
+                del snapshot["missing"]
+            elif args.mode == "missing":
+                del snapshot["untracked"]
+            emit(dict(event="snapshot", backend=watcher.backend, **snapshot))
+            for event in watcher.events(args.duration):
+                emit(event)
+    except KeyboardInterrupt:
+        pass
     except Exception as e:
         print(json.dumps({"success": False, "error": str(e)}), file=sys.stderr)
-        import traceback
-        traceback.print_exc()
         sys.exit(1)
 
 
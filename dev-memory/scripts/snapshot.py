@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Binary snapshot of parsed repository metadata and episode headers.
+
+``memory/index/snapshot/state.bin`` holds every repository file's
+frontmatter and every episode's frontmatter (hot and cold), so a process
+can start with the whole dataset after one read instead of parsing
+thousands of YAML headers. Layout:
+
+- header: struct ``<6sHI`` (magic, format version, fingerprint length)
+- the memory fingerprint (see result_cache.memory_fingerprint) it reflects
+- a ``marshal`` payload: ``{"repos": {slug: [size, mtime_ns, frontmatter]},
+  "episodes": {filename: frontmatter}}``
+
+A snapshot is used as-is only while its fingerprint matches the memory
+tree. Otherwise it is the starting point of a refresh: repository files
+whose (size, mtime) changed and episodes not in it yet are parsed, and
+entries whose files are gone are dropped. Episode files are never
+rewritten in place, so a known episode's header is kept as is.
+
+marshal's format is specific to the Python version that wrote it; the
+snapshot also records ``sys.version_info[:2]`` and is discarded under
+another interpreter.
+"""
+
+import marshal
+import os
+import struct
+import sys
+from pathlib import Path
+
+SNAPSHOT_MAGIC = b"DMSNAP"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<6sHI")
+# Strings up to this length (machine names, OS, branches, tags) are shared
+INTERN_MAX = 32
+
+
+class MemorySnapshot:
+    """Parsed repository metadata and episode headers, as of one fingerprint."""
+
+    def __init__(self, fingerprint=None, repos=None, episodes=None):
+        """
+        Args:
+            fingerprint: Memory fingerprint the contents reflect
+            repos: {slug: [size, mtime_ns, frontmatter]}
+            episodes: {filename: frontmatter}
+        """
+        self.fingerprint = fingerprint
+        self.repos = repos if repos is not None else {}
+        self.episodes = episodes if episodes is not None else {}
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a snapshot with a single read.
+
+        Returns:
+            MemorySnapshot: The snapshot, or None if missing, corrupt, of
+            another format version or written by another Python version
+        """
+        try:
+            data = Path(path).read_bytes()
+        except FileNotFoundError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        magic, version, fingerprint_len = HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            return None
+        start = HEADER.size + fingerprint_len
+        try:
+            payload = marshal.loads(memoryview(data)[start:])
+        except (EOFError, ValueError, TypeError):
+            return None
+        if payload.get("python") != list(sys.version_info[:2]):
+            return None
+        return cls(data[HEADER.size:start].decode("ascii"), payload["repos"], payload["episodes"])
+
+    def repo(self, slug):
+        """Frontmatter of one repository file, or None."""
+        entry = self.repos.get(slug)
+        return entry[2] if entry is not None else None
+
+    def refresh(self, fingerprint, repos_dir, episode_names, read_headers):
+        """
+        Bring the snapshot up to date.
+
+        Args:
+            fingerprint: Current memory fingerprint
+            repos_dir: The ``memory/repositories`` directory
+            episode_names: Every current episode filename
+            read_headers: Callable taking filenames and yielding
+                (filename, frontmatter)
+
+        Returns:
+            dict: Counts of parsed repositories and episodes
+        """
+        from utils import split_frontmatter
+
+        repos = {}
+        parsed_repos = 0
+        if Path(repos_dir).exists():
+            with os.scandir(repos_dir) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not name.endswith(".md") or name.startswith(".") or name[:-3].lower() == "readme":
+                        continue
+                    stat = entry.stat()
+                    slug = name[:-3]
+                    known = self.repos.get(slug)
+                    if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+                        repos[slug] = known
+                        continue
+                    try:
+                        frontmatter, _ = split_frontmatter(Path(entry.path).read_text(encoding="utf-8"))
+                    except FileNotFoundError:
+                        continue
+                    repos[slug] = [stat.st_size, stat.st_mtime_ns, plain(frontmatter)]
+                    parsed_repos += 1
+
+        current = set(episode_names)
+        episodes = {name: header for name, header in self.episodes.items() if name in current}
+        new_names = sorted(current - episodes.keys())
+        for name, frontmatter in read_headers(new_names):
+            episodes[name] = plain(frontmatter)
+
+        self.fingerprint = fingerprint
+        self.repos = repos
+        self.episodes = episodes
+        return {"repos_parsed": parsed_repos, "episodes_parsed": len(new_names)}
+
+    def save(self, path):
+        """Write the snapshot atomically."""
+        path = Path(path)
+        fingerprint = (self.fingerprint or "").encode("ascii")
+        payload = marshal.dumps({
+            "python": list(sys.version_info[:2]),
+            "repos": self.repos,
+            "episodes": self.episodes,
+        })
+        from utils import atomic_write_bytes
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(fingerprint))
+        atomic_write_bytes(path, header + fingerprint + payload)
+
+
+def plain(value):
+    """
+    A copy of parsed YAML that marshal can store.
+
+    YAML may yield dates and datetimes for unquoted timestamps; they are
+    stored as ISO 8601 strings, which every reader already accepts. Keys
+    and short strings are interned: marshal writes a repeated object once
+    and refers back to it, which makes the file smaller and faster to load.
+    """
+    if isinstance(value, dict):
+        return {sys.intern(str(k)): plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [plain(v) for v in value]
+    if isinstance(value, str):
+        return sys.intern(value) if len(value) <= INTERN_MAX else value
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
@@ -1,11 +1,33 @@
 #!/usr/bin/env python3
 """
 Git synchronization operations: pull, commit, push.
+
+The configuration repo can also be operated as a blob-filtered partial
+clone with a sparse checkout of just the memory directory (see
+SyncGit.bootstrap), so new machines don't download the full history of
+every file, and disk use stays flat as episodes accumulate.
 """
 
 import subprocess
+import time
 from pathlib import Path
 
+import metrics
+from utils import FileLock
+
+# Push attempts after the first when the remote is ahead
+PUSH_RETRIES = 5
+# Initial backoff before retrying a rejected push, doubled on each retry
+PUSH_BACKOFF = 0.2
+
+# Directory checked out by a sparse bootstrap
+MEMORY_SPARSE_PATH = "domains/dev/memory"
+# Minimum seconds between background prefetches
+PREFETCH_INTERVAL = 300
+
+_NON_FAST_FORWARD = ("non-fast-forward", "fetch first", "[rejected]", "failed to update ref",
+                     "cannot lock ref", "stale info")
+
 
 class SyncGit:
     """Handle git synchronization for the configuration repository."""
@@ -20,7 +42,263 @@ class SyncGit:
         self.repo_path = Path(repo_path)
         if not (self.repo_path / ".git").exists():
             raise ValueError(f"Not a git repository: {repo_path}")
+        self.push_retries = 0
+        self._lock = FileLock(self._git_dir() / "dev-memory.lock")
+
+    def lock(self):
+        """
+        Advisory lock serializing writers of this working tree.
+
+        Hold it around any write-then-commit sequence. It is re-entrant, so
+        commit_and_push (which takes it too) can run inside it.
+        """
+        return self._lock
+
+    @classmethod
+    def bootstrap(cls, remote_url, repo_path, sparse_paths=(MEMORY_SPARSE_PATH,),
+                  blob_filter="blob:none", branch=None):
+        """
+        Clone the configuration repo as a partial clone with sparse checkout.
+
+        Only commits and trees are fetched up front; file contents are
+        fetched on demand for the sparse paths that are checked out.
 
+        Args:
+            remote_url: URL of the configuration repo (use file:// for a
+                local repo, since plain paths ignore the filter)
+            repo_path: Destination directory
+            sparse_paths: Directories to check out (default: memory only)
+            blob_filter: Partial clone filter spec (None for a full clone)
+            branch: Branch to check out (default: remote HEAD)
+
+        Returns:
+            SyncGit: For the new clone
+
+        Raises:
+            Exception: If git clone or sparse-checkout fails
+        """
+        cmd = ["git", "clone", "--sparse"]
+        if blob_filter:
+            cmd.append(f"--filter={blob_filter}")
+        if branch:
+            cmd.extend(["--branch", branch])
+        cmd.extend([remote_url, str(repo_path)])
+
+        result = _run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"Git clone failed: {result.stderr}")
+
+        sync = cls(repo_path)
+        sync.set_sparse_paths(sparse_paths)
+        return sync
+
+    def set_sparse_paths(self, sparse_paths):
+        """
+        Restrict the working tree to the given directories (cone mode).
+
+        Raises:
+            Exception: If git sparse-checkout fails
+        """
+        result = _run(
+            ["git", "-C", str(self.repo_path), "sparse-checkout", "set", "--cone"] + list(sparse_paths),
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise Exception(f"Git sparse-checkout failed: {result.stderr}")
+
+    def clone_info(self):
+        """
+        Describe how the clone is set up.
+
+        Returns:
+            dict: partial clone filter, sparse paths and object store size
+        """
+        def config(key):
+            result = _run(
+                ["git", "-C", str(self.repo_path), "config", "--get", key],
+                capture_output=True,
+                text=True
+            )
+            return result.stdout.strip() or None
+
+        sparse_paths = []
+        if config("core.sparseCheckout") == "true":
+            result = _run(
+                ["git", "-C", str(self.repo_path), "sparse-checkout", "list"],
+                capture_output=True,
+                text=True
+            )
+            sparse_paths = result.stdout.split()
+
+        return {
+            "partial_clone_filter": config("remote.origin.partialclonefilter"),
+            "sparse_paths": sparse_paths,
+            "objects": self.object_store_size(),
+        }
+
+    def object_store_size(self):
+        """Loose and packed object counts and sizes (KiB), from git count-objects."""
+        result = _run(
+            ["git", "-C", str(self.repo_path), "count-objects", "-v"],
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        stats = {}
+        for line in result.stdout.splitlines():
+            key, _, value = line.partition(":")
+            if value.strip().isdigit():
+                stats[key.strip().replace("-", "_")] = int(value)
+        return stats
+
+    @metrics.measured("sync")
+    def maintenance(self, full=False):
+        """
+        Compact the object store.
+
+        The default runs the incremental git maintenance tasks (loose
+        objects into packs, incremental repack, commit-graph, packed refs),
+        which are cheap enough to run after every batch of commits. With
+        full=True it runs ``git gc`` instead. Both keep partial clone
+        promisor packs intact.
+
+        Returns:
+            dict: Object store size before and after
+
+        Raises:
+            Exception: If the maintenance command fails
+        """
+        before = self.object_store_size()
+        if full:
+            cmd = ["git", "-C", str(self.repo_path), "gc", "--quiet"]
+        else:
+            cmd = ["git", "-C", str(self.repo_path), "maintenance", "run",
+                   "--task=loose-objects", "--task=incremental-repack",
+                   "--task=commit-graph", "--task=pack-refs"]
+
+        with self.lock():
+            result = _run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"Git maintenance failed: {result.stderr}")
+
+        return {"before": before, "after": self.object_store_size()}
+
+    def prefetch_async(self, min_interval=PREFETCH_INTERVAL):
+        """
+        Start a background fetch (and fast-forward) without waiting for it.
+
+        Meant for session start: readers see fresh data on their next query
+        without paying pull latency inline. At most one prefetch starts per
+        ``min_interval`` seconds, tracked by the mtime of a stamp file in
+        the .git directory. The worker is prefetch() in a detached process.
+
+        Returns:
+            dict: Whether a prefetch was started, and the last worker result
+        """
+        import sys
+
+        stamp = self._git_dir() / "dev-memory-prefetch.stamp"
+        try:
+            age = time.time() - stamp.stat().st_mtime
+        except FileNotFoundError:
+            age = None
+        if age is not None and age < min_interval:
+            return {"started": False, "reason": "rate-limited", "last": self.last_prefetch()}
+        stamp.touch()
+
+        kwargs = {}
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "prefetch-worker",
+             "--config-repo", str(self.repo_path)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **kwargs
+        )
+        return {"started": True, "last": self.last_prefetch()}
+
+    @metrics.measured("sync")
+    def prefetch(self):
+        """
+        Fetch from the remote, then fast-forward if it is safe to.
+
+        The working tree is only fast-forwarded when it has no uncommitted
+        changes to tracked files and no writer holds the lock; otherwise the
+        fetched commits simply wait for the next pull. After a fast-forward
+        the query indexes are refreshed so readers don't rebuild them.
+        The outcome is recorded for last_prefetch().
+
+        Returns:
+            dict: fetched, fast_forwarded, and the reason when not forwarded
+        """
+        import json
+
+        result = {"started_at": time.time(), "fetched": False, "fast_forwarded": False}
+        fetch = _run(
+            ["git", "-C", str(self.repo_path), "fetch", "--quiet"],
+            capture_output=True,
+            text=True
+        )
+        if fetch.returncode != 0:
+            result["reason"] = f"fetch failed: {fetch.stderr.strip()}"
+        else:
+            result["fetched"] = True
+            result.update(self._fast_forward_if_clean())
+
+        if result["fast_forwarded"]:
+            from query_memory import QueryMemory
+
+            result["indexes"] = QueryMemory(self.repo_path).refresh_indexes()
+
+        result["finished_at"] = time.time()
+        status_path = self._git_dir() / "dev-memory-prefetch.json"
+        status_path.write_text(json.dumps(result), encoding="utf-8")
+        return result
+
+    def last_prefetch(self):
+        """Result of the most recent completed prefetch, or None."""
+        import json
+
+        status_path = self._git_dir() / "dev-memory-prefetch.json"
+        try:
+            return json.loads(status_path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _fast_forward_if_clean(self):
+        """Fast-forward to the upstream branch when nothing local would be lost."""
+        def git(*args):
+            return _run(
+                ["git", "-C", str(self.repo_path)] + list(args),
+                capture_output=True,
+                text=True
+            )
+
+        if git("rev-parse", "--abbrev-ref", "@{u}").returncode != 0:
+            return {"reason": "no upstream branch"}
+        if git("rev-list", "--count", "@{u}..HEAD").stdout.strip() not in ("", "0"):
+            return {"reason": "local commits not pushed"}
+        if git("rev-list", "--count", "HEAD..@{u}").stdout.strip() in ("", "0"):
+            return {"reason": "up to date"}
+
+        try:
+            with FileLock(self._lock.path, timeout=0):
+                if git("status", "--porcelain", "--untracked-files=no").stdout.strip():
+                    return {"reason": "working tree has uncommitted changes"}
+                merge = git("merge", "--ff-only", "--quiet", "@{u}")
+        except TimeoutError:
+            return {"reason": "a writer holds the lock"}
+
+        if merge.returncode != 0:
+            return {"reason": f"fast-forward failed: {merge.stderr.strip()}"}
+        return {"fast_forwarded": True}
+
+    @metrics.measured("sync")
     def pull(self, rebase=True):
         """
         Pull latest changes from remote.
@@ -35,12 +313,13 @@ class SyncGit:
         if rebase:
             cmd.append("--rebase")
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = _run(cmd, capture_output=True, text=True)
         if result.returncode != 0:
             raise Exception(f"Git pull failed: {result.stderr}")
 
         return result.stdout.strip()
 
+    @metrics.measured("sync")
     def commit_and_push(self, files, message):
         """
         Commit files and push to remote.
@@ -49,21 +328,31 @@ class SyncGit:
             files: List of file paths relative to repo root
             message: Commit message
 
+        Returns:
+            dict: Push output and the number of rebase-and-retry rounds
+
         Raises:
             Exception: If git operations fail
         """
-        # Stage files
-        for file in files:
-            result = subprocess.run(
-                ["git", "-C", str(self.repo_path), "add", file],
-                capture_output=True,
-                text=True
-            )
-            if result.returncode != 0:
-                raise Exception(f"Git add failed for {file}: {result.stderr}")
+        with self.lock():
+            return self._commit_and_push(files, message)
+
+    def _commit_and_push(self, files, message):
+        """commit_and_push body, run with the lock held."""
+        # Stage files; paths go over stdin so bulk imports need one process.
+        # update-index takes literal paths, avoiding "git add" pathspec
+        # matching, which is quadratic in the number of paths.
+        result = _run(
+            ["git", "-C", str(self.repo_path), "update-index", "--add", "--remove", "-z", "--stdin"],
+            input="\0".join(str(f) for f in files),
+            capture_output=True,
+            text=True
+        )
+        if result.returncode != 0:
+            raise Exception(f"Git add failed: {result.stderr}")
 
         # Commit
-        result = subprocess.run(
+        result = _run(
             ["git", "-C", str(self.repo_path), "commit", "-m", message],
             capture_output=True,
             text=True
@@ -73,23 +362,140 @@ class SyncGit:
             if "nothing to commit" not in result.stdout.lower():
                 raise Exception(f"Git commit failed: {result.stderr}")
 
-        # Push
-        result = subprocess.run(
-            ["git", "-C", str(self.repo_path), "push"],
+        # Push, rebasing onto the remote and retrying if another writer got there first
+        import random
+
+        retries = 0
+        while True:
+            result = _run(
+                ["git", "-C", str(self.repo_path), "push"],
+                capture_output=True,
+                text=True
+            )
+            if result.returncode == 0:
+                break
+            if retries >= PUSH_RETRIES or not _is_non_fast_forward(result.stderr):
+                metrics.inc("dev_memory_push_failures_total")
+                raise Exception(f"Git push failed: {result.stderr}")
+
+            retries += 1
+            self.push_retries += 1
+            metrics.inc("dev_memory_push_retries_total")
+            time.sleep(PUSH_BACKOFF * (2 ** (retries - 1)) * (1 + random.random()))
+            self._rebase_onto_remote()
+
+        return {"output": result.stdout.strip(), "retries": retries}
+
+    def _rebase_onto_remote(self):
+        """Pull with rebase; abort and raise if the rebase hits a conflict."""
+        result = _run(
+            ["git", "-C", str(self.repo_path), "pull", "--rebase", "--autostash"],
             capture_output=True,
             text=True
         )
         if result.returncode != 0:
-            raise Exception(f"Git push failed: {result.stderr}")
+            _run(
+                ["git", "-C", str(self.repo_path), "rebase", "--abort"],
+                capture_output=True,
+                text=True
+            )
+            raise Exception(f"Git pull --rebase failed while retrying push: {result.stderr}")
 
-        return result.stdout.strip()
+    def _git_dir(self):
+        """The .git directory, following the gitdir pointer of worktrees."""
+        dot_git = self.repo_path / ".git"
+        if dot_git.is_file():
+            content = dot_git.read_text(encoding="utf-8").strip()
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                return git_dir if git_dir.is_absolute() else self.repo_path / git_dir
+        return dot_git
 
     def status(self):
         """Get git status."""
-        result = subprocess.run(
+        result = _run(
             ["git", "-C", str(self.repo_path), "status", "--short"],
             capture_output=True,
             text=True,
             check=True
         )
         return result.stdout.strip()
+
+
+def _run(cmd, **kwargs):
+    """subprocess.run, recording the duration of git commands by subcommand."""
+    if not cmd or cmd[0] != "git":
+        return subprocess.run(cmd, **kwargs)
+    start = time.perf_counter()
+    try:
+        return subprocess.run(cmd, **kwargs)
+    finally:
+        metrics.observe("dev_memory_git_duration_seconds", time.perf_counter() - start,
+                        command=_git_subcommand(cmd))
+
+
+def _git_subcommand(cmd):
+    """The subcommand of a git command line, skipping -C/-c and other global options."""
+    args = iter(cmd[1:])
+    for arg in args:
+        if arg in ("-C", "-c"):
+            next(args, None)
+        elif not arg.startswith("-"):
+            return arg
+    return "git"
+
+
+def _is_non_fast_forward(stderr):
+    """Whether a push failed because the remote has commits we lack."""
+    stderr = stderr.lower()
+    return any(marker in stderr for marker in _NON_FAST_FORWARD)
+
+
+def main():
+    import argparse
+    from cli import run
+
+    parser = argparse.ArgumentParser(description="Configuration repository sync")
+    parser.add_argument(
+        "command",
+        choices=["bootstrap", "pull", "prefetch", "prefetch-worker", "maintenance", "info"],
+    )
+    parser.add_argument("--config-repo", required=True, help="Path to config repository")
+    parser.add_argument("--remote", help="Remote URL to clone (bootstrap)")
+    parser.add_argument("--branch", help="Branch to check out (bootstrap)")
+    parser.add_argument("--sparse-path", action="append",
+                        help=f"Directory to check out; repeatable (bootstrap, default: {MEMORY_SPARSE_PATH})")
+    parser.add_argument("--full-clone", action="store_true", help="Fetch all blobs (bootstrap)")
+    parser.add_argument("--full", action="store_true", help="Run git gc instead of incremental tasks (maintenance)")
+    parser.add_argument("--min-interval", type=int, default=PREFETCH_INTERVAL,
+                        help="Seconds between background prefetches (prefetch)")
+
+    args = parser.parse_args()
+
+    def handler():
+        if args.command == "bootstrap":
+            sync = SyncGit.bootstrap(
+                args.remote,
+                args.config_repo,
+                sparse_paths=args.sparse_path or [MEMORY_SPARSE_PATH],
+                blob_filter=None if args.full_clone else "blob:none",
+                branch=args.branch,
+            )
+            return {"success": True, **sync.clone_info()}
+        sync = SyncGit(args.config_repo)
+        if args.command == "pull":
+            return {"success": True, "output": sync.pull()}
+        elif args.command == "prefetch":
+            return sync.prefetch_async(min_interval=args.min_interval)
+        elif args.command == "prefetch-worker":
+            return sync.prefetch()
+        elif args.command == "maintenance":
+            return {"success": True, **sync.maintenance(full=args.full)}
+        elif args.command == "info":
+            return sync.clone_info()
+
+    run(handler)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Per-repository episode timelines.
+
+``memory/index/timeline/<slug>.log`` lists every episode of one repository
+slug, one ``<timestamp>\\t<branch>\\t<filename>`` line each (POSIX seconds),
+so "the last N episodes of this repo/branch" means reading one small file
+and N episodes instead of parsing them all.
+
+save_episode and import-episodes append their own episodes. Episodes that
+arrive any other way (a pull, another machine's import) are caught up on
+the next read: ``meta.json`` records the config repo HEAD the timelines
+reflect, and only episode files and packs added since that commit are
+parsed. Lines are de-duplicated by filename, so an episode recorded both
+by a local save and by the catch-up is listed once.
+"""
+
+import json
+from pathlib import Path
+
+TIMELINE_VERSION = 1
+
+
+class Timeline:
+    """Append-only episode timelines, one file per repository slug."""
+
+    def __init__(self, index_dir):
+        """
+        Args:
+            index_dir: Directory holding the .log files and meta.json
+        """
+        self.index_dir = Path(index_dir)
+        self.meta_path = self.index_dir / "meta.json"
+        self.meta = {}
+        if self.meta_path.exists():
+            try:
+                self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            except ValueError:
+                self.meta = {}
+        if self.meta.get("version") != TIMELINE_VERSION:
+            self.meta = {}
+
+    @property
+    def built(self):
+        """True once a full build has happened."""
+        return "head" in self.meta
+
+    def entries(self, slug, branch=None):
+        """
+        Episodes of a repository, oldest first.
+
+        Returns:
+            list: (timestamp, branch, filename) tuples
+        """
+        path = self._log_path(slug)
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return []
+        seen = set()
+        entries = []
+        for line in text.splitlines():
+            parts = line.split("\t")
+            if len(parts) != 3 or parts[2] in seen:
+                continue
+            if branch is not None and parts[1] != branch:
+                continue
+            seen.add(parts[2])
+            entries.append((int(parts[0]), parts[1], parts[2]))
+        entries.sort()
+        return entries
+
+    def append(self, records):
+        """
+        Record episodes.
+
+        Args:
+            records: Iterable of (slug, timestamp, branch, filename)
+        """
+        by_slug = {}
+        for slug, timestamp, branch, filename in records:
+            line = f"{int(timestamp)}\t{_clean(branch)}\t{filename}\n"
+            by_slug.setdefault(slug, []).append(line)
+        if not by_slug:
+            return
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        for slug, lines in by_slug.items():
+            with open(self._log_path(slug), "a", encoding="utf-8") as f:
+                f.write("".join(lines))
+
+    def sync(self, head, added_since, read_all, read_headers):
+        """
+        Catch the timelines up with the config repo.
+
+        Args:
+            head: Current HEAD commit (None outside a git checkout, which
+                forces a rebuild)
+            added_since: Callable taking the recorded HEAD and returning the
+                episode filenames added since, or None if it can't tell
+            read_all: Callable yielding (filename, frontmatter) for every episode
+            read_headers: Callable taking filenames and yielding
+                (filename, frontmatter)
+
+        Returns:
+            dict: Whether a rebuild happened and how many episodes were added
+        """
+        if self.built and head is not None and self.meta["head"] == head:
+            return {"rebuilt": False, "added": 0}
+
+        names = added_since(self.meta["head"]) if self.built and head is not None else None
+        if names is None:
+            self._clear()
+            added = self._append_headers(read_all(), known=None)
+            rebuilt = True
+        else:
+            added = self._append_headers(read_headers(names), known={})
+            rebuilt = False
+
+        self.meta = {"version": TIMELINE_VERSION, "head": head}
+        self._write_meta()
+        return {"rebuilt": rebuilt, "added": added}
+
+    def _append_headers(self, headers, known):
+        """Append (filename, frontmatter) pairs, skipping names already listed."""
+        from utils import parse_timestamp
+
+        records = []
+        for name, frontmatter in headers:
+            repository = (frontmatter or {}).get("repository") or {}
+            slug = repository.get("name")
+            if not slug:
+                continue
+            if known is not None:
+                if slug not in known:
+                    known[slug] = {entry[2] for entry in self.entries(slug)}
+                if name in known[slug]:
+                    continue
+                known[slug].add(name)
+            records.append((
+                slug,
+                parse_timestamp(frontmatter.get("timestamp")),
+                str(repository.get("branch") or ""),
+                name,
+            ))
+        self.append(records)
+        return len(records)
+
+    def _clear(self):
+        if self.index_dir.exists():
+            for path in self.index_dir.glob("*.log"):
+                path.unlink()
+
+    def _write_meta(self):
+        from utils import atomic_write_text
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write_text(self.meta_path, json.dumps(self.meta))
+
+    def _log_path(self, slug):
+        return self.index_dir / f"{slug.replace('/', '_')}.log"
+
+
+def _clean(value):
+    """Keep a field on one tab-separated line."""
+    return str(value).replace("\t", " ").replace("\n", " ")
@@ -1,19 +1,130 @@
 #!/usr/bin/env python3
 """
 Common utility functions for memory management.
+
+Imports are kept local to the functions that need them so that read-only
+commands (find-repo, list-recent-repos) start without loading yaml, uuid,
+platform or socket unless they are actually used.
 """
 
-import uuid
-import platform
-import socket
 from pathlib import Path
 
 
 def generate_episode_id():
     """Generate unique episode ID."""
+    import uuid
+
     return f"ep-{uuid.uuid4().hex[:12]}"
 
 
+def utc_now_iso():
+    """Current UTC time as an ISO 8601 string with a trailing Z."""
+    from datetime import datetime, UTC
+
+    return datetime.now(UTC).isoformat().replace('+00:00', 'Z')
+
+
+def load_yaml(text):
+    """Parse YAML with the libyaml-backed loader when available."""
+    import yaml
+
+    return yaml.load(text, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+def dump_frontmatter(frontmatter):
+    """Render a frontmatter dict as a ``---`` delimited YAML header."""
+    import yaml
+
+    dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+    text = yaml.dump(frontmatter, Dumper=dumper, default_flow_style=False, sort_keys=False)
+    return f"---\n{text}---\n\n"
+
+
+def split_frontmatter(content):
+    """
+    Split a memory file into its parsed frontmatter and body.
+
+    Returns:
+        tuple: (frontmatter dict, body str), or (None, content) if the file
+        has no ``---`` delimited header.
+    """
+    parts = content.split("---\n", 2)
+    if len(parts) < 3:
+        return None, content
+    return load_yaml(parts[1]), parts[2]
+
+
+# Episode body compression (see encode_episode_body)
+BODY_ENCODINGS = ("none", "zlib", "lzma")
+# Bodies shorter than this are stored as plain text whatever the setting
+COMPRESS_MIN_BYTES = 1024
+
+
+def encode_episode_body(content, encoding):
+    """
+    Store an episode's body compressed, keeping its YAML header plain text.
+
+    The header gains ``body_encoding: <zlib|lzma>`` and the body becomes
+    the base64 of the compressed Markdown, in 76-column lines. Headers stay
+    greppable and header-only readers parse them as before; readers that
+    need the body go through episode_body.
+
+    Args:
+        content: Rendered episode (frontmatter and Markdown body)
+        encoding: One of BODY_ENCODINGS
+
+    Returns:
+        str: The episode to write (unchanged for ``none``, a body shorter
+        than COMPRESS_MIN_BYTES, or one that doesn't get smaller)
+    """
+    import base64
+
+    if encoding not in BODY_ENCODINGS:
+        raise ValueError(f"Unknown body encoding '{encoding}', expected one of {BODY_ENCODINGS}")
+    if encoding == "none":
+        return content
+    frontmatter, body = split_frontmatter(content)
+    raw = body.encode("utf-8")
+    if frontmatter is None or len(raw) < COMPRESS_MIN_BYTES:
+        return content
+
+    if encoding == "zlib":
+        import zlib
+
+        packed = zlib.compress(raw, 9)
+    else:
+        import lzma
+
+        packed = lzma.compress(raw, preset=6)
+    encoded = base64.encodebytes(packed).decode("ascii")
+    if len(encoded) >= len(raw):
+        return content
+    frontmatter["body_encoding"] = encoding
+    return dump_frontmatter(frontmatter) + encoded
+
+
+def episode_body(frontmatter, body):
+    """
+    The Markdown body of a parsed episode, decompressed if it was stored
+    with encode_episode_body.
+    """
+    encoding = (frontmatter or {}).get("body_encoding")
+    if not encoding or encoding == "none":
+        return body
+    import base64
+
+    packed = base64.decodebytes(body.strip().encode("ascii"))
+    if encoding == "zlib":
+        import zlib
+
+        return zlib.decompress(packed).decode("utf-8")
+    if encoding == "lzma":
+        import lzma
+
+        return lzma.decompress(packed).decode("utf-8")
+    raise ValueError(f"Unknown body encoding '{encoding}'")
+
+
 def normalize_repo_slug(repo_path, machine=None):
     """
     Generate unique repository slug based on machine + local path.
@@ -58,13 +169,350 @@ def normalize_repo_slug(repo_path, machine=None):
     return f"{repo_name}-{path_hash}"
 
 
+def ensure_index_dir(memory_dir, name):
+    """
+    Return ``memory/index/<name>``, creating it if needed.
+
+    Everything under ``memory/index`` is derived, machine-local data, so the
+    directory carries a ``.gitignore`` that keeps it out of commits.
+    """
+    index_root = Path(memory_dir) / "index"
+    path = index_root / name
+    path.mkdir(parents=True, exist_ok=True)
+    gitignore = index_root / ".gitignore"
+    if not gitignore.exists():
+        gitignore.write_text("*\n", encoding="utf-8")
+    return path
+
+
+# Durability levels for AtomicWriter
+DURABILITY_LEVELS = ("none", "batch", "full")
+
+
+def _write_temp(path, data, fsync=False):
+    """Write str or bytes to a new temp file next to ``path``; return its name."""
+    import os
+    import tempfile
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        if isinstance(data, str):
+            f = os.fdopen(fd, "w", encoding="utf-8")
+        else:
+            f = os.fdopen(fd, "wb")
+        with f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        _unlink_quietly(tmp)
+        raise
+    return tmp
+
+
+def _unlink_quietly(path):
+    import os
+
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def fsync_path(path):
+    """
+    fsync a file or directory.
+
+    Directories cannot be opened for fsync on Windows, where NTFS
+    journals renames itself; failures there are ignored.
+    """
+    import os
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write_text(path, text):
+    """
+    Replace a file's contents atomically.
+
+    The text is written to a temporary file in the same directory and
+    renamed over the target, so readers and crashes never see a partial file.
+    """
+    import os
+
+    tmp = _write_temp(path, text)
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        _unlink_quietly(tmp)
+        raise
+
+
+def atomic_write_bytes(path, data):
+    """
+    Replace a file's contents atomically with bytes (any buffer).
+
+    Like atomic_write_text, through a uniquely named temporary file, so
+    concurrent writers of the same file never clobber each other's temp.
+    """
+    import os
+
+    tmp = _write_temp(path, bytes(data))
+    try:
+        os.replace(tmp, path)
+    except BaseException:
+        _unlink_quietly(tmp)
+        raise
+
+
+class AtomicWriter:
+    """
+    Atomic file writes with configurable durability.
+
+    Every write goes to a temp file in the target's directory and is renamed
+    over the target, so a reader or a crash never sees a truncated file.
+    The durability level decides what survives power loss:
+
+    - ``none``: rename immediately, no fsync
+    - ``batch``: temp files are kept until flush(), which fsyncs them all
+      (in parallel), renames them and fsyncs each directory once
+    - ``full``: fsync the file, rename, fsync the directory, per write
+
+    With ``batch``, writes become visible at flush(); call it before
+    anything (e.g. git) reads the files.
+    """
+
+    def __init__(self, durability="batch"):
+        """
+        Args:
+            durability: One of DURABILITY_LEVELS
+        """
+        import threading
+
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability '{durability}', expected one of {DURABILITY_LEVELS}")
+        self.durability = durability
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+
+    def write_text(self, path, text):
+        """Atomically replace a file with text (UTF-8)."""
+        self._write(path, text)
+
+    def write_bytes(self, path, data):
+        """Atomically replace a file with bytes (any buffer)."""
+        self._write(path, bytes(data))
+
+    def sync(self, *paths):
+        """
+        Make files written or moved by other means durable now.
+
+        Each path (file or directory) and the directory containing it are
+        fsynced, unless durability is ``none``.
+        """
+        if self.durability == "none":
+            return
+        dirs = set()
+        for path in paths:
+            path = Path(path)
+            fsync_path(path)
+            dirs.add(path.parent)
+        for directory in dirs:
+            fsync_path(directory)
+
+    def flush(self, workers=8):
+        """Publish pending batched writes durably."""
+        import os
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(fsync_path, pending.values()))
+        except BaseException:
+            for tmp in pending.values():
+                _unlink_quietly(tmp)
+            raise
+        for path, tmp in pending.items():
+            os.replace(tmp, path)
+        for directory in {path.parent for path in pending}:
+            fsync_path(directory)
+
+    def abort(self):
+        """Discard pending batched writes; the targets keep their old contents."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for tmp in pending.values():
+            _unlink_quietly(tmp)
+
+    def _write(self, path, data):
+        import os
+
+        path = Path(path)
+        tmp = _write_temp(path, data, fsync=self.durability == "full")
+        if self.durability == "batch":
+            with self._pending_lock:
+                previous = self._pending.pop(path, None)
+                self._pending[path] = tmp
+            if previous:
+                _unlink_quietly(previous)
+            return
+        try:
+            os.replace(tmp, path)
+        except BaseException:
+            _unlink_quietly(tmp)
+            raise
+        if self.durability == "full":
+            fsync_path(path.parent)
+
+
+def parse_timestamp(value):
+    """
+    Convert an ISO 8601 timestamp to POSIX seconds.
+
+    Naive timestamps are taken as UTC; missing or invalid values return 0.
+    """
+    from datetime import datetime, UTC
+
+    if not value:
+        return 0
+    if isinstance(value, datetime):
+        when = value
+    else:
+        try:
+            when = datetime.fromisoformat(str(value))
+        except ValueError:
+            return 0
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=UTC)
+    return int(when.timestamp())
+
+
+class FileLock:
+    """
+    Exclusive advisory lock on a file, shared between processes.
+
+    Uses fcntl.flock on POSIX and msvcrt.locking on Windows. Threads of one
+    process sharing an instance exclude each other too. The lock is
+    re-entrant per thread, so nested ``with`` blocks in the same thread do
+    not deadlock.
+    """
+
+    def __init__(self, path, timeout=120.0, poll_interval=0.05):
+        """
+        Args:
+            path: Lock file path (created if missing)
+            timeout: Seconds to wait before raising TimeoutError
+            poll_interval: Seconds between acquisition attempts
+        """
+        import threading
+
+        self.path = Path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._file = None
+        # Held by the owning thread for as long as it holds the file lock
+        self._thread_lock = threading.RLock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        if not self._thread_lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Timed out waiting for lock: {self.path}")
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            try:
+                self._acquire()
+            except BaseException:
+                self._thread_lock.release()
+                raise
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, *exc):
+        self._local.depth -= 1
+        try:
+            if self._local.depth == 0:
+                self._release()
+        finally:
+            self._thread_lock.release()
+
+    def _acquire(self):
+        import time
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, "a+b")
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _lock_file(f)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    f.close()
+                    raise TimeoutError(f"Timed out waiting for lock: {self.path}")
+                time.sleep(self.poll_interval)
+        self._file = f
+
+    def _release(self):
+        try:
+            _unlock_file(self._file)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def _lock_file(f):
+    """Take a non-blocking exclusive lock; raises OSError if it is held."""
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock_file(f):
+    """Release a lock taken by _lock_file."""
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
 def get_machine_id():
     """Get machine identifier (hostname)."""
+    import socket
+
     return socket.gethostname().lower()
 
 
 def get_os_type():
     """Get OS type (windows, linux, darwin)."""
+    import platform
+
     system = platform.system().lower()
     if system == "linux":
         # Check if running in WSL
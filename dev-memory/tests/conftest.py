@@ -0,0 +1,36 @@
+"""Shared fixtures: a config repository cloned from a local bare remote."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+
+def git(cwd, *args):
+    """Run git in a directory and return its stdout."""
+    result = subprocess.run(["git", "-C", str(cwd)] + list(args), capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+@pytest.fixture
+def git_config_repo(tmp_path, monkeypatch):
+    """A config repo with the memory directories, pushed to a bare remote."""
+    monkeypatch.delenv("DEV_MEMORY_METRICS_DIR", raising=False)
+    remote = tmp_path / "remote.git"
+    repo = tmp_path / "config"
+    git(tmp_path, "init", "-q", "--bare", str(remote))
+    git(tmp_path, "clone", "-q", str(remote), str(repo))
+    git(repo, "config", "user.email", "dev@example.com")
+    git(repo, "config", "user.name", "dev")
+    memory_dir = repo / "domains" / "dev" / "memory"
+    for name in ("episodes", "repositories", "machines"):
+        (memory_dir / name).mkdir(parents=True)
+        (memory_dir / name / ".gitkeep").write_text("", encoding="utf-8")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "init")
+    git(repo, "push", "-q", "origin", "HEAD")
+    return repo
@@ -0,0 +1,71 @@
+"""Access logs: saves append to them, failures take the lines back."""
+
+import pytest
+
+from access_log import COMPACT_BYTES, log_path
+from manage_memory import ManageMemory
+from conftest import git
+
+
+def _describe(manager):
+    manager.describe_repo(repo_path=str(manager.config_repo), description="config", tags="",
+                          machine="m1", os="linux")
+
+
+def _save(manager, summary):
+    return manager.save_episode(
+        detail_level="brief", repo_path=str(manager.config_repo), branch="main", commit="abc",
+        machine="m1", os="linux", summary=summary, keywords="", tags="", worktree=None,
+        on_duplicate="ignore",
+    )
+
+
+def test_failed_save_truncates_the_log(git_config_repo, monkeypatch):
+    manager = ManageMemory(git_config_repo, durability="none")
+    _describe(manager)
+    _save(manager, "first session")
+    path = log_path(manager.access_dir, "m1")
+    committed = path.read_bytes()
+    assert committed.count(b"\n") == 1
+
+    def fail(*args, **kwargs):
+        raise Exception("Git push failed: rejected")
+
+    monkeypatch.setattr(type(manager.git_sync), "commit_and_push", fail)
+    with pytest.raises(Exception, match="push failed"):
+        _save(manager, "second session")
+
+    assert path.read_bytes() == committed
+    assert git(git_config_repo, "status", "--porcelain", "--", str(path)) == ""
+
+
+def test_failed_first_save_removes_the_new_log(git_config_repo, monkeypatch):
+    manager = ManageMemory(git_config_repo, durability="none")
+    _describe(manager)
+
+    def fail(*args, **kwargs):
+        raise Exception("Git push failed: rejected")
+
+    monkeypatch.setattr(type(manager.git_sync), "commit_and_push", fail)
+    with pytest.raises(Exception, match="push failed"):
+        _save(manager, "first session")
+
+    assert not log_path(manager.access_dir, "m1").exists()
+
+
+def test_save_leaves_compaction_to_the_command(git_config_repo, capsys):
+    manager = ManageMemory(git_config_repo, durability="none")
+    _describe(manager)
+    repo_file = next(manager.repos_dir.glob("*.md"))
+    before = repo_file.read_text(encoding="utf-8")
+    path = log_path(manager.access_dir, "m1")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("x" * (COMPACT_BYTES + 1) + "\n", encoding="utf-8")
+
+    result = _save(manager, "a session")
+
+    assert repo_file.read_text(encoding="utf-8") == before
+    assert str(repo_file.relative_to(git_config_repo)) not in git(
+        git_config_repo, "show", "--name-only", "--format=", "HEAD")
+    assert path.stat().st_size > COMPACT_BYTES
+    assert result["success"] and "run compact-access" in capsys.readouterr().out
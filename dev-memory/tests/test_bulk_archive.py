@@ -0,0 +1,44 @@
+"""Policy-driven bulk archive: the OS filter and the CLI flag feeding it."""
+
+import sys
+
+import pytest
+
+import manage_memory
+from manage_memory import ManageMemory
+
+
+@pytest.fixture
+def manager(git_config_repo, tmp_path):
+    manager = ManageMemory(git_config_repo, durability="none")
+    for name, os_type in (("alpha", "linux"), ("beta", "windows")):
+        repo = tmp_path / name
+        repo.mkdir()
+        manager.describe_repo(repo_path=str(repo), description=name, tags="", machine="m1", os=os_type)
+    return manager
+
+
+def test_os_type_filter(manager):
+    result = manager.bulk_archive(os_type="windows", dry_run=True)
+    assert len(result["repositories"]) == 1 and "beta" in result["repositories"][0]
+
+    manager.bulk_archive(os_type="windows", reason="old laptop")
+    assert manager.bulk_archive(os_type="windows", dry_run=True)["repositories"] == []
+    assert len(manager.bulk_archive(archive=False, os_type="windows", dry_run=True)["repositories"]) == 1
+
+
+def test_filter_required(manager):
+    with pytest.raises(ValueError, match="at least one"):
+        manager.bulk_archive()
+
+
+def test_cli_os_flag(manager, monkeypatch, capsys):
+    monkeypatch.setattr(sys, "argv", [
+        "manage_memory.py", "bulk-archive", "--config-repo", str(manager.config_repo),
+        "--os", "linux", "--dry-run",
+    ])
+    with pytest.raises(SystemExit) as exit_info:
+        manage_memory.main()
+    assert exit_info.value.code == 0
+    out = capsys.readouterr().out
+    assert "alpha" in out and "beta" not in out
@@ -0,0 +1,43 @@
+"""Tiering: a re-created hot pack is merged into the month's cold pack."""
+
+from cold_tier import cold_dirs
+from conftest import git
+from episode_pack import EpisodePack, index_path_for, write_pack
+from manage_memory import ManageMemory
+
+
+def _contents(pack_path):
+    with EpisodePack(pack_path) as pack:
+        return {name: pack.read_text(name) for name in pack.names()}
+
+
+def test_hot_pack_merges_into_cold_pack(git_config_repo):
+    manager = ManageMemory(git_config_repo, durability="none")
+    _, cold_episodes_dir, cold_packs_dir = cold_dirs(manager.memory_dir)
+    hot_pack = manager.packs_dir / "2020-01.pack"
+    cold_pack = cold_packs_dir / "2020-01.pack"
+    write_pack(cold_pack, [("2020-01-02-a.md", b"a, as tiered"), ("2020-01-03-c.md", b"c")])
+    # A legacy sidecar index left next to the cold pack
+    index_path_for(cold_pack).write_text("{}", encoding="utf-8")
+    # Backfilled since: a newer copy of a, and b
+    write_pack(hot_pack, [("2020-01-02-a.md", b"a, backfilled"), ("2020-01-05-b.md", b"b")])
+    loose = manager.episodes_dir / "2020-02-01-d.md"
+    loose.write_text("d", encoding="utf-8")
+    git(git_config_repo, "add", "-A")
+    git(git_config_repo, "commit", "-q", "-m", "backfill")
+
+    result = manager.tier_memory(episode_months=6)
+
+    assert result["packs"] == ["2020-01"] and result["episodes"] == 1
+    assert _contents(cold_pack) == {
+        "2020-01-02-a.md": "a, backfilled",
+        "2020-01-03-c.md": "c",
+        "2020-01-05-b.md": "b",
+    }
+    assert not hot_pack.exists() and not index_path_for(cold_pack).exists()
+    assert (cold_episodes_dir / loose.name).read_text(encoding="utf-8") == "d"
+    # Everything, removals included, went into the commit
+    assert git(git_config_repo, "status", "--porcelain") == ""
+    committed = git(git_config_repo, "show", "--name-status", "--format=", "HEAD")
+    assert "D\tdomains/dev/memory/episodes/packs/2020-01.pack" in committed
+    assert "D\tdomains/dev/memory/cold/episodes/packs/2020-01.idx.json" in committed
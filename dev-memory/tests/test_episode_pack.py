@@ -0,0 +1,81 @@
+"""Monthly episode packs: round-trip, legacy sidecar indexes, failed writes."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from episode_pack import EpisodePack, index_path_for, list_packs, month_of, write_pack  # noqa: E402
+
+EPISODES = [
+    ("2026-01-02-a.md", b"---\nid: a\n---\nfirst\n"),
+    ("2026-01-05-b.md", "---\nid: b\n---\nzweite épisode\n".encode("utf-8")),
+    ("2026-01-09-c.md", b""),
+]
+
+
+def test_round_trip(tmp_path):
+    pack_path = tmp_path / "packs" / "2026-01.pack"
+
+    assert write_pack(pack_path, EPISODES) == 3
+
+    with EpisodePack(pack_path) as pack:
+        assert pack.names() == [name for name, _ in EPISODES]
+        for name, data in EPISODES:
+            with pack.view(name) as view:
+                assert bytes(view) == data
+        assert pack.read_text("2026-01-05-b.md") == EPISODES[1][1].decode("utf-8")
+    # One self-contained file, no sidecar and no temp files left behind
+    assert sorted(p.name for p in pack_path.parent.iterdir()) == ["2026-01.pack"]
+    assert list_packs(pack_path.parent) == [pack_path]
+    assert month_of("2026-01-02-a.md") == "2026-01"
+
+
+def test_rewrite_replaces_pack_and_index_together(tmp_path):
+    pack_path = tmp_path / "2026-01.pack"
+    write_pack(pack_path, EPISODES)
+
+    write_pack(pack_path, [("2026-01-20-d.md", b"only one, at offset 0")])
+
+    with EpisodePack(pack_path) as pack:
+        assert pack.names() == ["2026-01-20-d.md"]
+        assert pack.read_text("2026-01-20-d.md") == "only one, at offset 0"
+
+
+def test_legacy_sidecar_is_read_and_removed_on_rewrite(tmp_path):
+    pack_path = tmp_path / "2025-12.pack"
+    data = b"legacy episode"
+    pack_path.write_bytes(data)
+    index_path_for(pack_path).write_text(json.dumps(
+        {"version": 1, "episodes": [{"name": "2025-12-01-x.md", "offset": 0, "length": len(data)}]}
+    ), encoding="utf-8")
+
+    with EpisodePack(pack_path) as pack:
+        assert pack.read_text("2025-12-01-x.md") == "legacy episode"
+
+    with EpisodePack(pack_path) as pack:
+        episodes = [(name, bytes(pack.view(name))) for name in pack.names()]
+    write_pack(pack_path, episodes)
+
+    assert not index_path_for(pack_path).exists()
+    with EpisodePack(pack_path) as pack:
+        assert pack.read_text("2025-12-01-x.md") == "legacy episode"
+
+
+def test_failed_write_keeps_old_pack(tmp_path):
+    pack_path = tmp_path / "2026-01.pack"
+    write_pack(pack_path, EPISODES)
+
+    def broken():
+        yield "2026-01-30-z.md", b"partial"
+        raise RuntimeError("disk full")
+
+    with pytest.raises(RuntimeError):
+        write_pack(pack_path, broken())
+
+    with EpisodePack(pack_path) as pack:
+        assert pack.names() == [name for name, _ in EPISODES]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["2026-01.pack"]
@@ -0,0 +1,151 @@
+"""Episode table: incremental append, retain, rebuild and concurrent updates."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+from episode_table import COLUMNS, EpisodeTable  # noqa: E402
+
+
+def _header(day, machine, repo="alpha"):
+    return {
+        "timestamp": f"2026-03-{day:02d}T00:00:00Z",
+        "machine": machine,
+        "os": "linux",
+        "repository": {"name": repo, "branch": "main"},
+    }
+
+
+HEADERS = {
+    "2026-03-01-a.md": _header(1, "m1"),
+    "2026-03-02-b.md": _header(2, "m2"),
+    "2026-03-03-c.md": _header(3, "m1", repo="beta"),
+}
+
+
+class Reader:
+    """read_headers callable that records which names it was asked for."""
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.calls = []
+
+    def __call__(self, names):
+        self.calls.append(list(names))
+        return ((name, self.headers[name]) for name in names)
+
+
+def _check_consistent(table_dir):
+    """Every file agrees with meta.json's row count; no temp files left."""
+    meta = json.loads((table_dir / "meta.json").read_text(encoding="utf-8"))
+    with EpisodeTable(table_dir) as table:
+        assert table.rows == meta["rows"] == len(table.names())
+        for name in COLUMNS:
+            assert len(table.column(name)) == table.rows
+    assert not list(table_dir.glob("*.tmp"))
+    return meta["rows"]
+
+
+def test_append_then_append_only_new(tmp_path):
+    headers = dict(HEADERS)
+    reader = Reader(headers)
+    with EpisodeTable(tmp_path) as table:
+        result = table.update(list(headers), reader)
+
+        assert result == {"added": 3, "removed": 0, "rebuilt": False, "rows": 3}
+        assert table.names() == sorted(headers)
+        assert table.select(machine="m1") == [0, 2]
+        assert table.count("repo") == {"alpha": 2, "beta": 1}
+
+    headers["2026-03-04-d.md"] = _header(4, "m3")
+    with EpisodeTable(tmp_path) as table:
+        result = table.update(list(headers), reader)
+
+        assert result["added"] == 1 and table.rows == 4
+        assert reader.calls[-1] == ["2026-03-04-d.md"]
+        assert table.select(machine="m3") == [3]
+        assert [ts for ts in table.column("timestamp")] == sorted(table.column("timestamp"))
+    assert _check_consistent(tmp_path) == 4
+
+
+def test_retain_drops_missing_rows_without_reparsing(tmp_path):
+    reader = Reader(HEADERS)
+    with EpisodeTable(tmp_path) as table:
+        table.update(list(HEADERS), reader)
+
+    with EpisodeTable(tmp_path) as table:
+        result = table.update(["2026-03-01-a.md", "2026-03-03-c.md"], reader)
+
+        assert result == {"added": 0, "removed": 1, "rebuilt": False, "rows": 2}
+        assert len(reader.calls) == 1
+        assert table.names() == ["2026-03-01-a.md", "2026-03-03-c.md"]
+        # String ids survive the rewrite
+        assert table.select(machine="m1") == [0, 1]
+        assert table.select(repo="beta") == [1]
+        assert table.select(machine="m2") == []
+    assert _check_consistent(tmp_path) == 2
+
+
+def test_reader_keeps_its_rows_across_a_retain(tmp_path):
+    with EpisodeTable(tmp_path) as table:
+        table.update(list(HEADERS), Reader(HEADERS))
+
+    with EpisodeTable(tmp_path) as reader:
+        with EpisodeTable(tmp_path) as writer:
+            writer.update(["2026-03-03-c.md"], Reader(HEADERS))
+
+        # Still the three rows it opened, from the replaced files
+        assert reader.rows == 3
+        assert reader.names() == sorted(HEADERS)
+        assert len(reader.column("timestamp")) == 3
+
+
+def test_version_change_rebuilds(tmp_path):
+    with EpisodeTable(tmp_path) as table:
+        table.update(list(HEADERS), Reader(HEADERS))
+    meta_path = tmp_path / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["version"] = 0
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+
+    with EpisodeTable(tmp_path) as table:
+        result = table.update(list(HEADERS), Reader(HEADERS))
+
+    assert result["rebuilt"] is True and result["added"] == 3
+    assert _check_consistent(tmp_path) == 3
+
+
+UPDATER = """
+import sys
+from episode_table import EpisodeTable
+
+table_dir, first, count = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+names = [f"2026-03-01-{i:05d}.md" for i in range(first, first + count)]
+header = {"timestamp": "2026-03-01T00:00:00Z", "machine": f"m{first}"}
+for step in range(1, 11):
+    with EpisodeTable(table_dir) as table:
+        # Each process sees its own slice, so they keep dropping each other's rows
+        table.update(names[:step * count // 10], lambda todo: ((n, header) for n in todo))
+"""
+
+
+def test_concurrent_updates_stay_consistent(tmp_path):
+    procs = [
+        subprocess.Popen([sys.executable, "-c", UPDATER, str(tmp_path), str(first), "200"],
+                         cwd=SCRIPTS_DIR, stderr=subprocess.PIPE, text=True)
+        for first in (0, 1000, 2000, 3000)
+    ]
+    for proc in procs:
+        _, stderr = proc.communicate()
+        assert proc.returncode == 0, stderr
+
+    rows = _check_consistent(tmp_path)
+    with EpisodeTable(tmp_path) as table:
+        assert rows == 200
+        # The last writer's slice, each name with its own machine
+        machines = table.count("machine")
+        assert len(machines) == 1 and sum(machines.values()) == 200
@@ -0,0 +1,81 @@
+"""FileLock: exclusive across processes and threads, re-entrant per thread."""
+
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+from utils import FileLock
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+
+TRY_LOCK = """
+import sys
+from utils import FileLock
+
+try:
+    with FileLock(sys.argv[1], timeout=0):
+        print("acquired")
+except TimeoutError:
+    print("busy")
+"""
+
+
+def _other_process(path):
+    result = subprocess.run([sys.executable, "-c", TRY_LOCK, str(path)],
+                            capture_output=True, text=True, cwd=SCRIPTS_DIR)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.strip()
+
+
+def test_excludes_other_processes(tmp_path):
+    path = tmp_path / "x.lock"
+    with FileLock(path):
+        assert _other_process(path) == "busy"
+    assert _other_process(path) == "acquired"
+
+
+def test_reentrant_within_a_thread(tmp_path):
+    lock = FileLock(tmp_path / "x.lock")
+    with lock:
+        with lock:
+            pass
+        # Still held after the inner block
+        assert _other_process(lock.path) == "busy"
+    assert _other_process(lock.path) == "acquired"
+
+
+def test_shared_instance_excludes_other_threads(tmp_path):
+    lock = FileLock(tmp_path / "x.lock", timeout=0.2)
+    outcome = []
+
+    def contend():
+        try:
+            with lock:
+                outcome.append("acquired")
+        except TimeoutError:
+            outcome.append("busy")
+
+    with lock:
+        thread = threading.Thread(target=contend)
+        thread.start()
+        thread.join()
+    assert outcome == ["busy"]
+
+    thread = threading.Thread(target=contend)
+    thread.start()
+    thread.join()
+    assert outcome == ["busy", "acquired"]
+
+
+def test_failed_acquire_leaves_lock_usable(tmp_path):
+    path = tmp_path / "x.lock"
+    lock = FileLock(path, timeout=0)
+    with FileLock(path):
+        with pytest.raises(TimeoutError):
+            with lock:
+                pass
+    with lock:
+        assert _other_process(path) == "busy"
@@ -0,0 +1,104 @@
+"""
+Import-time budget for find-repo.
+
+find-repo runs at the start of agent sessions, so its startup must not
+creep up again: each check runs the CLI under ``python -X importtime``
+and fails if a module that belongs to another command gets loaded, or if
+the scripts' own imports exceed a generous time budget.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+
+# Modules find-repo must never load (write paths, git, the result cache)
+FORBIDDEN = {
+    "subprocess", "uuid", "socket", "platform", "hashlib", "tempfile",
+    "threading", "contextlib", "result_cache", "sync_git", "manage_memory",
+}
+
+# Microseconds for everything imported after interpreter startup
+BUDGET_US = 100_000
+
+REPO_FILE = """---
+type: repository-metadata
+version: '2.0'
+repository:
+  name: alpha
+  slug: alpha
+location:
+  machine: m1
+  os: linux
+  path: /repos/alpha
+  last_accessed: '2026-10-01T00:00:00Z'
+description: alpha repo
+tags: []
+---
+
+# Repository: alpha
+"""
+
+
+def _config_repo(tmp_path):
+    repos_dir = tmp_path / "domains" / "dev" / "memory" / "repositories"
+    repos_dir.mkdir(parents=True)
+    (repos_dir / "alpha.md").write_text(REPO_FILE, encoding="utf-8")
+    return tmp_path
+
+
+def _find_repo(config_repo, repo_name):
+    """
+    Run find-repo under -X importtime.
+
+    Returns:
+        tuple: (parsed JSON result, {module: cumulative us}, total us spent
+        importing after interpreter startup)
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", str(SCRIPTS_DIR / "query_memory.py"),
+         "find-repo", "--config-repo", str(config_repo), "--repo-name", repo_name],
+        capture_output=True, text=True, cwd=SCRIPTS_DIR,
+    )
+    assert proc.returncode == 0, proc.stderr
+    modules = {}
+    total = 0
+    started = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = int(cumulative)
+        # Top-level entries only (nested ones are indented), once site is done
+        if started and not name[1:].startswith(" "):
+            total += int(cumulative)
+        started = started or name.strip() == "site"
+    return json.loads(proc.stdout), modules, total
+
+
+def test_missing_repo_loads_no_heavy_modules(tmp_path):
+    result, modules, _ = _find_repo(_config_repo(tmp_path), "nope")
+
+    assert result["found"] is False
+    assert not FORBIDDEN & modules.keys()
+    # Nothing to parse, so not even the YAML loader
+    assert "yaml" not in modules
+
+
+def test_existing_repo_loads_no_heavy_modules(tmp_path):
+    result, modules, _ = _find_repo(_config_repo(tmp_path), "alpha")
+
+    assert result["found"] is True
+    assert result["clones"][0]["path"] == "/repos/alpha"
+    assert not FORBIDDEN & modules.keys()
+
+
+def test_imports_within_budget(tmp_path):
+    config_repo = _config_repo(tmp_path)
+    # The first run may compile bytecode; measure a warm start
+    _find_repo(config_repo, "alpha")
+    _, _, total = _find_repo(config_repo, "alpha")
+
+    assert total < BUDGET_US
@@ -0,0 +1,134 @@
+"""Search query parsing, and plain keyword queries run end to end."""
+
+import pytest
+
+from memory_query import HEADER, TABLE, TEXT, SearchPlan, Term, describe, parse, stage
+from query_memory import QueryMemory
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("auth retry", "auth retry"),
+    ("Auth AND Retry", "auth retry"),
+    ("auth OR cache", "auth OR cache"),
+    ("auth OR cache retry", "auth OR cache retry"),
+    ("(auth OR cache) retry", "(auth OR cache) retry"),
+    ("auth NOT cache", "auth -cache"),
+    ("auth -cache", "auth -cache"),
+    ("-(auth OR cache)", "-(auth OR cache)"),
+    ("NOT NOT auth", "--auth"),
+    ('"key vault" vault*', '"key vault" vault*'),
+])
+def test_operators(query, expected):
+    assert describe(parse(query)) == expected
+
+
+@pytest.mark.parametrize("query, words", [
+    # Operators are upper case only; anything else is a keyword
+    ("or not and", ["or", "not", "and"]),
+    # A dash inside a word, or standing alone, is not NOT
+    ("error-handling", ["error-handling"]),
+    ("auth - cache", ["auth", "-", "cache"]),
+    ("auth -", ["auth", "-"]),
+    # Unknown fields (URLs, times) stay text
+    ("https://example.com 10:30", ["https://example.com", "10:30"]),
+])
+def test_plain_keywords(query, words):
+    node = parse(query)
+    terms = [node] if isinstance(node, Term) else node[1]
+
+    assert [(t.field, t.value) for t in terms] == [("text", word) for word in words]
+
+
+def test_fields_and_ranges():
+    node = parse("repo:alpha branch:feature/* tag:Infra summary:\"Key Vault\" after:2026-09")
+    terms = {t.field: t for t in node[1]}
+
+    assert terms["repo"] == Term("repo", "eq", "alpha", "repo:alpha")
+    assert terms["branch"].kind == "glob"
+    assert terms["tag"].value == "infra"
+    assert terms["summary"].text == 'summary:"key vault"'
+    assert terms["timestamp"].value == (1788220800, None)
+    assert parse("date:2026-02").value[1] - parse("date:2026-02").value[0] == 28 * 86400
+
+
+@pytest.mark.parametrize("query", ["(auth", "auth)", "auth OR", "NOT", 'repo:""', "after:someday", "date:2026-13"])
+def test_malformed(query):
+    with pytest.raises(ValueError):
+        parse(query)
+
+
+def test_empty_query_matches_everything():
+    assert parse("") == parse("   ") == ("and", [])
+
+
+def test_canonical_describe():
+    assert describe(parse("b a OR c a"), canonical=True) == describe(parse("a b OR a c"), canonical=True)
+    assert describe(parse("b a"), canonical=True) == describe(parse("a b a"), canonical=True)
+
+
+def test_plan_stages():
+    plan = SearchPlan(parse("deploy tag:infra machine:m1 NOT os:linux"))
+
+    assert [stage(c) for c in plan.conjuncts] == [TABLE, TABLE, HEADER, TEXT]
+    assert [describe(c) for c in plan.table_conjuncts] == ["machine:m1", "-os:linux"]
+    assert plan.steps() == [{"stage": "header", "predicate": "tag:infra"},
+                            {"stage": "text", "predicate": "deploy"}]
+    assert plan.required_text == ["deploy"]
+    # Only words every match must contain can rule out a shard
+    assert SearchPlan(parse("a OR b")).required_text == []
+    assert SearchPlan(parse("-a")).required_text == []
+
+
+EPISODE = """---
+type: episode
+id: '{id}'
+timestamp: '2026-10-{day:02d}T00:00:00Z'
+machine: {machine}
+os: linux
+repository:
+  name: alpha
+  branch: main
+summary: {summary}
+---
+
+{body}
+"""
+
+EPISODES = [
+    ("e1", "m1", "fixed the auth token refresh", "retry with backoff"),
+    ("e2", "m1", "cache warmup for the build", "error-handling cleanup"),
+    ("e3", "m2", "auth and cache both", "notes or todos"),
+]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    episodes_dir = tmp_path / "domains" / "dev" / "memory" / "episodes"
+    episodes_dir.mkdir(parents=True)
+    for day, (episode_id, machine, summary, body) in enumerate(EPISODES, start=1):
+        (episodes_dir / f"2026-10-{day:02d}-{episode_id}.md").write_text(
+            EPISODE.format(id=episode_id, day=day, machine=machine, summary=summary, body=body),
+            encoding="utf-8")
+    return QueryMemory(tmp_path)
+
+
+def _ids(engine, query):
+    return sorted(result["episode_id"] for result in engine.search_memory(query))
+
+
+@pytest.mark.parametrize("query, ids", [
+    ("auth", ["e1", "e3"]),
+    ("auth cache", ["e3"]),
+    ("auth OR cache", ["e1", "e2", "e3"]),
+    ("auth NOT cache", ["e1"]),
+    ("auth -cache", ["e1"]),
+    ("-auth", ["e2"]),
+    ("(auth OR backoff) -m2", ["e1"]),
+    ("error-handling", ["e2"]),
+    ("notes or todos", ["e3"]),
+    ("auth machine:m2", ["e3"]),
+    ("cache -machine:m2", ["e2"]),
+    ("refre*", ["e1"]),
+])
+def test_search(engine, query, ids):
+    assert _ids(engine, query) == ids
@@ -0,0 +1,36 @@
+"""Metrics: read bytes are counted per thread, per open measure()."""
+
+import threading
+
+import metrics
+
+
+def _read_bytes(operation):
+    with metrics._lock:
+        return metrics._samples.get(f'dev_memory_query_read_bytes_sum{{operation="{operation}"}}', 0)
+
+
+def test_read_bytes_stay_on_their_thread():
+    ready = threading.Event()
+    done = threading.Event()
+
+    def other():
+        with metrics.measure("query", "other_op"):
+            ready.set()
+            done.wait()
+            metrics.add_read_bytes(7)
+
+    thread = threading.Thread(target=other)
+    thread.start()
+    ready.wait()
+    with metrics.measure("query", "outer_op"):
+        with metrics.measure("query", "inner_op"):
+            metrics.add_read_bytes(100)
+        metrics.add_read_bytes(5)
+    done.set()
+    thread.join()
+
+    assert _read_bytes("inner_op") == 100
+    assert _read_bytes("outer_op") == 105
+    assert _read_bytes("other_op") == 7
+    assert metrics._frames == {}
@@ -0,0 +1,108 @@
+"""v1 -> v2 repository file migration: journaled, resumable, one commit."""
+
+import json
+
+import pytest
+
+from conftest import git
+from migrate_repo_files import MigrateRepoFiles
+from utils import normalize_repo_slug
+
+V1_FILE = """---
+type: repository-metadata
+version: '1.0'
+repository:
+  name: {name}
+  remote: https://example.com/{name}.git
+clones:
+- machine: m1
+  os: linux
+  path: /repos/{name}
+  last_accessed: '2026-01-01T00:00:00Z'
+- machine: m2
+  os: windows
+  path: C:/src/{name}
+  last_accessed: '2026-01-02T00:00:00Z'
+description: {name} repo
+---
+
+# Repository: {name}
+"""
+
+NAMES = ("alpha", "beta", "gamma")
+
+
+@pytest.fixture
+def migrator(git_config_repo):
+    migrator = MigrateRepoFiles(git_config_repo, dry_run=False)
+    for name in NAMES:
+        (migrator.repos_dir / f"{name}.md").write_text(V1_FILE.format(name=name), encoding="utf-8")
+    git(git_config_repo, "add", "-A")
+    git(git_config_repo, "commit", "-q", "-m", "v1 files")
+    return migrator
+
+
+def _expected(name):
+    return {f"{normalize_repo_slug(f'/repos/{name}', 'm1')}.md",
+            f"{normalize_repo_slug(f'C:/src/{name}', 'm2')}.md"}
+
+
+def _repo_files(migrator):
+    return {path.name for path in migrator.repos_dir.glob("*.md")}
+
+
+def test_interrupted_run_resumes(migrator, monkeypatch):
+    # First run dies while journaling beta: alpha and gamma complete
+    append = MigrateRepoFiles._append_journal
+
+    def crash_on_beta(self, source, created):
+        if source == "beta.md":
+            raise OSError("disk gone")
+        append(self, source, created)
+
+    monkeypatch.setattr(MigrateRepoFiles, "_append_journal", crash_on_beta)
+    results = migrator.migrate(workers=2, commit=False)
+    assert len(results["errors"]) == 1 and "beta.md" in results["errors"][0]
+    assert "beta.md" in _repo_files(migrator)
+    # ...and, as if killed between journaling gamma and deleting it, gamma is back
+    (migrator.repos_dir / "gamma.md").write_text(V1_FILE.format(name="gamma"), encoding="utf-8")
+    # plus a torn line from the crash
+    with open(migrator.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"source": "beta.md", "crea')
+    monkeypatch.undo()
+
+    results = migrator.migrate(workers=2)
+
+    assert results["resumed"] == 2
+    assert results["files_processed"] == 1 and results["errors"] == []
+    assert "DELETE: gamma.md (resumed)" in results["actions"]
+    assert results["committed"] == 3
+    assert _repo_files(migrator) == set().union(*(_expected(name) for name in NAMES))
+    assert sorted(p.name for p in migrator.backup_dir.glob("*.md")) == [f"{name}.md" for name in NAMES]
+    # Journal cleared once pushed; one commit holds every file
+    assert not migrator.journal_path.exists()
+    # (backups stay local)
+    assert git(migrator.config_repo, "status", "--porcelain", "--", ".", ":!*/.migration_backup/*") == ""
+    committed = git(migrator.config_repo, "show", "--no-renames", "--name-status", "--format=", "HEAD")
+    for name in NAMES:
+        assert f"D\tdomains/dev/memory/repositories/{name}.md" in committed
+        for new_name in _expected(name):
+            assert f"A\tdomains/dev/memory/repositories/{new_name}" in committed
+
+
+def test_dry_run_changes_nothing(migrator):
+    migrator.dry_run = True
+
+    results = migrator.migrate()
+
+    assert results["files_processed"] == 3 and results["files_created"] == 0
+    assert _repo_files(migrator) == {f"{name}.md" for name in NAMES}
+    assert not migrator.backup_dir.exists()
+
+
+def test_journal_ignores_torn_line(migrator):
+    migrator.backup_dir.mkdir()
+    migrator.journal_path.write_text(
+        json.dumps({"source": "alpha.md", "created": ["a.md"]}) + "\n{\"source\": \"be", encoding="utf-8")
+
+    assert migrator._read_journal() == {"alpha.md": ["a.md"]}
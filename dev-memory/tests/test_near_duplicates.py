@@ -0,0 +1,108 @@
+"""Near-duplicate detection: index find/update, and saves that skip or fail."""
+
+import array
+
+import pytest
+
+from manage_memory import ManageMemory
+from near_duplicates import NUM_PERM, TAIL_LIMIT, NearDuplicateIndex, band_keys, signature, similarity
+from query_memory import QueryMemory
+
+TEXTS = {
+    "2026-01-01-a.md": "refactor the token refresh flow in the auth service and add retries",
+    "2026-01-02-b.md": "refactor the token refresh flow in the auth service and add retries today",
+    "2026-01-03-c.md": "write the quarterly report on cloud spend for the finance team",
+}
+
+
+def _reader(texts):
+    return lambda names: ((name, {"summary": texts[name]}, "") for name in names)
+
+
+def test_signature_similarity():
+    a, b, c = (signature(text) for text in TEXTS.values())
+
+    assert len(a) == NUM_PERM and signature(TEXTS["2026-01-01-a.md"]) == a
+    assert similarity(a, a) == 1.0
+    assert similarity(a, b) >= 0.6
+    assert similarity(a, c) < 0.2
+    # Stable across processes: no builtin hash() involved
+    assert band_keys(a) == band_keys(list(a))
+
+
+def test_update_find_and_remove(tmp_path):
+    with NearDuplicateIndex(tmp_path) as index:
+        assert index.update(list(TEXTS), _reader(TEXTS)) == {"added": 3, "removed": 0, "rows": 3}
+
+        sig = signature(TEXTS["2026-01-01-a.md"])
+        assert [name for name, _ in index.find(sig, threshold=0.6)] == ["2026-01-01-a.md", "2026-01-02-b.md"]
+        assert [name for name, _ in index.find(sig, threshold=0.6, exclude={"2026-01-01-a.md"})] == \
+            ["2026-01-02-b.md"]
+        assert index.clusters(threshold=0.6) == [["2026-01-01-a.md", "2026-01-02-b.md"]]
+
+    # A reopened index sees the same rows; a vanished episode is dropped
+    with NearDuplicateIndex(tmp_path) as index:
+        result = index.update(["2026-01-01-a.md", "2026-01-03-c.md"], _reader(TEXTS))
+
+        assert result == {"added": 0, "removed": 1, "rows": 2}
+        assert index.names() == ["2026-01-01-a.md", "2026-01-03-c.md"]
+        assert index.find(signature(TEXTS["2026-01-02-b.md"]), threshold=0.6)[0][0] == "2026-01-01-a.md"
+
+
+def test_tail_is_merged_into_sorted_bands(tmp_path):
+    texts = {f"2026-02-01-{i:05d}.md": f"episode number {i} about topic {i % 7}" for i in range(TAIL_LIMIT + 5)}
+    texts["2026-02-02-dup.md"] = texts["2026-02-01-00042.md"]
+    with NearDuplicateIndex(tmp_path) as index:
+        index.update(list(texts), _reader(texts))
+
+        assert index.sorted_rows == index.rows == len(texts)
+        assert [name for name, _ in index.find(signature(texts["2026-02-02-dup.md"]))] == \
+            ["2026-02-01-00042.md", "2026-02-02-dup.md"]
+
+
+def test_add_is_idempotent(tmp_path):
+    with NearDuplicateIndex(tmp_path) as index:
+        index.update(list(TEXTS), _reader(TEXTS))
+        sig = signature("something new entirely")
+        index.add("2026-01-04-d.md", sig)
+        index.add("2026-01-04-d.md", sig)
+
+        assert index.names().count("2026-01-04-d.md") == 1
+        assert index.signature_of(3) == list(array.array("Q", sig))
+
+
+def _save(manager, summary, on_duplicate="flag"):
+    return manager.save_episode(
+        detail_level="brief", repo_path=str(manager.config_repo), branch="main", commit="abc",
+        machine="m1", os="linux", summary=summary, keywords="", tags="", worktree=None,
+        on_duplicate=on_duplicate,
+    )
+
+
+def _indexed(config_repo):
+    with QueryMemory(config_repo).near_duplicate_index(refresh=False) as index:
+        return index.names(), index.sorted_rows
+
+
+def test_save_indexes_only_committed_episodes(git_config_repo, monkeypatch):
+    manager = ManageMemory(git_config_repo, durability="none")
+    summary = "refactor the token refresh flow in the auth service and add retries"
+
+    first = _save(manager, summary)
+    names, _ = _indexed(git_config_repo)
+    assert first["near_duplicates"] == []
+    assert names == [first["filepath"].rsplit("/", 1)[-1]]
+
+    # Skipped as a duplicate: nothing written, nothing indexed
+    skipped = _save(manager, summary, on_duplicate="skip")
+    assert skipped["skipped"] is True
+    assert _indexed(git_config_repo)[0] == names
+
+    # A failed commit leaves the index alone too
+    def fail(*args, **kwargs):
+        raise Exception("Git push failed: rejected")
+
+    monkeypatch.setattr(type(manager.git_sync), "commit_and_push", fail)
+    with pytest.raises(Exception, match="push failed"):
+        _save(manager, "an unrelated session about build caching")
+    assert _indexed(git_config_repo)[0] == names
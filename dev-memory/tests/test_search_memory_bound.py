@@ -0,0 +1,129 @@
+"""
+Memory bound for search-memory.
+
+Hot candidates stream from the episode table newest first and the search
+stops at ``--limit`` matches, so peak memory must not grow with the number
+of episodes a query matches. The benchmark runs searches in fresh
+processes over the same large corpus and compares the peak RSS of a query
+matching every episode with one matching only a handful; the table walk
+itself is checked to hold one bounded page at a time.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+EPISODES_PER_MONTH = 2000
+MONTHS = 24
+# Episodes on the rare machine, the only ones the selective query matches
+RARE_EVERY = 4000
+
+# Peak RSS a query matching every episode may add over a selective one (KiB)
+RSS_SLACK_KB = 1024
+
+EPISODE = """---
+type: episode
+id: {id}
+timestamp: '{timestamp}'
+machine: {machine}
+os: linux
+repository:
+  name: alpha
+  branch: main
+summary: episode {id}
+keywords: []
+context:
+  tags: []
+---
+
+# Episode {id}
+"""
+
+SEARCH = """
+import json, resource, sys
+from query_memory import QueryMemory
+results = QueryMemory(sys.argv[1]).search_memory(sys.argv[2], limit=5)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    "ids": [r["episode_id"] for r in results],
+    "max_rss_kb": rss // 1024 if sys.platform == "darwin" else rss,
+}))
+"""
+
+
+@pytest.fixture(scope="module")
+def config_repo(tmp_path_factory):
+    """A config repo with MONTHS monthly packs and an up-to-date episode table."""
+    from episode_pack import write_pack
+    from episode_table import EpisodeTable
+
+    root = tmp_path_factory.mktemp("config")
+    memory_dir = root / "domains" / "dev" / "memory"
+    headers = {}
+    for month in range(MONTHS):
+        year, month_of_year = 2024 + month // 12, month % 12 + 1
+        episodes = []
+        for i in range(EPISODES_PER_MONTH):
+            n = month * EPISODES_PER_MONTH + i
+            day, minute = i // 96 + 1, i % 96 * 15
+            timestamp = f"{year}-{month_of_year:02d}-{day:02d}T{minute // 60:02d}:{minute % 60:02d}:00Z"
+            name = f"{timestamp[:10]}-{n:06d}.md"
+            machine = "rare" if n % RARE_EVERY == 0 else "common"
+            episodes.append((name, EPISODE.format(id=n, timestamp=timestamp, machine=machine).encode("utf-8")))
+            headers[name] = {"timestamp": timestamp, "machine": machine, "os": "linux",
+                             "repository": {"name": "alpha", "branch": "main"}}
+        write_pack(memory_dir / "episodes" / "packs" / f"{year}-{month_of_year:02d}.pack", episodes)
+
+    # Build the table from the known headers rather than parsing every episode
+    with EpisodeTable(memory_dir / "index" / "episode-table") as table:
+        table.update(headers, lambda names: ((name, headers[name]) for name in names))
+    return root
+
+
+def _search(config_repo, query):
+    proc = subprocess.run(
+        [sys.executable, "-c", SEARCH, str(config_repo), query],
+        capture_output=True, text=True, cwd=SCRIPTS_DIR,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs the resource module")
+def test_peak_rss_independent_of_match_count(config_repo):
+    total = MONTHS * EPISODES_PER_MONTH
+    # Warm up bytecode caches so both runs start from the same state
+    _search(config_repo, "machine:rare")
+
+    everything = _search(config_repo, "machine:common")
+    selective = _search(config_repo, "machine:rare")
+
+    newest = total - 1
+    assert everything["ids"] == [newest - i for i in range(5)]
+    assert selective["ids"] == [n for n in range(total - 1, -1, -1) if n % RARE_EVERY == 0][:5]
+    assert everything["max_rss_kb"] - selective["max_rss_kb"] < RSS_SLACK_KB
+
+
+def test_newest_first_pages_are_bounded_and_ordered(tmp_path):
+    from episode_table import EpisodeTable
+
+    # Out of table order, with runs of equal timestamps across page edges
+    seconds = [(i * 7919) % 1000 // 3 for i in range(1000)]
+    headers = {
+        f"e{i:04d}.md": {"timestamp": f"2026-01-01T00:{s // 60:02d}:{s % 60:02d}Z"}
+        for i, s in enumerate(seconds)
+    }
+    with EpisodeTable(tmp_path / "table") as table:
+        table.update(headers, lambda names: ((name, headers[name]) for name in names))
+        pages = list(table.newest_first(page_size=16, max_page_size=64))
+
+    rows = [row for page in pages for row in page]
+    assert rows == sorted(range(len(seconds)), key=seconds.__getitem__, reverse=True)
+    # Only rows tied with a page's oldest one may push it past the cap
+    assert max(map(len, pages)) <= 64 + max(map(seconds.count, seconds))
@@ -0,0 +1,95 @@
+"""Reader commands take their data from a current snapshot."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from query_memory import QueryMemory  # noqa: E402
+from snapshot import MemorySnapshot  # noqa: E402
+
+REPO_FILE = """---
+type: repository-metadata
+version: '2.0'
+repository:
+  name: alpha
+  slug: alpha
+location:
+  machine: m1
+  os: linux
+  path: /repos/alpha
+  last_accessed: '2026-10-01T00:00:00Z'
+description: {description}
+tags: []
+---
+
+# Repository: alpha
+"""
+
+EPISODE = """---
+type: episode
+id: '{id}'
+timestamp: '2026-10-0{day}T00:00:00Z'
+machine: m1
+os: linux
+repository:
+  name: alpha
+  branch: main
+summary: episode {id}
+---
+
+body
+"""
+
+
+@pytest.fixture
+def config_repo(tmp_path):
+    memory_dir = tmp_path / "domains" / "dev" / "memory"
+    (memory_dir / "repositories").mkdir(parents=True)
+    (memory_dir / "episodes").mkdir()
+    (memory_dir / "repositories" / "alpha.md").write_text(
+        REPO_FILE.format(description="from file"), encoding="utf-8")
+    for day in (1, 2):
+        (memory_dir / "episodes" / f"2026-10-0{day}-e{day}.md").write_text(
+            EPISODE.format(id=f"e{day}", day=day), encoding="utf-8")
+
+    # Build the snapshot, then mark its contents so readers using it show
+    QueryMemory(tmp_path).snapshot()
+    path = memory_dir / "index" / "snapshot" / "state.bin"
+    snapshot = MemorySnapshot.load(path)
+    snapshot.repos["alpha"][2]["description"] = "from snapshot"
+    for header in snapshot.episodes.values():
+        header["machine"] = "snapshot-machine"
+    snapshot.save(path)
+    return tmp_path
+
+
+def test_find_repo_reads_snapshot(config_repo):
+    assert QueryMemory(config_repo).find_repo("alpha")["description"] == "from snapshot"
+
+
+def test_list_recent_repos_reads_snapshot(config_repo):
+    repos = QueryMemory(config_repo).list_recent_repos()
+
+    assert [r["description"] for r in repos] == ["from snapshot"]
+
+
+def test_episode_table_built_from_snapshot(config_repo):
+    stats = QueryMemory(config_repo).stats()
+
+    assert stats["machines"] == {"snapshot-machine": 2}
+
+
+def test_changed_files_bypass_snapshot(config_repo):
+    memory_dir = config_repo / "domains" / "dev" / "memory"
+    (memory_dir / "repositories" / "alpha.md").write_text(
+        REPO_FILE.format(description="edited"), encoding="utf-8")
+    (memory_dir / "episodes" / "2026-10-03-e3.md").write_text(
+        EPISODE.format(id="e3", day=3), encoding="utf-8")
+
+    engine = QueryMemory(config_repo)
+    assert engine.find_repo("alpha")["description"] == "edited"
+    # The fingerprint moved, so no episode header comes from the snapshot
+    assert engine.stats()["machines"] == {"m1": 3}